@@ -0,0 +1,298 @@
+# > vdifheader - benchmarks/benchmark.py
+# Measures throughput and peak memory of parsing, scanning and exporting
+
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+> vdifheader - benchmarks/benchmark.py
+Measures throughput and peak memory of parsing, scanning and exporting
+"""
+__author__ = "Mars Buttfield-Addison"
+__authors__ = [__author__]
+__contact__ = "hello@themartianlife.com"
+__copyright__ = f"Copyright 2022, {__author__}"
+__credits__ = __authors__
+__date__ = "2022/04/07"
+__deprecated__ = False
+__email__ = __contact__
+__license__ = "GPLv3"
+__maintainer__ = __author__
+__status__ = "Pre-release"
+__version__ = "0.1"
+
+import json, os, platform, subprocess, sys, tracemalloc
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Callable, Optional
+
+# run from a checkout without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vdifheader import *
+from vdifheader.generator import generate_file
+
+
+FRAME_LENGTH = 8032     # bytes of each generated frame
+CSV_HEADERS = 1000      # headers written by to_csv case (one file each)
+REGRESSION_THRESHOLD = 0.1  # fractional slowdown reported as a regression
+CASES = ["parse", "get_headers", "get_headers_compact", "get_header_table",
+    "to_csv", "cli"]
+
+
+def run_benchmarks(sizes_mb: list[int], thread_counts: list[int],
+        cases: list[str], repeats: int=3, memory: bool=True) -> dict[str,Any]:
+    """
+    Runs each case on generated files of each size and number of threads
+
+        parameter:
+            sizes_mb: list[int]         sizes of generated files, in MiB
+            thread_counts: list[int]    threads interleaved in each file
+            cases: list[str]            names of cases to run (see CASES)
+            repeats: int                runs of each case, of which the
+                                        fastest is kept
+            memory: bool                also measure peak memory of each case
+
+        returns:
+            dict[str,Any]               machine description and results
+    """
+    results = []
+    with TemporaryDirectory() as directory:
+        for size_mb in sizes_mb:
+            for num_threads in thread_counts:
+                filepath = os.path.join(directory,
+                    f"{size_mb}mb_{num_threads}t.vdif")
+                generate_file(filepath, max(1, (size_mb << 20) //
+                    FRAME_LENGTH), num_threads=num_threads,
+                    data_frame_length=FRAME_LENGTH, seed=0)
+                for case in cases:
+                    result = _run_case(case, filepath, directory, repeats,
+                        memory)
+                    result.update(size_mb=size_mb,
+                        size_bytes=os.path.getsize(filepath),
+                        num_threads=num_threads)
+                    results.append(result)
+                    _print_result(result)
+                os.remove(filepath)
+    return {"machine": _machine(), "results": results}
+
+
+def compare_results(base: dict[str,Any], head: dict[str,Any],
+        threshold: float=REGRESSION_THRESHOLD) -> list[dict[str,Any]]:
+    """
+    Compares headers per second of each case run in both base and head
+
+        parameter:
+            base: dict[str,Any]         results of earlier run
+            head: dict[str,Any]         results of later run
+            threshold: float            fractional slowdown that counts as a
+                                        regression
+
+        returns:
+            list[dict[str,Any]]         speedup (head / base) of each case,
+                                        and whether it regressed
+    """
+    key = lambda result: (result["case"], result["size_mb"],
+        result["num_threads"])
+    base_results = {key(result): result for result in base["results"]}
+    comparisons = []
+    for result in head["results"]:
+        base_result = base_results.get(key(result))
+        if base_result is None:
+            continue
+        speedup = result["headers_per_second"] / \
+            base_result["headers_per_second"]
+        comparisons.append({
+            "case": result["case"],
+            "size_mb": result["size_mb"],
+            "num_threads": result["num_threads"],
+            "base_headers_per_second": base_result["headers_per_second"],
+            "head_headers_per_second": result["headers_per_second"],
+            "speedup": speedup,
+            "regressed": speedup < 1.0 - threshold,
+        })
+    return comparisons
+
+
+def arg_parser() -> ArgumentParser:
+    # parse command line args
+    parser = ArgumentParser(prog="benchmark.py",
+        description="Benchmark vdifheader throughput and peak memory")
+    parser.add_argument("-s", "--sizes", metavar="MB", type=int, nargs="+",
+        default=[16, 128], help="sizes of generated files, in MiB")
+    parser.add_argument("-t", "--threads", metavar="NUM", type=int,
+        nargs="+", default=[1, 4], help="threads in generated files")
+    parser.add_argument("-c", "--cases", metavar="CASE", nargs="+",
+        choices=CASES, default=CASES, help="cases to run")
+    parser.add_argument("-r", "--repeats", type=int, default=3,
+        help="runs of each case, of which the fastest is kept")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+        help="skip measuring peak memory")
+    parser.add_argument("-o", "--output", metavar="JSON_FILE",
+        help="file to write results to")
+    parser.add_argument("--compare", metavar="JSON_FILE", nargs=2,
+        help="compare results of two runs (base, head) instead of running")
+    parser.add_argument("--threshold", type=float,
+        default=REGRESSION_THRESHOLD,
+        help="fractional slowdown reported as a regression")
+    return parser
+
+
+def main(argv: Optional[list[str]]=None) -> int:
+    """Runs or compares benchmarks, returning 1 if any case regressed"""
+    args = arg_parser().parse_args(argv)
+    if args.compare is not None:
+        base, head = [_load(path) for path in args.compare]
+        comparisons = compare_results(base, head, args.threshold)
+        for comparison in comparisons:
+            flag = "  REGRESSED" if comparison["regressed"] else ""
+            print(f"{comparison['case']:<20} " \
+                f"{comparison['size_mb']:>6} MiB " \
+                f"{comparison['num_threads']:>3} threads " \
+                f"{comparison['speedup']:>6.2f}x{flag}")
+        return int(any(c["regressed"] for c in comparisons))
+    results = run_benchmarks(args.sizes, args.threads, args.cases,
+        args.repeats, args.memory)
+    if args.output is not None:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    return 0
+
+######## PRIVATE METHODS
+
+def _run_case(case: str, filepath: str, directory: str, repeats: int,
+        memory: bool) -> dict[str,Any]:
+    if case == "cli":
+        return _run_cli(filepath, repeats)
+    run = _case_function(case, filepath, directory)
+    best_seconds, num_headers = None, 0
+    for _ in range(repeats):
+        start = perf_counter()
+        num_headers = run()
+        seconds = perf_counter() - start
+        best_seconds = seconds if best_seconds is None else \
+            min(best_seconds, seconds)
+    peak_memory = None
+    if memory:
+        # separate run, as tracing allocations slows everything down
+        tracemalloc.start()
+        run()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return _result(case, num_headers, best_seconds, peak_memory)
+
+
+def _case_function(case: str, filepath: str,
+        directory: str) -> Callable[[],int]:
+    # each function returns number of headers it processed
+    if case == "parse":
+        with open(filepath, "rb") as input_file:
+            data = input_file.read()
+        raw_headers = [data[offset:offset + 32]
+            for offset in range(0, len(data), FRAME_LENGTH)]
+        return lambda: sum(1 for raw_header in raw_headers
+            if VDIFHeader.parse(raw_header) is not None)
+    if case == "get_headers":
+        return lambda: sum(1 for _ in get_headers(filepath))
+    if case == "get_headers_compact":
+        return lambda: sum(1 for _ in get_headers(filepath, compact=True))
+    if case == "get_header_table":
+        return lambda: len(get_header_table(filepath))
+    if case == "to_csv":
+        csv_filepath = os.path.join(directory, "header.csv")
+        count = min(CSV_HEADERS, os.path.getsize(filepath) // FRAME_LENGTH)
+        headers = list(get_headers(filepath, count=count))
+        def write_csv() -> int:
+            for header in headers:
+                header.to_csv(csv_filepath)
+            return len(headers)
+        return write_csv
+    raise ValueError(f"Unknown benchmark case {case!r}.")
+
+
+def _run_cli(filepath: str, repeats: int) -> dict[str,Any]:
+    # peak memory is maximum resident set size of the child process
+    command = [sys.executable, "-m", "vdifheader", "--all", filepath]
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    best_seconds, peak_memory = None, 0
+    for _ in range(repeats):
+        start = perf_counter()
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL, env=environment)
+        _, status, usage = os.wait4(process.pid, 0)
+        seconds = perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if process.returncode != 0:
+            raise RuntimeError(f"{' '.join(command)} exited with status " \
+                f"{process.returncode}.")
+        best_seconds = seconds if best_seconds is None else \
+            min(best_seconds, seconds)
+        # ru_maxrss is in KiB on Linux, but bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        peak_memory = max(peak_memory, usage.ru_maxrss * scale)
+    num_headers = os.path.getsize(filepath) // FRAME_LENGTH
+    return _result("cli", num_headers, best_seconds, peak_memory)
+
+
+def _result(case: str, num_headers: int, seconds: float,
+        peak_memory: Optional[int]) -> dict[str,Any]:
+    return {
+        "case": case,
+        "headers": num_headers,
+        "seconds": seconds,
+        "headers_per_second": num_headers / seconds,
+        # bytes of file covered by the headers processed
+        "bytes_per_second": num_headers * FRAME_LENGTH / seconds,
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def _print_result(result: dict[str,Any]):
+    memory = result["peak_memory_bytes"]
+    memory = "-" if memory is None else f"{memory / (1 << 20):.1f} MiB"
+    print(f"{result['case']:<20} {result['headers']:>8} headers " \
+        f"{result['headers_per_second']:>12.0f} headers/s " \
+        f"{result['bytes_per_second'] / (1 << 20):>10.1f} MiB/s " \
+        f"peak {memory}", flush=True)
+    return
+
+
+def _machine() -> dict[str,Any]:
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": numpy_version,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _load(path: str) -> dict[str,Any]:
+    with open(path) as input_file:
+        return json.load(input_file)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
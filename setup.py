@@ -9,6 +9,10 @@ setup(
     packages=["vdifheader"],
     license="GPLv3+",
     install_requires=[],
+    extras_require={
+        "table": ["numpy"],
+        "parquet": ["numpy", "pyarrow"],
+    },
     setup_requires=["pytest-runner"],
     tests_require=["pytest==4.4.1"],
     test_suite="tests",
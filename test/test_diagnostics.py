@@ -0,0 +1,123 @@
+import io, logging, pytest
+from vdifheader import *
+from vdifheader import VDIFHeaderField as Field
+from vdifheader._utils import vh_error, vh_warn
+from vdifheader.diagnostics import *
+pytestmark = pytest.mark.fast
+
+# test that sinks receive diagnostics with context of offending header
+# test that repeated diagnostics are rate-limited
+# test logging and null sinks
+
+
+@pytest.fixture
+def collector():
+    sink = CollectorSink()
+    previous = set_diagnostics_sink(sink)
+    yield sink
+    set_diagnostics_sink(previous)
+
+@pytest.fixture
+def bad_filepath(test_filepath, tmp_path):
+    # frames 3 onwards have a non-zero unassigned_field
+    frame_length = get_first_header(test_filepath).data_frame_length
+    with open(test_filepath, "rb") as input_file:
+        frames = bytearray(input_file.read(10 * frame_length))
+    for frame_num in range(3, 10):
+        frames[frame_num * frame_length + 7] |= 0x40
+    bad_filepath = tmp_path / "bad.vdif"
+    bad_filepath.write_bytes(frames)
+    return str(bad_filepath)
+
+
+# test that sinks receive diagnostics with context of offending header
+
+def test_diagnostics_collector(collector):
+    vh_warn("this is a test warning", Field.VDIF_VERSION)
+    vh_error("this is a test error")
+    assert [str(d) for d in collector.diagnostics] == \
+        ["this is a test warning.", "this is a test error."]
+    assert collector.diagnostics[0].severity == WARNING
+    assert collector.diagnostics[0].field == Field.VDIF_VERSION
+    assert collector.diagnostics[1].severity == ERROR
+    assert collector.diagnostics[1].frame_index is None
+
+@pytest.mark.parametrize("memory_map", [False, True])
+def test_diagnostics_context(collector, bad_filepath, memory_map):
+    headers = list(get_headers(bad_filepath, memory_map=memory_map))
+    frame_length = headers[0].data_frame_length
+    assert len(headers) == 10
+    assert len(collector.diagnostics) == 7
+    for frame_num, diagnostic in zip(range(3, 10), collector.diagnostics):
+        assert diagnostic.field == Field.UNASSIGNED_FIELD
+        assert diagnostic.frame_index == frame_num
+        assert diagnostic.byte_offset == frame_num * frame_length
+        assert diagnostic.to_dict()["field"] == "unassigned_field"
+    # context only applies while headers are being parsed
+    headers[0].unassigned_field = 1
+    assert collector.diagnostics[-1].frame_index is None
+
+
+# test that repeated diagnostics are rate-limited
+
+def test_diagnostics_rate_limit():
+    sink = CollectorSink(max_repeats=2)
+    previous = set_diagnostics_sink(sink)
+    try:
+        for _ in range(5):
+            vh_warn("repeated warning")
+        vh_warn("other warning")
+    finally:
+        set_diagnostics_sink(previous)
+    key = (WARNING, "repeated warning")
+    assert [d.message for d in sink.diagnostics] == \
+        ["repeated warning", "repeated warning", "other warning"]
+    assert sink.counts[key] == 5
+    assert sink.suppressed == {key: 3}
+
+def test_diagnostics_rate_limit_interval():
+    sink = CollectorSink(max_repeats=1, interval=0.0)
+    sink.emit(VDIFDiagnostic(WARNING, "repeated warning"))
+    sink.emit(VDIFDiagnostic(WARNING, "repeated warning"))
+    assert len(sink.diagnostics) == 2
+
+def test_diagnostics_rate_limit_stderr(monkeypatch):
+    output = io.StringIO()
+    monkeypatch.setattr("vdifheader.diagnostics.stderr", output)
+    sink = StderrSink()
+    assert sink.interval == REPEAT_INTERVAL
+    for _ in range(8):
+        sink.emit(VDIFDiagnostic(WARNING, "repeated warning"))
+    lines = output.getvalue().splitlines()
+    assert len(lines) == 6
+    assert "suppressed for 60 s" in lines[-1]
+    # a new interval passes the message on again
+    sink = StderrSink(max_repeats=1, interval=0.0)
+    for _ in range(3):
+        sink.emit(VDIFDiagnostic(WARNING, "repeated warning"))
+    assert len(output.getvalue().splitlines()) == 9
+
+
+# test logging and null sinks
+
+def test_diagnostics_logging(caplog, bad_filepath):
+    previous = set_diagnostics_sink(LoggingSink(max_repeats=3))
+    try:
+        with caplog.at_level(logging.WARNING, logger="vdifheader"):
+            list(get_headers(bad_filepath))
+    finally:
+        set_diagnostics_sink(previous)
+    assert len(caplog.records) == 4
+    assert caplog.records[0].levelno == logging.ERROR
+    assert caplog.records[0].frame_index == 3
+    assert caplog.records[0].field == Field.UNASSIGNED_FIELD
+    assert "suppressed" in caplog.records[-1].getMessage()
+
+def test_diagnostics_null(bad_filepath):
+    previous = set_diagnostics_sink(None)
+    try:
+        assert isinstance(get_diagnostics_sink(), NullSink)
+        assert len(list(get_headers(bad_filepath))) == 10
+    finally:
+        set_diagnostics_sink(previous)
+    assert get_diagnostics_sink() is previous
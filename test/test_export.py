@@ -0,0 +1,204 @@
+import csv, io, json, pytest, struct
+from vdifheader import *
+from vdifheader.export import *
+pytestmark = pytest.mark.fast
+
+# test rows of each format match header values
+# test quoting of awkward station ids
+# test batching of writes
+# test bulk export of whole files
+# test parquet export
+
+
+def _export(headers: list, output_format: str, **kwargs) -> str:
+    output = io.StringIO()
+    with VDIFHeaderWriter(output, output_format, **kwargs) as writer:
+        assert writer.write_headers(headers) == len(headers)
+    return output.getvalue()
+
+
+# test rows of each format match header values
+
+@pytest.mark.parametrize("output_format", ["csv", "tsv"])
+def test_export_delimited(test_filepath, output_format):
+    headers = list(get_headers(test_filepath, count=5))
+    text = _export(headers, output_format)
+    delimiter = "," if output_format == "csv" else "\t"
+    rows = list(csv.DictReader(io.StringIO(text), delimiter=delimiter))
+    assert len(rows) == 5
+    assert list(rows[0]) == [field.value for field in EXPORTED_FIELDS] + \
+        EXTENDED_DATA_COLUMNS
+    for header, row in zip(headers, rows):
+        assert row["invalid_flag"] == "false"
+        assert row["reference_epoch"] == str(header.reference_epoch.date())
+        assert int(row["data_frame_number"]) == header.data_frame_number
+        assert int(row["num_channels"]) == header.num_channels
+        assert int(row["data_frame_length"]) == header.data_frame_length
+        assert row["data_type"] == header.data_type
+        assert row["station_id"] == header.station_id
+
+def test_export_jsonl(test_filepath):
+    headers = list(get_headers(test_filepath, count=5, compact=True))
+    lines = _export(headers, "jsonl").splitlines()
+    assert len(lines) == 5
+    for header, line in zip(headers, lines):
+        row = json.loads(line)
+        assert row["legacy_mode"] is False
+        assert row["seconds_from_epoch"] == header.seconds_from_epoch
+        assert row["data_frame_number"] == header.data_frame_number
+        assert row["bits_per_sample"] == header.bits_per_sample
+        assert row["station_id"] == header.station_id
+
+def test_export_header_and_record_match(test_filepath):
+    headers = list(get_headers(test_filepath, count=3))
+    records = list(get_headers(test_filepath, count=3, compact=True))
+    assert _export(headers, "jsonl") == _export(records, "jsonl")
+
+@pytest.mark.parametrize("output_format", ["jsonl", "csv", "tsv"])
+def test_export_extended_data(cached_header, output_format):
+    # edv bits of word 4 are left out, as in extended_data of header table
+    raw = bytearray(cached_header.to_bytes())
+    raw[16:32] = struct.pack("<4I", 0x02abcdef, 1, 0xffffffff, 7)
+    text = _export([VDIFHeaderRecord(bytes(raw))], output_format)
+    expected = [0xabcdef, 1, 0xffffffff, 7]
+    if output_format == "jsonl":
+        row = json.loads(text)
+        assert row["extended_data_version"] == 2
+        assert row["extended_data"] == expected
+    else:
+        delimiter = "," if output_format == "csv" else "\t"
+        row = next(csv.DictReader(io.StringIO(text), delimiter=delimiter))
+        assert [int(row[name]) for name in EXTENDED_DATA_COLUMNS] == expected
+
+def test_export_invalid_format():
+    with pytest.raises(ValueError):
+        VDIFHeaderWriter(io.StringIO(), "xml")
+
+
+# test quoting of awkward station ids
+
+@pytest.mark.parametrize("output_format", ["jsonl", "csv", "tsv"])
+@pytest.mark.parametrize("station_id", ['A,', 'B"', "C\t", "Mp"])
+def test_export_station_quoting(cached_header, output_format, station_id):
+    raw = bytearray(cached_header.to_bytes())
+    raw[12:14] = station_id[::-1].encode()
+    text = _export([VDIFHeaderRecord(bytes(raw))], output_format)
+    if output_format == "jsonl":
+        assert json.loads(text)["station_id"] == station_id
+    else:
+        delimiter = "," if output_format == "csv" else "\t"
+        rows = list(csv.DictReader(io.StringIO(text), delimiter=delimiter))
+        assert rows[0]["station_id"] == station_id
+
+
+# test batching of writes
+
+class _CountingOutput(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        return super().write(text)
+
+def test_export_batches(test_filepath):
+    output = _CountingOutput()
+    with VDIFHeaderWriter(output, "csv", batch_rows=10) as writer:
+        writer.write_headers(get_headers(test_filepath, count=25,
+            compact=True))
+        # column names row + 9 rows, then 10 rows, are written so far
+        assert output.writes == 2
+        assert writer.num_rows == 25
+    assert output.writes == 3
+    assert len(output.getvalue().splitlines()) == 26
+
+
+# test bulk export of whole files
+
+@pytest.mark.parametrize("chunk_frames", [7, 1 << 16])
+def test_export_npy(test_filepath, tmp_path, chunk_frames):
+    np = pytest.importorskip("numpy")
+    output_filepath = str(tmp_path / "headers.npy")
+    assert export_headers(test_filepath, output_filepath, count=100,
+        chunk_frames=chunk_frames) == 100
+    table = np.load(output_filepath)
+    expected = get_header_table(test_filepath, count=100)
+    assert table.dtype == expected.dtype
+    assert table.tobytes() == expected.tobytes()
+    assert np.load(output_filepath, mmap_mode="r").shape == (100,)
+
+def test_export_npy_all(test_filepath, tmp_path):
+    np = pytest.importorskip("numpy")
+    output_filepath = str(tmp_path / "headers.npy")
+    assert export_headers(test_filepath, output_filepath) == 30000
+    table = np.load(output_filepath, mmap_mode="r")
+    assert len(table) == 30000
+    assert table["data_frame_number"][-1] == 9999
+
+@pytest.mark.parametrize("output_format", ["csv", "tsv", "jsonl"])
+def test_export_file_rows(test_filepath, tmp_path, output_format):
+    pytest.importorskip("numpy")
+    output_filepath = str(tmp_path / f"headers.{output_format}")
+    assert export_headers(test_filepath, output_filepath, count=50,
+        chunk_frames=16) == 50
+    records = list(get_headers(test_filepath, count=50, compact=True))
+    with open(output_filepath, newline="") as output_file:
+        assert output_file.read() == _export(records, output_format)
+
+def test_export_file_format(test_filepath, tmp_path):
+    pytest.importorskip("numpy")
+    output_filepath = str(tmp_path / "headers.txt")
+    assert export_headers(test_filepath, output_filepath, "csv",
+        count=3) == 3
+    with pytest.raises(ValueError):
+        export_headers(test_filepath, output_filepath, count=3)
+
+
+# test parquet export
+
+def test_export_parquet(test_filepath, tmp_path):
+    pytest.importorskip("numpy")
+    pq = pytest.importorskip("pyarrow.parquet")
+    output_filepath = str(tmp_path / "headers.parquet")
+    assert export_headers(test_filepath, output_filepath,
+        chunk_frames=10000) == 30000
+    metadata = pq.ParquetFile(output_filepath).metadata
+    assert metadata.num_rows == 30000
+    assert metadata.num_row_groups == 3
+    columns = {metadata.schema.column(i).name: i
+        for i in range(metadata.num_columns)}
+    for field in ["station_id", "thread_id", "data_frame_length"]:
+        column = metadata.row_group(0).column(columns[field])
+        assert column.has_dictionary_page
+    table = pq.read_table(output_filepath)
+    expected = get_header_table(test_filepath)
+    assert table["data_frame_number"].to_numpy().tolist() == \
+        expected["data_frame_number"].tolist()
+    assert set(table["station_id"].to_pylist()) == {"Tt"}
+    assert table["extended_data"][0].as_py() == [0, 0, 0, 0]
+
+def test_export_parquet_headers(test_filepath, tmp_path):
+    pytest.importorskip("numpy")
+    pq = pytest.importorskip("pyarrow.parquet")
+    headers = list(get_headers(test_filepath, count=25))
+    output_filepath = str(tmp_path / "headers.parquet")
+    assert write_parquet(headers, output_filepath, row_group_rows=10) == 25
+    parquet_file = pq.ParquetFile(output_filepath)
+    assert parquet_file.metadata.num_row_groups == 3
+    rows = parquet_file.read().to_pylist()
+    for header, row in zip(headers, rows):
+        assert row["data_frame_number"] == header.data_frame_number
+        assert row["reference_epoch"] == header.reference_epoch
+        assert row["num_channels"] == header.num_channels
+        assert row["data_type"] == header.data_type
+        assert row["station_id"] == header.station_id
+
+def test_export_record_batches(test_filepath):
+    pytest.importorskip("numpy")
+    pytest.importorskip("pyarrow")
+    records = get_headers(test_filepath, count=25, compact=True)
+    batches = list(header_record_batches(records, batch_rows=10))
+    assert [batch.num_rows for batch in batches] == [10, 10, 5]
+    assert batches[2]["data_frame_number"].to_pylist() == \
+        list(range(20, 25))
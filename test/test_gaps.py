@@ -0,0 +1,98 @@
+import pytest
+from vdifheader import *
+from vdifheader.gaps import VDIFFrameRange
+pytestmark = pytest.mark.fast
+
+# test that complete streams have no gaps
+# test reporting of missing, duplicated and out-of-order frames
+# test inference of frame rate
+
+
+def _analyse(frames: list, frames_per_second: int=None,
+        reorder_window: int=1024) -> VDIFGapReport:
+    analyser = VDIFGapAnalyser(frames_per_second, reorder_window)
+    for frame in frames:
+        analyser.add(*frame)
+    return analyser.finish()
+
+def _stream(seconds: range, fps: int, thread_id: int=0) -> list:
+    return [(thread_id, second, frame_num) for second in seconds
+        for frame_num in range(fps)]
+
+
+# test that complete streams have no gaps
+
+def test_gaps_complete_file(test_filepath):
+    report = analyse_gaps(test_filepath)
+    assert report.frames_per_second == 10000
+    assert report.is_complete
+    assert list(report.threads) == [0]
+    assert report.threads[0].num_frames == 30000
+
+def test_gaps_complete_interleaved():
+    frames = [frame for pair in zip(_stream(range(5), 4, 0),
+        _stream(range(5), 4, 1)) for frame in pair]
+    report = _analyse(frames)
+    assert report.frames_per_second == 4
+    assert report.is_complete
+    assert report.threads[1].first == (0, 0)
+    assert report.threads[1].last == (4, 3)
+
+
+# test reporting of missing, duplicated and out-of-order frames
+
+def test_gaps_missing():
+    frames = _stream(range(3), 10)
+    del frames[8:13]    # 0s #8 to 1s #2
+    del frames[20]      # 2s #5 (after first deletion)
+    gaps = _analyse(frames, 10).threads[0]
+    assert gaps.missing == [VDIFFrameRange((0, 8), (1, 2), 5),
+        VDIFFrameRange((2, 5), (2, 5), 1)]
+    assert gaps.num_missing == 6
+    assert gaps.duplicated == gaps.out_of_order == []
+
+def test_gaps_duplicated():
+    frames = _stream(range(2), 10)
+    frames[4:4] = frames[1:3]
+    gaps = _analyse(frames, 10).threads[0]
+    assert gaps.duplicated == [VDIFFrameRange((0, 1), (0, 2), 2)]
+    assert gaps.missing == gaps.out_of_order == []
+
+def test_gaps_out_of_order():
+    frames = _stream(range(2), 10)
+    frames[3], frames[4], frames[5] = frames[5], frames[3], frames[4]
+    gaps = _analyse(frames, 10).threads[0]
+    assert gaps.out_of_order == [VDIFFrameRange((0, 3), (0, 4), 2)]
+    assert gaps.missing == gaps.duplicated == []
+
+def test_gaps_reorder_window():
+    frames = _stream(range(2), 10)
+    late = frames.pop(2)
+    frames.append(late)
+    gaps = _analyse(frames, 10, reorder_window=4).threads[0]
+    assert gaps.missing == [VDIFFrameRange((0, 2), (0, 2), 1)]
+    assert gaps.duplicated == [VDIFFrameRange((0, 2), (0, 2), 1)]
+
+
+# test inference of frame rate
+
+def test_gaps_inferred_rate_partial_first_second():
+    frames = _stream(range(4), 16)[10:]
+    del frames[30]
+    report = _analyse(frames)
+    assert report.frames_per_second == 16
+    assert report.threads[0].missing == [VDIFFrameRange((2, 8), (2, 8), 1)]
+
+def test_gaps_inferred_rate_short_stream():
+    report = _analyse(_stream(range(1), 8))
+    assert report.frames_per_second == 8
+    assert report.is_complete
+
+def test_gaps_inferred_rate_matches_rates(tmp_path):
+    from vdifheader.generator import VDIFFaults, generate_file
+    output_filepath = str(tmp_path / "gaps.vdif")
+    generate_file(output_filepath, 400, num_threads=2, frames_per_second=50,
+        data_frame_length=64, faults=VDIFFaults(gap_rate=0.05), seed=3)
+    rates = infer_rates(output_filepath)
+    assert analyse_gaps(output_filepath).frames_per_second == \
+        rates.frames_per_second == 50
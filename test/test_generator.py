@@ -0,0 +1,140 @@
+import pytest
+np = pytest.importorskip("numpy")
+from vdifheader import *
+from vdifheader.generator import *
+from vdifheader.headertable import map_words
+pytestmark = pytest.mark.fast
+
+# test that generated files have the requested header values
+# test injection of faults
+# test that same seed gives same file
+# test command line generation
+
+
+def _generate(tmp_path, num_frames: int, **kwargs) -> tuple:
+    output_filepath = str(tmp_path / "generated.vdif")
+    counts = generate_file(output_filepath, num_frames, **kwargs)
+    return output_filepath, counts
+
+
+# test that generated files have the requested header values
+
+def test_generator_values(tmp_path):
+    output_filepath, counts = _generate(tmp_path, 60, num_threads=3,
+        frames_per_second=8, data_frame_length=64, station_id="Mp",
+        start_seconds=100, num_channels=4, bits_per_sample=2,
+        data_type="complex", extended_data_version=2)
+    assert counts["frames"] == 60
+    table = get_header_table(output_filepath)
+    assert len(table) == 60
+    assert list(table["thread_id"][:6]) == [0, 1, 2, 0, 1, 2]
+    assert list(table["data_frame_number"][:6]) == [0, 0, 0, 1, 1, 1]
+    assert table["seconds_from_epoch"][0] == 100
+    assert table["seconds_from_epoch"][-1] == 100 + 19 // 8
+    assert (table["station_id"] == "Mp").all()
+    assert (table["num_channels"] == 4).all()
+    assert (table["data_type"] == "complex").all()
+    assert (table["extended_data_version"] == 2).all()
+    assert (table["reference_epoch"] == np.datetime64("2021-07-01")).all()
+    assert not table["invalid_flag"].any()
+
+def test_generator_matches_parse(tmp_path):
+    output_filepath, _ = _generate(tmp_path, 20, data_frame_length=64)
+    headers = list(get_headers(output_filepath, count=20))
+    assert len(headers) == 20
+    assert headers[-1].data_frame_number == 19
+    assert headers[0].station_id == "Tt"
+
+def test_generator_complete_stream(tmp_path):
+    output_filepath, _ = _generate(tmp_path, 400, num_threads=2,
+        frames_per_second=50, data_frame_length=64)
+    report = analyse_gaps(output_filepath)
+    assert report.frames_per_second == 50
+    assert report.is_complete
+    assert list(report.threads) == [0, 1]
+
+@pytest.mark.parametrize("payload", ["zeros", "random"])
+def test_generator_payload(tmp_path, payload):
+    output_filepath, _ = _generate(tmp_path, 10, data_frame_length=1056,
+        payload=payload, seed=1)
+    frames = np.fromfile(output_filepath, dtype=np.uint8).reshape(10, 1056)
+    assert frames[:, 32:].any() == (payload == "random")
+
+def test_generator_invalid_args(tmp_path):
+    with pytest.raises(ValueError):
+        _generate(tmp_path, 10, data_frame_length=30)
+    with pytest.raises(ValueError):
+        _generate(tmp_path, 10, payload="ones")
+    with pytest.raises(ValueError):
+        VDIFFaults(gap_rate=1.5)
+
+
+# test injection of faults
+
+def test_generator_gaps_and_duplicates(tmp_path):
+    faults = VDIFFaults(gap_rate=0.05, duplicate_rate=0.05)
+    output_filepath, counts = _generate(tmp_path, 2000,
+        frames_per_second=100, data_frame_length=64, faults=faults, seed=3)
+    assert counts["gaps"] > 0 and counts["duplicates"] > 0
+    assert counts["frames"] == 2000 - counts["gaps"] + counts["duplicates"]
+    report = analyse_gaps(output_filepath, frames_per_second=100)
+    thread_gaps = report.threads[0]
+    assert thread_gaps.num_frames == counts["frames"]
+    assert thread_gaps.num_duplicated == counts["duplicates"]
+    # gaps at very end of stream can't be seen
+    assert thread_gaps.num_missing <= counts["gaps"]
+
+def test_generator_invalid_flags(tmp_path):
+    faults = VDIFFaults(invalid_rate=0.1)
+    output_filepath, counts = _generate(tmp_path, 500,
+        data_frame_length=64, faults=faults, seed=3)
+    table = get_header_table(output_filepath)
+    assert counts["invalid"] > 0
+    assert table["invalid_flag"].sum() == counts["invalid"]
+
+def test_generator_bad_lengths(tmp_path):
+    faults = VDIFFaults(bad_length_rate=0.1)
+    output_filepath, counts = _generate(tmp_path, 500,
+        data_frame_length=64, faults=faults, seed=3)
+    # frames are still 64 bytes apart, though some headers say otherwise
+    words = map_words(output_filepath).reshape(500, 16)
+    lengths = (words[:, 2] & 0xffffff) * 8
+    assert counts["bad_lengths"] > 0
+    assert (lengths != 64).sum() == counts["bad_lengths"]
+
+
+# test that same seed gives same file
+
+def test_generator_seed(tmp_path):
+    faults = VDIFFaults(0.01, 0.01, 0.01, 0.01)
+    files = []
+    for name, seed in [("a", 7), ("b", 7), ("c", 8)]:
+        output_filepath = str(tmp_path / f"{name}.vdif")
+        generate_file(output_filepath, 1000, num_threads=2,
+            data_frame_length=96, faults=faults, seed=seed, payload="random")
+        with open(output_filepath, "rb") as output_file:
+            files.append(output_file.read())
+    assert files[0] == files[1]
+    assert files[0] != files[2]
+
+
+# test command line generation
+
+def test_generator_main(tmp_path):
+    output_filepath = str(tmp_path / "main.vdif")
+    main(["-s", "64K", "-t", "2", "--frame-length", "1024", "--station",
+        "Mp", "--edv", "0x03", "--gap-rate", "0.1", "--seed", "1",
+        output_filepath])
+    table = get_header_table(output_filepath)
+    assert 0 < len(table) < 64
+    assert (table["station_id"] == "Mp").all()
+    assert (table["extended_data_version"] == 3).all()
+    assert set(table["thread_id"]) == {0, 1}
+
+def test_generator_arg_parser():
+    args = vars(arg_parser().parse_args(["-n", "100", "out.vdif"]))
+    assert args["num_frames"] == 100
+    assert args["size_bytes"] is None
+    assert args["gap_rate"] == 0.0
+    with pytest.raises(SystemExit):
+        arg_parser().parse_args(["out.vdif"])
@@ -0,0 +1,267 @@
+import re, pytest
+from datetime import datetime, timedelta, timezone
+np = pytest.importorskip("numpy")
+from vdifheader import *
+from vdifheader import VDIFHeaderField as Field
+from vdifheader.headertable import *
+pytestmark = pytest.mark.fast
+
+# test that table columns match values from VDIFHeader.parse()
+# test that frame offsets follow data_frame_length values
+# test resynchronising to frame boundaries
+# test decoding of individual columns
+# test encoding of tables back into header words
+# test decoding of extended data
+
+
+# test that table columns match values from VDIFHeader.parse()
+
+@pytest.mark.parametrize("count", [1, 100])
+def test_headertable_matches_parse(test_filepath, count):
+    table = get_header_table(test_filepath, count=count)
+    headers = list(get_headers(test_filepath, count=count))
+    assert len(table) == len(headers) == count
+    for row, header in zip(table, headers):
+        for field in Field.primary_values():
+            value = row[field.value]
+            if field == Field.REFERENCE_EPOCH:
+                value = value.astype(object).date()
+                assert value == header.reference_epoch.date()
+            else:
+                assert value == header._get_value(field)
+
+@pytest.mark.parametrize("raw_stations", [
+    [125, 0x2fff, 12],              # numeric
+    [0x5474, 0x3132, 0x41ff],       # 2-char ASCII, digits and non-printable
+    [0x4100, 0x3100, 0x5474]])      # 1-char ASCII, null-padded
+def test_headertable_station_id_matches_parse(raw_stations):
+    words = np.array([[0, 0, 4, raw_station, 0, 0, 0, 0]
+        for raw_station in raw_stations], dtype="<u4")
+    table = decode_header_words(words)
+    station_ids = [VDIFHeader.parse(row.tobytes()).station_id for row in words]
+    assert list(table["station_id"]) == station_ids
+
+
+# test that frame offsets follow data_frame_length values
+
+def _words(frame_length: int, thread_id: int=0) -> list:
+    return [0, 0, frame_length // 8, thread_id << 16, 0, 0, 0, 0]
+
+def test_headertable_frame_offsets_variable_length():
+    frames = []
+    for frame_length in [64, 64, 40, 40, 64]:
+        frame = np.zeros(frame_length // 4, dtype="<u4")
+        frame[:8] = _words(frame_length)
+        frames.append(frame)
+    buffer = np.concatenate(frames)
+    offsets = frame_offsets(buffer)
+    assert list(offsets) == [0, 64, 128, 168, 208]
+    assert list(frame_offsets(buffer, count=3)) == [0, 64, 128]
+    assert list(frame_offsets(buffer, start=168)) == [168, 208]
+
+def test_headertable_frame_offsets_truncated():
+    buffer = np.zeros(24, dtype="<u4")  # 96 bytes, room for 1.5 frames of 64
+    buffer[:8] = _words(64)
+    buffer[16:] = _words(64)
+    assert list(frame_offsets(buffer)) == [0, 64]
+    assert list(frame_offsets(buffer[:20])) == [0]
+
+def test_headertable_frame_offsets_invalid_length():
+    buffer = np.zeros(16, dtype="<u4")
+    with pytest.raises(ValueError):
+        frame_offsets(buffer)
+    assert list(frame_offsets(buffer, strict=False)) == [0]
+
+def test_headertable_frame_offsets_end():
+    buffer = np.tile(np.array(_words(64) + [0] * 8, dtype="<u4"), 4)
+    assert list(frame_offsets(buffer, end=128)) == [0, 64]
+    assert list(frame_offsets(buffer, end=129)) == [0, 64, 128]
+    assert list(frame_offsets(buffer, start=64, end=200)) == [64, 128, 192]
+
+
+# test resynchronising to frame boundaries
+
+def _stream(num_frames: int, frame_length: int=64) -> "np.ndarray":
+    frame = np.zeros(frame_length // 4, dtype="<u4")
+    frame[:8] = _words(frame_length)
+    frame[3] |= ord("M") << 8 | ord("p")
+    return np.tile(frame, num_frames)
+
+def test_headertable_resync_aligned():
+    buffer = _stream(4)
+    assert resync_offset(buffer, 0, 64) == 0
+    assert resync_offset(buffer, 1, 64) == 64
+    assert resync_offset(buffer, 64, 64) == 64
+    assert resync_offset(buffer, 200, 64) == None
+
+def test_headertable_resync_shifted():
+    # 12 bytes of garbage shift all frames off their aligned boundaries
+    garbage = np.array([0xdeadbeef, 8, 0xffffffff], dtype="<u4")
+    buffer = np.concatenate([garbage, _stream(4)])
+    assert resync_offset(buffer, 0, 64) == 12
+    assert resync_offset(buffer, 13, 64) == 76
+    assert resync_offset(buffer, 13, 64, end=76) == None
+    # wrong frame length never matches
+    assert resync_offset(buffer, 0, 128) == None
+
+
+# test decoding of individual columns
+
+@pytest.mark.parametrize("raw_station, station_id", [
+    (0x4d70, "Mp"),
+    (0x7454, "tT"),
+    (0x4100, "A"),
+    (125, "125"),
+    (0x2fff, "12287")])
+def test_headertable_station_id(raw_station, station_id):
+    words = np.array([[0, 0, 4, raw_station, 0, 0, 0, 0]], dtype="<u4")
+    table = decode_header_words(words)
+    assert table["station_id"][0] == station_id
+
+def test_headertable_raw_column(test_filepath):
+    _, words = read_header_words(test_filepath, count=10)
+    table = decode_header_words(words)
+    assert (raw_column(words, Field.THREAD_ID) == table["thread_id"]).all()
+    assert (raw_column(words, Field.DATA_FRAME_LENGTH) * 8 ==
+        table["data_frame_length"]).all()
+
+@pytest.mark.parametrize("raw_epoch, epoch", [
+    (0, "2000-01-01"),
+    (1, "2000-07-01"),
+    (43, "2021-07-01")])
+def test_headertable_reference_epoch(raw_epoch, epoch):
+    words = np.array([[0, raw_epoch << 24, 4, 0, 0, 0, 0, 0]], dtype="<u4")
+    table = decode_header_words(words)
+    assert table["reference_epoch"][0] == np.datetime64(epoch)
+
+def test_headertable_extended_data():
+    words = np.array([[0, 0, 4, 0, 0x03abcdef, 5, 6, 7]], dtype="<u4")
+    table = decode_header_words(words)
+    assert table["extended_data_version"][0] == 3
+    assert list(table["extended_data"][0]) == [0xabcdef, 5, 6, 7]
+
+
+# test encoding of tables back into header words
+
+def _random_words(count: int) -> "np.ndarray":
+    rng = np.random.default_rng(5)
+    words = rng.integers(0, 1 << 32, size=(count, 8), dtype=np.uint64)
+    words = words.astype("<u4")
+    # 2-digit ASCII station ids (e.g. "12") read the same as numeric ones, so
+    # keep first char of station id above digits
+    words[:, 3] = (words[:, 3] & 0xffff00ff) | 0x4000
+    return words
+
+def test_headertable_encode_file(test_filepath):
+    _, words = read_header_words(test_filepath, count=1000)
+    encoded = encode_header_table(decode_header_words(words))
+    assert encoded.dtype == np.dtype("<u4")
+    assert (encoded == words).all()
+
+def test_headertable_encode_random():
+    words = _random_words(1000)
+    encoded = encode_header_table(decode_header_words(words))
+    assert encoded.tobytes() == words.tobytes()
+
+@pytest.mark.parametrize("raw_station, station_id", [
+    (0x4d70, "Mp"),
+    (0x4100, "A"),
+    (125, "125"),
+    (0x2fff, "12287")])
+def test_headertable_encode_station_id(raw_station, station_id):
+    words = encode_header_table({"station_id": [station_id]})
+    assert words[0, 3] == raw_station
+
+def test_headertable_encode_columns():
+    words = encode_header_table({
+        "seconds_from_epoch": np.arange(3),
+        "reference_epoch": np.array(["2021-07-01"] * 3, dtype="<M8[s]"),
+        "num_channels": [4, 4, 4],
+        "data_frame_length": [8032, 8032, 8032],
+        "data_type": ["real", "complex", "real"],
+        "thread_id": [0, 1, 2]})
+    table = decode_header_words(words)
+    assert list(table["seconds_from_epoch"]) == [0, 1, 2]
+    assert (table["reference_epoch"] == np.datetime64("2021-07-01")).all()
+    assert list(table["num_channels"]) == [4, 4, 4]
+    assert list(table["data_type"]) == ["real", "complex", "real"]
+    assert list(table["thread_id"]) == [0, 1, 2]
+    # fields left out are zero bits
+    assert list(table["bits_per_sample"]) == [1, 1, 1]
+
+@pytest.mark.parametrize("columns", [
+    {"thread_id": [1024]},
+    {"seconds_from_epoch": [-1]},
+    {"station_id": ["ABC"]},
+    {"station_id": ["\u0100A"]},
+    {"station_id": ["12288"]},
+    {"thread_id": [0, 1], "data_frame_number": [0]}])
+def test_headertable_encode_invalid(columns):
+    with pytest.raises(ValueError):
+        encode_header_table(columns)
+
+@pytest.mark.parametrize("columns, message", [
+    ({"num_channels": [4, 6]}, "num_channels must be power of 2."),
+    ({"num_channels": [0]}, "num_channels must be power of 2."),
+    ({"data_frame_length": [8032, 8033]},
+        "data_frame_length must be multiple of 8."),
+    ({"reference_epoch": np.array(["2021-03-01"], dtype="<M8[s]")},
+        "reference_epoch can only be Jan or Jul 1st."),
+    ({"reference_epoch": np.array(["2021-07-02"], dtype="<M8[s]")},
+        "reference_epoch can only be Jan or Jul 1st."),
+    ({"reference_epoch": [datetime(2021, 3, 1, tzinfo=timezone.utc)]},
+        "reference_epoch can only be Jan or Jul 1st."),
+    ({"reference_epoch": np.array(["1999-07-01"], dtype="<M8[s]")},
+        "reference_epoch can only be post-2000."),
+    ({"data_type": ["real", "Complex"]}, "Cannot assign value Complex"),
+    ({"bits_per_sample": [0]}, "bits_per_sample must be >= 1.")])
+def test_headertable_encode_invalid_as_setters(columns, message):
+    # same values and messages as VDIFHeader property setters
+    with pytest.raises(ValueError, match=re.escape(message)):
+        encode_header_table(columns)
+
+def test_headertable_encode_aware_epochs():
+    epochs = [datetime(2021, 7, 1, tzinfo=timezone.utc),
+        datetime(2022, 1, 1, 10, tzinfo=timezone(timedelta(hours=10)))]
+    table = decode_header_words(encode_header_table(
+        {"reference_epoch": epochs}))
+    assert list(table["reference_epoch"]) == [np.datetime64("2021-07-01"),
+        np.datetime64("2022-01-01")]
+
+
+# test decoding of extended data
+
+@pytest.mark.parametrize("version", [0x01, 0x02, 0x03, 0x04, 0xab])
+def test_headertable_extended_data_matches_parse(version):
+    words = _random_words(200)
+    words[:, 4] = (words[:, 4] & 0xffffff) | (version << 24)
+    table = decode_extended_data(words, version)
+    assert len(table.dtype.names) == len(
+        Field._extended_data_layout(version))
+    for row, header_words in zip(table, words.tolist()):
+        extended_data = Field.EXTENDED_DATA._from_words(header_words)
+        assert list(extended_data) == [Field(name)
+            for name in table.dtype.names]
+        for field, value in extended_data.items():
+            assert row[field.value] == value
+
+def test_headertable_extended_data_other_version():
+    words = _random_words(10)
+    words[:, 4] = (words[:, 4] & 0xffffff) | (0x03 << 24)
+    words[::2, 4] = (words[::2, 4] & 0xffffff) | (0x01 << 24)
+    table = decode_extended_data(words, 0x03)
+    assert (table["sync_word"][::2] == 0).all()
+    assert (table["sync_word"][1::2] == words[1::2, 5]).all()
+    assert decode_extended_data(words, 0x00).dtype.names == ()
+
+def test_headertable_extended_data_file(tmp_path):
+    from vdifheader.generator import generate_file
+    output_filepath = str(tmp_path / "edv4.vdif")
+    generate_file(output_filepath, 20, data_frame_length=64,
+        extended_data_version=4)
+    table = get_extended_data_table(output_filepath)
+    assert len(table) == 20
+    assert table.dtype.names == ("validity_mask_length", "sync_word",
+        "validity_mask")
+    assert len(get_extended_data_table(output_filepath, count=5,
+        version=1)) == 5
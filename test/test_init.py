@@ -1,4 +1,5 @@
-import os, pytest
+import asyncio, os, pytest
+from datetime import timedelta
 from vdifheader import *
 
 HEADER_BYTES = 32
@@ -8,6 +9,8 @@ HEADER_BYTES = 32
 # test internal core of get_headers() method
 # test finding of first header within files
 # test finding of headers within files
+# test scanning past damaged headers within files
+# test asynchronous finding of headers within files
 
 
 # test that the expected test file is present
@@ -51,3 +54,236 @@ def test_init_get_headers(test_filepath, count, result_count):
         headers.append(header)
     assert len(headers) == result_count
     assert first_header == headers[0]
+
+
+# test memory mapped scanning of headers within files
+
+@pytest.mark.fast
+@pytest.mark.parametrize("count", [1, 5, 100])
+def test_init_get_headers_memory_map(test_filepath, count):
+    read_headers = list(get_headers(test_filepath, count=count))
+    mapped_headers = list(get_headers(test_filepath, count=count, 
+        memory_map=True))
+    assert len(mapped_headers) == count
+    assert mapped_headers == read_headers
+
+@pytest.mark.fast
+def test_init_get_headers_memory_map_empty(tmp_path):
+    empty_filepath = tmp_path / "empty.vdif"
+    empty_filepath.write_bytes(b"")
+    assert list(get_headers(str(empty_filepath), memory_map=True)) == []
+
+
+# test finding of headers within a time window
+
+@pytest.fixture
+def timed_filepath(test_filepath, tmp_path):
+    # 40 frames, 4 per second, starting at second 7100400 of 2021-07-01 epoch
+    with open(test_filepath, "rb") as input_file:
+        first_frame = input_file.read(8032)
+    first_seconds = int.from_bytes(first_frame[:4], "little")
+    timed_filepath = tmp_path / "timed.vdif"
+    with open(timed_filepath, "wb") as output_file:
+        for frame_num in range(40):
+            seconds = first_seconds + (frame_num // 4)
+            output_file.write(seconds.to_bytes(4, "little"))
+            output_file.write(first_frame[4:])
+    return str(timed_filepath)
+
+@pytest.mark.fast
+@pytest.mark.parametrize("start_second, end_second, result_count", [
+    (0, 10, 40),
+    (3, 5, 8),
+    (-5, 1, 4),
+    (9, 20, 4),
+    (10, 20, 0),
+    (5, 5, 0)])
+def test_init_get_headers_between(timed_filepath, start_second, end_second, 
+        result_count):
+    first_timestamp = get_first_header(timed_filepath).get_timestamp()
+    start = first_timestamp + timedelta(seconds=start_second)
+    end = first_timestamp + timedelta(seconds=end_second)
+    headers = list(get_headers_between(timed_filepath, start, end))
+    assert len(headers) == result_count
+    expected = [header for header in get_headers(timed_filepath) 
+        if start <= header.get_timestamp() < end]
+    assert headers == expected
+
+
+# test finding of headers within files without validation
+
+@pytest.mark.fast
+def test_init_get_headers_unvalidated(test_filepath):
+    headers = list(get_headers(test_filepath, count=10, validate=False))
+    assert headers == list(get_headers(test_filepath, count=10))
+
+
+# test scanning past damaged headers within files
+
+NUM_FRAMES = 20
+
+@pytest.fixture
+def frames(test_filepath):
+    frame_length = get_first_header(test_filepath).data_frame_length
+    with open(test_filepath, "rb") as input_file:
+        return bytearray(input_file.read(NUM_FRAMES * frame_length))
+
+def _write(tmp_path, frames: bytearray) -> str:
+    damaged_filepath = tmp_path / "damaged.vdif"
+    damaged_filepath.write_bytes(frames)
+    return str(damaged_filepath)
+
+def _set_length(frames: bytearray, frame_num: int, frame_length: int, 
+        new_length: int):
+    offset = frame_num * frame_length + 8   # word 2 holds length in 8 bytes
+    frames[offset:offset + 3] = (new_length // 8).to_bytes(3, "little")
+
+@pytest.mark.fast
+def test_init_get_headers_errors_invalid(test_filepath):
+    with pytest.raises(ValueError):
+        list(get_headers(test_filepath, errors="ignore"))
+
+@pytest.mark.fast
+@pytest.mark.parametrize("errors", ["skip", "resync"])
+def test_init_get_headers_errors_length_zero(test_filepath, tmp_path, frames,
+        errors):
+    frame_length = len(frames) // NUM_FRAMES
+    _set_length(frames, 5, frame_length, 0)
+    damaged_filepath = _write(tmp_path, frames)
+    with pytest.raises(ValueError):
+        list(get_headers(damaged_filepath))
+    damaged_ranges = []
+    headers = list(get_headers(damaged_filepath, errors=errors, 
+        damaged_ranges=damaged_ranges))
+    assert len(headers) == NUM_FRAMES - 1
+    frame_numbers = [header.data_frame_number 
+        for header in get_headers(test_filepath, count=NUM_FRAMES)]
+    del frame_numbers[5]
+    assert [header.data_frame_number for header in headers] == frame_numbers
+    assert damaged_ranges == [(5 * frame_length, 6 * frame_length)]
+
+@pytest.mark.fast
+def test_init_get_headers_errors_resync_mangled_length(tmp_path, frames):
+    frame_length = len(frames) // NUM_FRAMES
+    _set_length(frames, 5, frame_length, 4000)
+    damaged_ranges = []
+    headers = list(get_headers(_write(tmp_path, frames), errors="resync",
+        damaged_ranges=damaged_ranges))
+    expected = list(get_headers(_write(tmp_path, frames), count=5))
+    assert headers[:5] == expected
+    assert len(headers) == NUM_FRAMES - 1
+    assert all(h.data_frame_length == frame_length for h in headers)
+    assert damaged_ranges == [(5 * frame_length, 6 * frame_length)]
+
+@pytest.mark.fast
+def test_init_get_headers_errors_resync_garbage(tmp_path, frames):
+    frame_length = len(frames) // NUM_FRAMES
+    garbage = bytes((i * 37 + 11) % 256 for i in range(100))
+    frames[6 * frame_length:6 * frame_length] = garbage
+    damaged_ranges = []
+    headers = list(get_headers(_write(tmp_path, frames), errors="resync",
+        damaged_ranges=damaged_ranges))
+    assert len(headers) == NUM_FRAMES
+    assert damaged_ranges == [(6 * frame_length, 6 * frame_length + 100)]
+
+@pytest.mark.fast
+@pytest.mark.parametrize("new_length", [4000, 8032 * 100, 16])
+def test_init_get_headers_errors_skip_mangled_length(tmp_path, frames,
+        new_length):
+    frame_length = len(frames) // NUM_FRAMES
+    _set_length(frames, 5, frame_length, new_length)
+    damaged_ranges = []
+    headers = list(get_headers(_write(tmp_path, frames), errors="skip",
+        damaged_ranges=damaged_ranges))
+    assert len(headers) == NUM_FRAMES - 1
+    assert all(h.data_frame_length == frame_length for h in headers)
+    assert damaged_ranges == [(5 * frame_length, 6 * frame_length)]
+
+@pytest.mark.fast
+def test_init_get_headers_errors_skip_first_length(tmp_path, frames):
+    # nothing to skip by, so rest of file is damaged, rather than ignored
+    frame_length = len(frames) // NUM_FRAMES
+    _set_length(frames, 0, frame_length, 4000)
+    damaged_ranges = []
+    headers = list(get_headers(_write(tmp_path, frames), errors="skip",
+        damaged_ranges=damaged_ranges))
+    assert headers == []
+    assert damaged_ranges == [(0, len(frames))]
+
+@pytest.mark.fast
+@pytest.mark.parametrize("errors", ["skip", "resync"])
+def test_init_get_headers_errors_generated(tmp_path, errors):
+    from vdifheader.generator import VDIFFaults, generate_file
+    output_filepath = str(tmp_path / "bad_lengths.vdif")
+    counts = generate_file(output_filepath, 2000, data_frame_length=1024,
+        faults=VDIFFaults(bad_length_rate=0.01), seed=1)
+    damaged_ranges = []
+    headers = list(get_headers(output_filepath, errors=errors,
+        damaged_ranges=damaged_ranges))
+    assert len(damaged_ranges) == counts["bad_lengths"] > 0
+    assert len(headers) == counts["frames"] - counts["bad_lengths"]
+
+@pytest.mark.fast
+@pytest.mark.parametrize("errors", ["skip", "resync"])
+def test_init_get_headers_errors_memory_map(tmp_path, frames, errors):
+    frame_length = len(frames) // NUM_FRAMES
+    _set_length(frames, 5, frame_length, 0)
+    damaged_filepath = _write(tmp_path, frames)
+    read_ranges, mapped_ranges = [], []
+    headers = list(get_headers(damaged_filepath, errors=errors,
+        damaged_ranges=read_ranges))
+    stats = VDIFScanStats()
+    assert list(get_headers(damaged_filepath, errors=errors, memory_map=True,
+        damaged_ranges=mapped_ranges, stats=stats)) == headers
+    assert mapped_ranges == read_ranges
+    # headers come from the map, not from reads of the file
+    assert stats.reads == 0
+
+
+# test asynchronous finding of headers within files
+
+async def _acollect(input_filepath: str, **kwargs) -> list:
+    return [header async for header in aget_headers(input_filepath, **kwargs)]
+
+@pytest.mark.fast
+@pytest.mark.parametrize("count, batch_size", [(1, 10), (25, 10), (30, 10)])
+def test_init_aget_headers(test_filepath, count, batch_size):
+    headers = asyncio.run(_acollect(test_filepath, count=count, 
+        batch_size=batch_size))
+    assert headers == list(get_headers(test_filepath, count=count))
+
+@pytest.mark.fast
+def test_init_aget_headers_options(test_filepath):
+    records = asyncio.run(_acollect(test_filepath, count=5, compact=True))
+    assert records == list(get_headers(test_filepath, count=5, compact=True))
+
+@pytest.mark.fast
+@pytest.mark.parametrize("memory_map, reads", [(None, 0), (False, 100)])
+def test_init_aget_headers_memory_map(test_filepath, memory_map, reads):
+    stats = VDIFScanStats()
+    kwargs = {} if memory_map is None else {"memory_map": memory_map}
+    headers = asyncio.run(_acollect(test_filepath, count=100, batch_size=16,
+        stats=stats, **kwargs))
+    assert headers == list(get_headers(test_filepath, count=100))
+    # headers are sliced from the map, not read, unless asked otherwise
+    assert stats.reads == reads
+
+@pytest.mark.fast
+def test_init_aget_headers_concurrent(test_filepath, tmp_path):
+    other_filepath = tmp_path / "other.vdif"
+    with open(test_filepath, "rb") as input_file:
+        other_filepath.write_bytes(input_file.read(8032 * 40))
+    async def scan_both():
+        return await asyncio.gather(
+            _acollect(test_filepath, count=100, batch_size=16),
+            _acollect(str(other_filepath), batch_size=16))
+    headers, other_headers = asyncio.run(scan_both())
+    assert len(headers) == 100
+    assert other_headers == headers[:40]
+
+@pytest.mark.fast
+def test_init_aget_headers_break(test_filepath):
+    async def first_header():
+        async for header in aget_headers(test_filepath, batch_size=4):
+            return header
+    assert asyncio.run(first_header()) == get_first_header(test_filepath)
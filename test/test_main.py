@@ -1,4 +1,4 @@
-import os, pytest, sys
+import io, os, pytest, sys
 from vdifheader._utils import sanitized_path
 from vdifheader.__main__ import *
 pytestmark = pytest.mark.fast
@@ -7,6 +7,9 @@ pytestmark = pytest.mark.fast
 # ... stringified path
 # ... escaped path
 # ... path with sh vars
+# test handling of command line args
+# test handling of format and stats args
+# test run of main() method
 
 
 # test handling of command line args
@@ -22,6 +25,10 @@ pytestmark = pytest.mark.fast
     ("--values", VDIFOutputMode.VALUES), 
     ("-b", VDIFOutputMode.BINARY), 
     ("--binary", VDIFOutputMode.BINARY),
+    ("-g", VDIFOutputMode.GAPS),
+    ("--gaps", VDIFOutputMode.GAPS),
+    ("-s", VDIFOutputMode.SUMMARY),
+    ("--summary", VDIFOutputMode.SUMMARY),
     ("", VDIFOutputMode.VALUES)])
 @pytest.mark.parametrize("input_arg, input_file", [
     ("./test.vdif", sanitized_path("./test.vdif"))])
@@ -34,8 +41,68 @@ def test_main_arg_parser(headers_arg, num_headers, output_arg, output_mode, inpu
     assert parsed_args["input_file"] == input_file
 
 
+# test handling of format and stats args
+
+@pytest.mark.parametrize("output_format", ["jsonl", "csv", "tsv"])
+def test_main_arg_parser_format(test_filepath, output_format):
+    assert vars(arg_parser().parse_args([test_filepath]))["output_format"] is None
+    parsed_args = vars(arg_parser().parse_args(["-f", output_format, test_filepath]))
+    assert parsed_args["output_format"] == output_format
+    with pytest.raises(SystemExit):
+        arg_parser().parse_args(["--format", "xml", test_filepath])
+
+def test_main_arg_parser_stats(test_filepath):
+    assert vars(arg_parser().parse_args([test_filepath]))["show_stats"] is False
+    parsed_args = vars(arg_parser().parse_args(["--stats", test_filepath]))
+    assert parsed_args["show_stats"] is True
+
+@pytest.mark.parametrize("count_args, count_given", [
+    ([], False),
+    (["-a"], False),
+    (["-n", "1"], True)])
+def test_main_arg_parser_count_given(test_filepath, count_args, count_given):
+    parsed_args = vars(arg_parser().parse_args(count_args + [test_filepath]))
+    assert parsed_args["num_headers"] in [1, -1]
+    assert parsed_args["count_given"] is count_given
+
+
 # test run of main() method
 
+def test_main_method_gaps(test_filepath):
+    sys.argv = ["vdifheader.py", "--gaps", test_filepath]
+    main()
+
+def test_main_method_summary(test_filepath):
+    sys.argv = ["vdifheader.py", "--summary", test_filepath]
+    main()
+
+def test_main_method_format(test_filepath):
+    sys.argv = ["vdifheader.py", "-n", "5", "--format", "csv", test_filepath]
+    main()
+
+def test_main_method_stats(test_filepath):
+    sys.argv = ["vdifheader.py", "-n", "5", "--stats", test_filepath]
+    main()
+
+@pytest.mark.parametrize("mode_arg", ["-g", "-s", "-x"])
+def test_main_method_stats_invalid(test_filepath, mode_arg):
+    sys.argv = ["vdifheader.py", mode_arg, "--stats", test_filepath]
+    with pytest.raises(SystemExit):
+        main()
+
+@pytest.mark.parametrize("mode_arg", ["-g", "-s"])
+def test_main_method_index_invalid(test_filepath, mode_arg):
+    sys.argv = ["vdifheader.py", mode_arg, "-x", test_filepath]
+    with pytest.raises(SystemExit):
+        main()
+
+def test_main_method_summary_count(test_filepath, monkeypatch):
+    output = io.StringIO()
+    monkeypatch.setattr("vdifheader.summary.stdout", output)
+    sys.argv = ["vdifheader.py", "-s", "-n", "1", test_filepath]
+    main()
+    assert "Frames: 1 (" in output.getvalue()
+
 def test_main_method(test_filepath):
     sys.argv = ["vdifheader.py", test_filepath]
     main()
\ No newline at end of file
@@ -0,0 +1,87 @@
+import pytest
+np = pytest.importorskip("numpy")
+from vdifheader import *
+from vdifheader.parallel import *
+pytestmark = pytest.mark.fast
+
+# test that parallel scan matches single-process scan
+# test that merge recovers from ranges that resynchronise wrongly
+
+
+# test that parallel scan matches single-process scan
+
+@pytest.fixture
+def short_filepath(test_filepath, tmp_path):
+    frame_length = get_first_header(test_filepath).data_frame_length
+    with open(test_filepath, "rb") as input_file:
+        frames = input_file.read(200 * frame_length + 20)  # ends part-header
+    short_filepath = tmp_path / "short.vdif"
+    short_filepath.write_bytes(frames)
+    return str(short_filepath)
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("range_frames", [1, 7, 1000])
+def test_parallel_matches_sequential(short_filepath, workers, range_frames):
+    table = get_header_table(short_filepath)
+    range_bytes = range_frames * int(table["data_frame_length"][0])
+    offsets, parallel_table = scan_header_table(short_filepath,
+        workers=workers, range_bytes=range_bytes)
+    assert len(parallel_table) == 200
+    assert (parallel_table == table).all()
+    assert list(offsets) == [i * int(table["data_frame_length"][0])
+        for i in range(200)]
+
+def test_parallel_get_header_table(short_filepath):
+    table = get_header_table(short_filepath, count=50)
+    assert (get_header_table(short_filepath, count=50, workers=2) == table).all()
+
+@pytest.mark.parametrize("range_frames", [7, 1000])
+def test_parallel_count(short_filepath, monkeypatch, range_frames):
+    import vdifheader.parallel as parallel
+    table = get_header_table(short_filepath)
+    frame_length = int(table["data_frame_length"][0])
+    scanned = []
+    byte_ranges = parallel._byte_ranges
+    def _byte_ranges(file_bytes, *args):
+        scanned.append(file_bytes)
+        return byte_ranges(file_bytes, *args)
+    monkeypatch.setattr(parallel, "_byte_ranges", _byte_ranges)
+    offsets, count_table = scan_header_table(short_filepath, workers=2,
+        range_bytes=range_frames * frame_length, count=30)
+    # only the bytes holding the first 30 frames are scanned
+    assert scanned == [30 * frame_length]
+    assert (count_table == table[:30]).all()
+    assert list(offsets) == [i * frame_length for i in range(30)]
+    assert len(scan_header_table(short_filepath, workers=2, count=500)[1]) \
+        == 200
+
+
+# test that merge recovers from ranges that resynchronise wrongly
+
+def _frame(frame_length: int) -> "np.ndarray":
+    frame = np.zeros(frame_length // 4, dtype="<u4")
+    frame[2] = frame_length // 8
+    return frame
+
+def test_parallel_variable_lengths(tmp_path):
+    lengths = [64] * 5 + [40] * 7 + [64] * 5 + [200] + [64] * 3
+    buffer = np.concatenate([_frame(length) for length in lengths])
+    filepath = tmp_path / "variable.vdif"
+    filepath.write_bytes(buffer.tobytes())
+    offsets, table = scan_header_table(str(filepath), workers=1,
+        range_bytes=64)
+    assert list(table["data_frame_length"]) == lengths
+    assert list(offsets) == list(np.cumsum([0] + lengths[:-1]))
+
+def test_parallel_invalid_length(tmp_path):
+    buffer = np.concatenate([_frame(64), _frame(64), np.zeros(16, "<u4")])
+    filepath = tmp_path / "invalid.vdif"
+    filepath.write_bytes(buffer.tobytes())
+    with pytest.raises(ValueError):
+        scan_header_table(str(filepath), workers=1, range_bytes=64)
+
+def test_parallel_empty(tmp_path):
+    filepath = tmp_path / "empty.vdif"
+    filepath.write_bytes(b"")
+    offsets, table = scan_header_table(str(filepath))
+    assert len(offsets) == len(table) == 0
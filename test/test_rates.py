@@ -0,0 +1,117 @@
+import pytest
+from datetime import timedelta
+from vdifheader import *
+from vdifheader.rates import VDIFRateEstimate
+pytestmark = pytest.mark.fast
+
+# test inference of rates from files
+# test confidence checks
+# test derived rates and offsets
+# test sub-second timestamps
+
+
+def _estimator(seconds: range, fps: int, thread_ids: list=[0],
+        frame_format: tuple=(8032, 2, 2, "real")) -> VDIFRateEstimator:
+    estimator = VDIFRateEstimator()
+    for second in seconds:
+        for frame_num in range(fps):
+            for thread_id in thread_ids:
+                estimator.add(thread_id, second, frame_num, *frame_format)
+    return estimator
+
+
+# test inference of rates from files
+
+def test_rates_file(test_filepath):
+    estimator = infer_rates(test_filepath)
+    assert estimator.thread_ids == [0]
+    assert estimator.frames_per_second == 10000
+    assert estimator.data_rate == 8032 * 8 * 10000
+    estimate = estimator.estimate(0)
+    assert estimate.is_confident
+    assert estimate.num_seconds == 2
+
+def test_rates_file_partial_second(test_filepath):
+    estimate = infer_rates(test_filepath, count=100).estimate(0)
+    assert estimate.frames_per_second == 100
+    assert not estimate.is_confident
+
+
+# test confidence checks
+
+def test_rates_threads():
+    estimator = _estimator(range(4), 8, thread_ids=[0, 3])
+    assert estimator.thread_ids == [0, 3]
+    assert estimator.frames_per_second == 8
+    assert all(e.is_confident for e in estimator.estimates.values())
+    assert estimator.estimate(1) is None
+
+def test_rates_add_frame():
+    estimator = VDIFRateEstimator()
+    for second in range(3):
+        for frame_num in range(8):
+            estimator.add_frame(0, second, frame_num)
+        for frame_num in range(4):
+            estimator.add_frame(1, second, frame_num)
+    assert estimator.frames_per_second is None
+    assert estimator.max_frames_per_second == 8
+    # no format fields, so no estimates
+    assert estimator.estimate(0) is None
+    assert estimator.estimates == {}
+
+def test_rates_partial_first_second():
+    estimator = VDIFRateEstimator()
+    for second, frame_num in [(0, 5), (0, 6), (0, 7)] + \
+            [(s, f) for s in range(1, 4) for f in range(8)]:
+        estimator.add(0, second, frame_num, 8032, 2, 2, "real")
+    estimate = estimator.estimate(0)
+    assert estimate.frames_per_second == 8
+    assert estimate.is_confident
+
+def test_rates_disagreeing_seconds():
+    estimator = VDIFRateEstimator()
+    for second, last_frame in [(0, 7), (1, 5), (2, 0)]:
+        for frame_num in range(last_frame + 1):
+            estimator.add(0, second, frame_num, 8032, 2, 2, "real")
+    estimate = estimator.estimate(0)
+    assert estimate.frames_per_second == 8
+    assert not estimate.is_confident
+
+def test_rates_format_change():
+    estimator = _estimator(range(3), 4)
+    estimator.add(0, 3, 0, 4032, 2, 2, "real")
+    assert "frame format changed within stream" in \
+        estimator.estimate(0).issues
+
+
+# test derived rates and offsets
+
+@pytest.mark.parametrize("frame_format, samples_per_frame", [
+    ((8032, 2, 2, "real", False), 16000),
+    ((8032, 2, 2, "complex", False), 8000),
+    ((8016, 1, 8, "real", True), 8000),
+    ((1056, 4, 1, "real", False), 2048)])
+def test_rates_samples(frame_format, samples_per_frame):
+    estimate = VDIFRateEstimate(0, 100, *frame_format, 2, [])
+    assert estimate.samples_per_frame == samples_per_frame
+    assert estimate.sample_rate == samples_per_frame * 100
+
+def test_rates_frame_offset():
+    estimate = _estimator(range(3), 10).estimate(0)
+    assert estimate.frame_offset((5, 0), (5, 0)) == 0
+    assert estimate.frame_offset((5, 3), (6, 2)) == 9 * 8032
+    assert estimate.frame_offset((5, 0), (6, 0), num_threads=4) == 40 * 8032
+
+
+# test sub-second timestamps
+
+def test_rates_subsecond_timestamp(test_filepath):
+    headers = list(get_headers(test_filepath, count=3))
+    fps = infer_rates(test_filepath).frames_per_second
+    first = headers[0].get_timestamp(fps)
+    assert first == headers[0].get_timestamp() + timedelta(
+        seconds=headers[0].data_frame_number / fps)
+    assert headers[2].get_timestamp(fps) - first == timedelta(
+        microseconds=200)
+    record = list(get_headers(test_filepath, count=3, compact=True))[2]
+    assert record.get_timestamp(fps) == headers[2].get_timestamp(fps)
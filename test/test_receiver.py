@@ -0,0 +1,173 @@
+import socket, threading, pytest
+np = pytest.importorskip("numpy")
+from vdifheader import *
+from vdifheader.receiver import *
+pytestmark = pytest.mark.fast
+
+# test receiving whole frames from a loopback sender
+# test reporting of lost and reordered packets
+# test VTP sequence numbers
+
+
+@pytest.fixture
+def receiver():
+    with VDIFReceiver(host="127.0.0.1", frames_per_second=10000,
+            ring_packets=64, batch_packets=16) as receiver:
+        yield receiver
+
+@pytest.fixture
+def headers(test_filepath):
+    # header only packets, so that a few fit in socket buffer before receiving
+    with open(test_filepath, "rb") as input_file:
+        frame = input_file.read(32)
+    first = np.frombuffer(frame, dtype="<u4")
+    headers = np.tile(first, (40, 1))
+    headers[:, 1] = (first[1] & 0xff000000) | np.arange(40)
+    return headers
+
+def _send(packets: list, address: tuple):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+        for packet in packets:
+            sender.sendto(packet, address)
+
+
+# test receiving whole frames from a loopback sender
+
+def test_receiver_loopback_file(receiver, test_filepath):
+    received = []
+    thread = threading.Thread(target=lambda: received.append(
+        receiver.receive(max_packets=100, timeout=5.0)))
+    thread.start()
+    sent = send_file(test_filepath, receiver.address, count=100)
+    thread.join()
+    assert sent == 100
+    report = receiver.report
+    # loopback can drop packets if receiver falls behind, but never reorders
+    assert report.packets == received[0] <= 100
+    assert report.invalid == 0
+    assert list(report.threads) == [0]
+    thread_report = report.threads[0]
+    assert thread_report.reordered == 0
+    assert thread_report.packets + thread_report.lost <= 100
+    assert report.vtp_lost is None
+
+def test_receiver_decodes_in_place(receiver, headers):
+    _send([header.tobytes() for header in headers[:20]], receiver.address)
+    assert receiver.receive(timeout=0.5) == 20
+    # 20 packets is one whole batch and one partial batch of 4
+    assert receiver.last_batch.shape == (4, 8)
+    assert (receiver.last_batch == headers[16:20]).all()
+    assert (receiver.ring[:20, :32].copy().view("<u4") == headers[:20]).all()
+
+def test_receiver_wraps_after_partial_batch(headers):
+    with VDIFReceiver(host="127.0.0.1", frames_per_second=10000,
+            ring_packets=8, batch_packets=4) as receiver:
+        _send([header.tobytes() for header in headers[:2]], receiver.address)
+        assert receiver.receive(timeout=0.5) == 2
+        # next batches start mid-ring, so must end at end of ring to wrap
+        _send([header.tobytes() for header in headers[2:22]],
+            receiver.address)
+        assert receiver.receive(timeout=0.5) == 20
+        assert receiver.report.packets == 22
+        assert receiver.report.threads[0].lost == 0
+        # slots 2..7 then 0..7 then 0..5, so last batch is slots 4..5
+        assert (receiver.last_batch == headers[20:22]).all()
+        assert (receiver.ring[:6, :32].copy().view("<u4") ==
+            headers[16:22]).all()
+
+def test_receiver_latency(receiver, headers):
+    _send([header.tobytes() for header in headers[:5]], receiver.address)
+    receiver.receive(timeout=0.5)
+    thread_report = receiver.report.threads[0]
+    # test file was recorded long before now
+    assert thread_report.latency_min > 3600
+    assert thread_report.latency_min <= thread_report.latency_mean <= \
+        thread_report.latency_max
+
+def test_receiver_short_packet(receiver, headers):
+    _send([headers[0].tobytes(), b"short"], receiver.address)
+    receiver.receive(timeout=0.5)
+    report = receiver.report
+    assert report.packets == 2
+    assert report.invalid == 1
+    assert report.threads[0].packets == 1
+
+
+# test reporting of lost and reordered packets
+
+def test_receiver_lost(receiver, headers):
+    order = [0, 1, 2, 5, 6, 9]
+    _send([headers[i].tobytes() for i in order], receiver.address)
+    receiver.receive(timeout=0.5)
+    thread_report = receiver.report.threads[0]
+    assert thread_report.packets == 6
+    assert thread_report.lost == 4
+    assert thread_report.reordered == 0
+
+def test_receiver_reordered(receiver, headers):
+    order = [0, 2, 1, 3, 6, 4, 5, 7]
+    _send([headers[i].tobytes() for i in order], receiver.address)
+    receiver.receive(timeout=0.5)
+    thread_report = receiver.report.threads[0]
+    assert thread_report.lost == 0
+    assert thread_report.reordered == 3
+
+def test_receiver_reordered_across_batches(receiver, headers):
+    order = list(range(15)) + [16, 15] + list(range(17, 20))
+    _send([headers[i].tobytes() for i in order], receiver.address)
+    receiver.receive(timeout=0.5)
+    assert receiver.report.threads[0].reordered == 1
+
+def test_receiver_across_seconds(headers):
+    headers[:, 0] += np.repeat([0, 1], 20).astype(np.uint32)
+    headers[:, 1] = (headers[:, 1] & 0xff000000) | np.tile(np.arange(20), 2)
+    with VDIFReceiver(host="127.0.0.1") as receiver:
+        order = [i for i in range(40) if i != 21]
+        _send([headers[i].tobytes() for i in order], receiver.address)
+        receiver.receive(timeout=0.5)
+        # frame rate is inferred from highest frame number seen
+        assert receiver.report.threads[0].lost == 1
+
+def test_receiver_to_dict(receiver, headers):
+    _send([headers[0].tobytes()], receiver.address)
+    receiver.receive(timeout=0.5)
+    report_dict = receiver.report.to_dict()
+    assert report_dict["packets"] == 1
+    assert report_dict["threads"][0]["thread_id"] == 0
+
+
+# test VTP sequence numbers
+
+def test_receiver_vtp(headers):
+    with VDIFReceiver(host="127.0.0.1", vtp=True) as receiver:
+        sequence = [10, 11, 12, 14]
+        _send([np.array([number], "<u8").tobytes() + headers[i].tobytes()
+            for i, number in enumerate(sequence)], receiver.address)
+        receiver.receive(timeout=0.5)
+        report = receiver.report
+        assert report.vtp_lost == 1
+        assert report.threads[0].packets == 4
+        assert (receiver.last_batch == headers[:4]).all()
+
+def test_receiver_vtp_loopback_file(test_filepath):
+    with VDIFReceiver(host="127.0.0.1", vtp=True) as receiver:
+        thread = threading.Thread(target=receiver.receive,
+            kwargs={"max_packets": 50, "timeout": 5.0})
+        thread.start()
+        send_file(test_filepath, receiver.address, count=50, vtp=True)
+        thread.join()
+        report = receiver.report
+        assert report.vtp_lost + report.packets <= 50
+        assert report.invalid == 0
+
+def test_receiver_vtp_short_packet(headers):
+    with VDIFReceiver(host="127.0.0.1", vtp=True) as receiver:
+        # sequence number but no header is invalid, so is not counted as lost
+        packets = [np.array([number], "<u8").tobytes() + headers[i].tobytes()
+            for i, number in enumerate([10, 11, 13])]
+        packets.insert(2, np.array([12], "<u8").tobytes())
+        _send(packets, receiver.address)
+        receiver.receive(timeout=0.5)
+        report = receiver.report
+        assert report.invalid == 1
+        assert report.vtp_lost == 0
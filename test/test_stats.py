@@ -0,0 +1,80 @@
+import io, pytest
+from vdifheader import *
+from vdifheader.stats import *
+pytestmark = pytest.mark.fast
+
+# test counting of reads, seeks and frames
+# test timing of I/O, decoding and validation
+
+
+# test counting of reads, seeks and frames
+
+@pytest.mark.parametrize("kwargs, headers_read", [({}, 100),
+    ({"compact": True}, 100), ({"validate": False}, 100),
+    # skip also reads second header, to check first data_frame_length
+    ({"errors": "skip"}, 101)])
+def test_stats_counts(test_filepath, kwargs, headers_read):
+    stats = VDIFScanStats()
+    headers = list(get_headers(test_filepath, count=100, stats=stats,
+        **kwargs))
+    assert stats.frames_parsed == len(headers) == 100
+    assert stats.bytes_scanned == 100 * headers[0].data_frame_length
+    assert stats.bytes_read == headers_read * 32
+    assert stats.reads >= 100
+    assert stats.seeks >= 99
+
+def test_stats_memory_map(test_filepath):
+    # mapped pages are read while decoding, so no reads are counted
+    stats = VDIFScanStats()
+    list(get_headers(test_filepath, count=10, memory_map=True, stats=stats))
+    assert stats.frames_parsed == 10
+    assert stats.reads == stats.bytes_read == 0
+
+def test_stats_accumulate(test_filepath):
+    stats = VDIFScanStats()
+    for _ in range(2):
+        list(get_headers(test_filepath, count=10, stats=stats))
+    assert stats.frames_parsed == 20
+
+def test_stats_parse():
+    stats = VDIFScanStats()
+    with open("./test.vdif", "rb") as input_file:
+        raw_data = input_file.read(32)
+    header = VDIFHeader.parse(raw_data, stats=stats)
+    assert header == VDIFHeader.parse(raw_data)
+    assert stats.frames_parsed == 1
+
+def test_stats_file():
+    stats = VDIFScanStats()
+    stats_file = StatsFile(io.BytesIO(bytes(100)), stats)
+    assert len(stats_file.read(40)) == 40
+    stats_file.seek(10, 1)
+    assert stats_file.tell() == 50
+    assert (stats.reads, stats.seeks, stats.bytes_read) == (1, 1, 40)
+
+
+# test timing of I/O, decoding and validation
+
+def test_stats_timing(test_filepath):
+    stats = VDIFScanStats()
+    list(get_headers(test_filepath, count=100, stats=stats))
+    assert stats.io_seconds > 0
+    assert stats.decode_seconds > 0
+    assert stats.validation_seconds > 0
+    assert stats.elapsed_seconds >= stats.io_seconds + \
+        stats.decode_seconds + stats.validation_seconds
+    assert stats.frames_per_second > 0
+    assert stats.bytes_per_second > 0
+
+def test_stats_unvalidated(test_filepath):
+    stats = VDIFScanStats()
+    list(get_headers(test_filepath, count=10, validate=False, stats=stats))
+    assert stats.validation_seconds == 0
+
+def test_stats_to_dict(test_filepath):
+    stats = VDIFScanStats()
+    assert stats.to_dict()["frames_per_second"] == 0.0
+    list(get_headers(test_filepath, count=10, stats=stats))
+    stats_dict = stats.to_dict()
+    assert stats_dict["frames_parsed"] == 10
+    assert stats_dict["other_seconds"] >= 0
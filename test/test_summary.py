@@ -0,0 +1,80 @@
+import pytest
+np = pytest.importorskip("numpy")
+from datetime import datetime, timedelta, timezone
+from vdifheader import *
+from vdifheader.generator import VDIFFaults, generate_file
+from vdifheader.headertable import map_words
+from vdifheader.summary import *
+from vdifheader.vdifheaderfield import VDIFHeaderField as Field
+pytestmark = pytest.mark.fast
+
+# test summary of test file
+# test summary of generated multi-thread file
+# test summariser fed a chunk at a time
+
+
+# test summary of test file
+
+def test_summary_test_file(test_filepath, cached_header):
+    summary = summarise_file(test_filepath)
+    assert summary.num_frames == 30000
+    assert summary.num_bytes == 30000 * 8032
+    assert summary.thread_ids == [0]
+    assert summary.frame_lengths == [8032]
+    assert summary.station_ids == ["Tt"]
+    assert summary.extended_data_versions == [0]
+    assert summary.num_invalid == 0
+    assert summary.first_timestamp == cached_header.get_timestamp()
+    assert summary.time_span == timedelta(seconds=2)
+
+def test_summary_count(test_filepath):
+    summary = summarise_file(test_filepath, count=10)
+    assert summary.num_frames == 10
+    assert summary.histograms[Field.THREAD_ID] == {0: 10}
+    assert summary.time_span == timedelta(0)
+
+def test_summary_to_dict(test_filepath):
+    summary = summarise_file(test_filepath, count=10).to_dict()
+    assert summary["num_frames"] == 10
+    assert summary["first_timestamp"] == "2021-09-21T04:20:00+00:00"
+    assert summary["time_span_seconds"] == 0.0
+    assert summary["histograms"]["station_id"] == [["Tt", 10]]
+
+
+# test summary of generated multi-thread file
+
+def test_summary_generated(tmp_path):
+    output_filepath = str(tmp_path / "generated.vdif")
+    counts = generate_file(output_filepath, 3000, num_threads=3,
+        frames_per_second=100, data_frame_length=64, station_id="Mp",
+        start_seconds=50, extended_data_version=2,
+        faults=VDIFFaults(invalid_rate=0.1), seed=1)
+    summary = summarise_file(output_filepath)
+    assert summary.num_frames == counts["frames"]
+    assert summary.num_invalid == counts["invalid"] > 0
+    assert summary.thread_ids == [0, 1, 2]
+    assert summary.histograms[Field.THREAD_ID] == {0: 1000, 1: 1000, 2: 1000}
+    assert summary.station_ids == ["Mp"]
+    assert summary.extended_data_versions == [2]
+    assert summary.time_span == timedelta(seconds=9)
+    assert summary.first_timestamp == datetime(2021, 7, 1, tzinfo=timezone.utc) + \
+        timedelta(seconds=50)
+
+def test_summary_empty():
+    summary = VDIFSummariser().finish()
+    assert summary.num_frames == 0
+    assert summary.time_span is None
+    assert summary.thread_ids == []
+
+
+# test summariser fed a chunk at a time
+
+def test_summary_chunks(test_filepath):
+    words = map_words(test_filepath).reshape(-1, 8032 // 4)[:1000, :8]
+    summariser = VDIFSummariser()
+    for first in range(0, 1000, 300):
+        summariser.add_words(words[first:first + 300])
+    summary = summariser.finish()
+    assert summary.num_frames == 1000
+    assert summary.to_dict() == summarise_file(test_filepath,
+        count=1000).to_dict()
@@ -0,0 +1,81 @@
+import pytest
+np = pytest.importorskip("numpy")
+from vdifheader import *
+from vdifheader import VDIFHeaderField as Field
+from vdifheader.headertable import decode_header_words
+from vdifheader.validation import *
+pytestmark = pytest.mark.fast
+
+# test that a valid file breaks no rules
+# test counts, offsets and examples of broken rules
+# test that example list is bounded
+
+
+# test that a valid file breaks no rules
+
+def test_validation_valid_file(test_filepath):
+    report = validate_file(test_filepath, count=1000)
+    assert report.num_frames == 1000
+    assert report.is_valid
+    assert report.failures == []
+
+# test counts, offsets and examples of broken rules
+
+def _words(num_frames: int) -> "np.ndarray":
+    words = np.zeros((num_frames, 8), dtype="<u4")
+    words[:, 2] = 64 // 8
+    return words
+
+def _result(report: VDIFValidationReport, rule: str) -> VDIFValidationResult:
+    return [result for result in report.results if result.rule == rule][0]
+
+def test_validation_unassigned_field():
+    words = _words(10)
+    words[[2, 3, 7], 1] |= 1 << 30
+    offsets = np.arange(10) * 64
+    report = validate_header_table(decode_header_words(words), offsets)
+    result = _result(report, "unassigned_field")
+    assert not report.is_valid
+    assert report.failures == [result]
+    assert result.severity == ERROR
+    assert result.field == Field.UNASSIGNED_FIELD
+    assert result.count == 3
+    assert result.first_offset == 128
+    assert result.last_offset == 448
+    assert result.examples == [(128, 1), (192, 1), (448, 1)]
+
+def test_validation_warnings_only():
+    words = _words(4)
+    words[1, 0] |= 1 << 31
+    words[3, 4] = 0x42 << 24
+    offsets = np.arange(4) * 64
+    report = validate_header_table(decode_header_words(words), offsets)
+    assert report.is_valid
+    assert [result.rule for result in report.failures] == \
+        ["extended_data_version", "invalid_flag"]
+    assert _result(report, "extended_data_version").examples == [(192, 0x42)]
+    assert _result(report, "invalid_flag").first_offset == 64
+
+def test_validation_unequal_frame_lengths():
+    words = _words(3)
+    words[2, 2] = 128 // 8
+    report = validate_header_table(decode_header_words(words),
+        np.array([0, 64, 128]))
+    result = _result(report, "equal_frame_lengths")
+    assert result.count == 1
+    assert result.examples == [(128, 128)]
+
+
+# test that example list is bounded
+
+def test_validation_examples_bounded():
+    words = _words(100)
+    words[:, 1] |= 1 << 30
+    offsets = np.arange(100) * 64
+    result = _result(validate_header_table(decode_header_words(words), offsets),
+        "unassigned_field")
+    assert result.count == 100
+    assert len(result.examples) == MAX_EXAMPLES
+    assert result.first_offset == 0
+    assert result.last_offset == 99 * 64
+    assert result.to_dict()["count"] == 100
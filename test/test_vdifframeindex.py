@@ -0,0 +1,113 @@
+import os, pytest
+np = pytest.importorskip("numpy")
+from vdifheader import *
+pytestmark = pytest.mark.fast
+
+# test that index object can't be instantiated directly
+# test building, saving and loading of sidecar index files
+# test that stale index files are not reused
+# test lookup of headers by frame number
+# test lookup of headers by thread
+
+
+@pytest.fixture
+def small_filepath(test_filepath, tmp_path):
+    small_filepath = tmp_path / "small.vdif"
+    with open(test_filepath, "rb") as input_file:
+        small_filepath.write_bytes(input_file.read(8032 * 50))
+    return str(small_filepath)
+
+
+# test that index object can't be instantiated directly
+
+def test_vdifframeindex_init():
+    frame_index = None
+    with pytest.raises(NotImplementedError):
+        frame_index = VDIFFrameIndex()
+    assert frame_index == None
+
+
+# test building, saving and loading of sidecar index files
+
+def test_vdifframeindex_build(small_filepath):
+    frame_index = VDIFFrameIndex.build(small_filepath)
+    assert len(frame_index) == 50
+    assert list(frame_index.offsets[:3]) == [0, 8032, 16064]
+    assert frame_index.is_current
+    assert os.path.isfile(small_filepath + ".vdifidx")
+
+def test_vdifframeindex_load(small_filepath):
+    built_index = VDIFFrameIndex.build(small_filepath)
+    loaded_index = VDIFFrameIndex.load(small_filepath)
+    assert loaded_index is not None
+    assert np.array_equal(loaded_index.offsets, built_index.offsets)
+    assert np.array_equal(loaded_index.words, built_index.words)
+    assert np.array_equal(loaded_index.to_table(), 
+        get_header_table(small_filepath))
+
+def test_vdifframeindex_load_missing(small_filepath):
+    assert VDIFFrameIndex.load(small_filepath) is None
+
+def test_vdifframeindex_build_unsaved(small_filepath):
+    frame_index = VDIFFrameIndex.build(small_filepath, save=False)
+    assert len(frame_index) == 50
+    assert not os.path.exists(small_filepath + ".vdifidx")
+
+
+# test that stale index files are not reused
+
+def test_vdifframeindex_stale(small_filepath):
+    VDIFFrameIndex.build(small_filepath)
+    with open(small_filepath, "rb") as input_file:
+        first_frame = input_file.read(8032)
+    with open(small_filepath, "ab") as input_file:
+        input_file.write(first_frame)
+    assert VDIFFrameIndex.load(small_filepath) is None
+    frame_index = get_frame_index(small_filepath)
+    assert len(frame_index) == 51
+    assert VDIFFrameIndex.load(small_filepath) is not None
+
+
+# test lookup of headers by frame number
+
+def test_vdifframeindex_get_header(small_filepath):
+    frame_index = get_frame_index(small_filepath)
+    headers = list(get_headers(small_filepath))
+    assert frame_index.get_header(42) == headers[42]
+    assert list(frame_index.get_headers(5, start=10)) == headers[10:15]
+    assert list(frame_index.get_headers()) == headers
+
+
+# test lookup of headers by thread
+
+@pytest.fixture
+def threaded_filepath(small_filepath):
+    # frame i of file is given thread_id i % 3
+    with open(small_filepath, "rb") as input_file:
+        frames = bytearray(input_file.read())
+    for frame_num in range(50):
+        frames[frame_num * 8032 + 14] = frame_num % 3    # word 3 bits 16-23
+    with open(small_filepath, "wb") as output_file:
+        output_file.write(frames)
+    return small_filepath
+
+def test_vdifframeindex_thread_ids(threaded_filepath):
+    frame_index = VDIFFrameIndex.build(threaded_filepath, save=False)
+    assert frame_index.thread_ids == [0, 1, 2]
+    assert list(frame_index.thread_frame_nums(1)) == list(range(1, 50, 3))
+    assert list(frame_index.thread_offsets(2)[:2]) == [2 * 8032, 5 * 8032]
+    assert len(frame_index.thread_frame_nums(7)) == 0
+
+@pytest.mark.parametrize("thread_id", [0, 1, 2])
+def test_vdifframeindex_thread_headers(threaded_filepath, thread_id):
+    frame_index = VDIFFrameIndex.build(threaded_filepath, save=False)
+    expected = [header for header in get_headers(threaded_filepath)
+        if header.thread_id == thread_id]
+    assert list(frame_index.get_thread_headers(thread_id)) == expected
+    assert list(frame_index.get_thread_headers(thread_id, count=2)) == \
+        expected[:2]
+    assert list(get_thread_headers(threaded_filepath, thread_id)) == expected
+    table = frame_index.thread_table(thread_id)
+    assert list(table["thread_id"]) == [thread_id] * len(expected)
+    assert list(table["data_frame_number"]) == \
+        [header.data_frame_number for header in expected]
@@ -1,4 +1,4 @@
-import os, pytest
+import os, pytest, random, struct
 from copy import deepcopy
 from vdifheader import VDIFHeader
 pytestmark = pytest.mark.fast
@@ -8,6 +8,7 @@ pytestmark = pytest.mark.fast
 # test that raw data preprocessing is producing expected output
 # test that decode/encode and get/set of each field is working as expected
 # test that print output looks as expected
+# test that headers encode back into the bytes they were parsed from
 
 # test that header object can't be instantiated directly
 
@@ -80,4 +81,76 @@ def test_vdifheader_print_binary(cached_header, capsys):
         "Word 7 |0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0|"]
     cached_header.print_binary()
     _stdout = capsys.readouterr().out
-    assert _stdout == "\n".join(output)
\ No newline at end of file
+    assert _stdout == "\n".join(output)
+
+# test that unvalidated parsing matches validated parsing
+
+def test_vdifheader_parse_unvalidated(test_filepath):
+    with open(test_filepath, "rb") as input_file:
+        raw_data = input_file.read(32)
+    header = VDIFHeader.parse(raw_data, validate=False)
+    validated_header = VDIFHeader.parse(raw_data)
+    assert header == validated_header
+    for field in header.to_dict:
+        raw_value = validated_header._get_raw_value(field)
+        assert header._get_raw_value(field) == raw_value
+
+def test_vdifheader_validate(test_filepath):
+    with open(test_filepath, "rb") as input_file:
+        raw_data = bytearray(input_file.read(32))
+    raw_data[8:11] = bytes(3)  # data_frame_length of 0
+    header = VDIFHeader.parse(bytes(raw_data), validate=False)
+    assert header.data_frame_length == 0
+    with pytest.raises(ValueError):
+        header.validate()
+    with pytest.raises(ValueError):
+        VDIFHeader.parse(bytes(raw_data))
+
+
+# test that headers encode back into the bytes they were parsed from
+
+def test_vdifheader_to_bytes(test_filepath):
+    with open(test_filepath, "rb") as input_file:
+        raw_data = input_file.read(32)
+    header = VDIFHeader.parse(raw_data)
+    assert header.to_bytes() == raw_data
+    assert VDIFHeader.parse(header.to_bytes()) == header
+
+def test_vdifheader_to_bytes_random():
+    rng = random.Random(5)
+    for _ in range(200):
+        words = [rng.getrandbits(32) for _ in range(8)]
+        raw_data = struct.pack("<8I", *words)
+        header = VDIFHeader.parse(raw_data, validate=False)
+        assert header.to_bytes() == raw_data
+
+def test_vdifheader_to_bytes_station_id():
+    # every station id, including digits read as ASCII or numeric, and chars
+    # that are numeric but not digits (e.g. "\xbd" is "½")
+    for raw_station in range(1 << 16):
+        raw_data = struct.pack("<8I", 0, 0, 4, raw_station, 0, 0, 0, 0)
+        header = VDIFHeader.parse(raw_data, validate=False)
+        assert header.to_bytes() == raw_data
+
+def test_vdifheader_to_bytes_station_id_assigned():
+    # ASCII "16" is kept as parsed, even once validated, until reassigned
+    raw_data = struct.pack("<8I", 0, 0, 4, 0x3136, 0, 0, 0, 0)
+    header = VDIFHeader.parse(raw_data)
+    assert header.station_id == "16"
+    assert header.to_bytes() == raw_data
+    header.station_id = "Mp"
+    header.station_id = "16"
+    assert header.to_bytes() == struct.pack("<8I", 0, 0, 4, 16, 0, 0, 0, 0)
+    header.station_id = "A"     # null-padded, as 0x4100 is decoded
+    assert header.to_bytes() == struct.pack("<8I", 0, 0, 4, 0x4100, 0, 0, 0, 0)
+
+def test_vdifheader_to_bytes_assigned(cached_header):
+    header = deepcopy(cached_header)
+    header.thread_id = 7
+    header.station_id = "Mp"
+    header.num_channels = 16
+    reparsed = VDIFHeader.parse(header.to_bytes())
+    assert reparsed.thread_id == 7
+    assert reparsed.station_id == "Mp"
+    assert reparsed.num_channels == 16
+    assert reparsed.seconds_from_epoch == header.seconds_from_epoch
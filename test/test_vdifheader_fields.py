@@ -410,8 +410,23 @@ def test_vdifheader_extended_data_version_assignment_warning(cached_header, valu
 
 # test extended_data field (get, set, attempt set invalid, warn on set incorrect)
 
-def test_vdifheader_extended_data(cached_header): 
-    assert cached_header.extended_data == {}
+def test_vdifheader_extended_data(test_filepath): 
+    # cached_header may have had its extended_data_version changed above
+    from vdifheader import get_first_header
+    assert get_first_header(test_filepath).extended_data == {}
+
+def test_vdifheader_extended_data_parse(test_filepath):
+    import struct
+    from vdifheader import VDIFHeader
+    with open(test_filepath, "rb") as input_file:
+        words = list(struct.unpack("<8I", input_file.read(32)))
+    words[4:] = [0x03800080, 0xacabfeed, 1 << 24, 0x000100d0]
+    header = VDIFHeader.parse(struct.pack("<8I", *words))
+    assert header.extended_data[Field.SAMPLE_RATE] == 128
+    assert header.extended_data[Field.SAMPLE_RATE_UNIT] == "MHz"
+    assert header.extended_data[Field.SIDEBAND] == "USB"
+    assert header.extended_data[Field.DBE_PERSONALITY] == 0xd0
+    assert header.to_bytes() == struct.pack("<8I", *words)
 
 # def test_vdifheader_extended_data_assignment(cached_header, value, raw_value):
 # TODO
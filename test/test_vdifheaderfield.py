@@ -6,4 +6,68 @@ pytestmark = pytest.mark.fast
 # test no overlap with header positions
 # test encoders/decoders
 # test binary trim on set
+# test extended data decoding
 
+
+
+# test integer word decoding matches bit string decoding
+
+@pytest.mark.parametrize("seed", range(10))
+def test_vdifheaderfield_from_words(seed):
+    import random
+    from vdifheader import VDIFHeader
+    rng = random.Random(seed)
+    raw_data = bytes(rng.getrandbits(8) for _ in range(32))
+    binary_data = VDIFHeader._preprocess(raw_data)
+    words = VDIFHeader._unpack(raw_data)
+    for field in Field.primary_values() + [Field.EXTENDED_DATA]:
+        assert field._from_words(words) == field._from(binary_data)
+        assert field._raw_from_words(words) == field._raw_from(binary_data)
+
+@pytest.mark.parametrize("raw_value, station_id", [
+    (0x4d70, "Mp"),
+    (0x5474, "Tt"),
+    (0x4100, "A"),
+    (125, "125"),
+    (0x2fff, "12287")])
+def test_vdifheaderfield_station_id(raw_value, station_id):
+    words = (0, 0, 0, raw_value, 0, 0, 0, 0)
+    assert Field.STATION_ID._from_words(words) == station_id
+
+
+# test extended data decoding
+
+@pytest.mark.parametrize("words, extended_data", [
+    ((0, 0, 0, 0, 0x01800040, 0xacabfeed, 0x5443494e, 0x00534144), {
+        Field.SAMPLE_RATE: 64, Field.SAMPLE_RATE_UNIT: "MHz",
+        Field.SYNC_WORD: 0xacabfeed, Field.DAS_ID: "NICTDAS"}),
+    ((0, 0, 0, 0, 0x02a5ea57, 0x4, 0x2, 0x1), {
+        Field.POLARISATION_BLOCK: 1, Field.QUADRANT: 4, Field.CORRELATOR: 0,
+        Field.SYNC_WORD: 0xa5ea5, Field.STATUS_WORD: 4,
+        Field.PACKET_SERIAL_NUMBER: (1 << 32) | 2}),
+    ((0, 0, 0, 0, 0x03000020, 0xacabfeed, 0x1000000, 0x012752d0), {
+        Field.SAMPLE_RATE: 32, Field.SAMPLE_RATE_UNIT: "kHz",
+        Field.SYNC_WORD: 0xacabfeed, Field.TUNING_WORD: 1 << 24,
+        Field.DBE_PERSONALITY: 0xd0, Field.MINOR_REVISION: 2,
+        Field.MAJOR_REVISION: 5, Field.SIDEBAND: "USB", Field.SUBBAND: 3,
+        Field.IF_NUMBER: 2, Field.DBE_UNIT: 1}),
+    ((0, 0, 0, 0, 0x04100000, 0xacabfeed, 0xffff, 0x0), {
+        Field.VALIDITY_MASK_LENGTH: 16, Field.SYNC_WORD: 0xacabfeed,
+        Field.VALIDITY_MASK: 0xffff}),
+    ((0, 0, 0, 0, 0xabaddeed, 0x1234804d, 0x98712345, 0x5000beef), {
+        Field.SYNC_WORD: 0xabaddeed, Field.MARK5B_FRAME_NUMBER: 77,
+        Field.TEST_DATA: True, Field.USER_DATA: 0x1234,
+        Field.SECONDS_OF_DAY: 12345, Field.TRUNCATED_MJD: 987,
+        Field.CRC: 0xbeef, Field.FRACTIONAL_SECONDS: 0.5}),
+    ((0, 0, 0, 0, 0x00ffffff, 1, 2, 3), {}),
+    ((0, 0, 0, 0, 0x42ffffff, 1, 2, 3), {})])
+def test_vdifheaderfield_extended_data(words, extended_data):
+    assert Field.EXTENDED_DATA._from_words(words) == extended_data
+    for field, value in extended_data.items():
+        assert type(value) == field.data_type
+
+def test_vdifheaderfield_bcd():
+    assert Field._decode_bcd(0x12345) == 12345
+    assert Field._decode_bcd(0) == 0
+    # digits above 9 are not rejected
+    assert Field._decode_bcd(0x1a) == 20
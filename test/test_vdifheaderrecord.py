@@ -0,0 +1,70 @@
+import pickle, pytest, sys
+from copy import deepcopy
+from vdifheader import *
+pytestmark = pytest.mark.fast
+
+# test that record values match those of a parsed VDIFHeader
+# test that records are read-only
+# test that value-wise equality and hashing between records is enabled
+# test that records are compact
+
+
+@pytest.fixture
+def raw_header(test_filepath):
+    with open(test_filepath, "rb") as input_file:
+        return input_file.read(32)
+
+
+# test that record values match those of a parsed VDIFHeader
+
+def test_vdifheaderrecord_values(raw_header):
+    record = VDIFHeaderRecord.parse(raw_header)
+    header = VDIFHeader.parse(raw_header)
+    assert record.to_dict == header.to_dict
+    assert record.get_timestamp() == header.get_timestamp()
+    assert record.get_station_information() == header.get_station_information()
+    assert record.to_header() == header
+    assert record.raw_data == raw_header
+
+def test_vdifheaderrecord_get_headers(test_filepath):
+    records = list(get_headers(test_filepath, count=10, compact=True))
+    headers = list(get_headers(test_filepath, count=10))
+    assert all(type(record) == VDIFHeaderRecord for record in records)
+    assert [record.to_header() for record in records] == headers
+    mapped_records = list(get_headers(test_filepath, count=10, compact=True,
+        memory_map=True))
+    assert mapped_records == records
+
+def test_vdifheaderrecord_invalid_length():
+    with pytest.raises(ValueError):
+        VDIFHeaderRecord(bytes(16))
+
+
+# test that records are read-only
+
+@pytest.mark.parametrize("field_name", ["thread_id", "station_id", "_raw_data"])
+def test_vdifheaderrecord_read_only(raw_header, field_name):
+    record = VDIFHeaderRecord(raw_header)
+    with pytest.raises(AttributeError):
+        setattr(record, field_name, 1)
+    assert record.raw_data == raw_header
+
+
+# test that value-wise equality and hashing between records is enabled
+
+def test_vdifheaderrecord_eq(raw_header):
+    record = VDIFHeaderRecord(raw_header)
+    for other_record in [deepcopy(record), pickle.loads(pickle.dumps(record))]:
+        assert other_record is not record
+        assert other_record == record
+        assert hash(other_record) == hash(record)
+    assert record != VDIFHeaderRecord(bytes(32))
+
+
+# test that records are compact
+
+def test_vdifheaderrecord_size(raw_header):
+    record = VDIFHeaderRecord(raw_header)
+    assert not hasattr(record, "__dict__")
+    record_size = sys.getsizeof(record) + sys.getsizeof(record.raw_data)
+    assert record_size < 4 * len(raw_header)
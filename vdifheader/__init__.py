@@ -15,7 +15,18 @@
 > vdifheader - __init__.py (private)
 Defines publicly acessible API methods for the vdifheader package
 """
-__all__ = ["get_first_header", "get_headers", "VDIFHeader"]
+__all__ = ["get_first_header", "get_headers", "aget_headers", 
+    "get_headers_between",
+    "get_header_table", "encode_header_table", "get_extended_data_table",
+    "get_frame_index",
+    "get_thread_headers",
+    "validate_file", "analyse_gaps", "infer_rates", "summarise_file",
+    "export_headers", "write_parquet", "header_record_batches",
+    "get_diagnostics_sink", "set_diagnostics_sink", "VDIFHeader", 
+    "VDIFHeaderRecord", "VDIFFrameIndex", "VDIFValidationReport", 
+    "VDIFGapAnalyser", "VDIFGapReport", "VDIFRateEstimator", "VDIFReceiver",
+    "VDIFScanStats", "VDIFFileSummary", "VDIFHeaderWriter",
+    "VDIFDiagnostic", "CollectorSink", "LoggingSink", "NullSink", "StderrSink"]
 __author__ = "Mars Buttfield-Addison"
 __authors__ = [__author__]
 __contact__ = "hello@themartianlife.com"
@@ -29,15 +40,44 @@ __maintainer__ = __author__
 __status__ = "Pre-release"
 __version__ = "0.1"
 
-from sys import stderr
-from typing import Iterator, Optional
+from asyncio import get_running_loop
+from concurrent.futures import Executor
+from functools import partial
+from itertools import islice
+from mmap import ACCESS_READ, mmap
+from os import fstat
+from datetime import datetime, timedelta
+from typing import AsyncIterator, BinaryIO, Callable, Iterator, Optional, \
+    Tuple, Union
 
-from vdifheader._utils import sanitized_path
+from vdifheader._utils import sanitized_path, to_utc, vh_warn
+from vdifheader.diagnostics import VDIFDiagnostic, CollectorSink, \
+    LoggingSink, NullSink, StderrSink, clear_context, get_diagnostics_sink, \
+    set_context, set_diagnostics_sink
+from vdifheader.export import VDIFHeaderWriter, export_headers, \
+    header_record_batches, write_parquet
+from vdifheader.gaps import REORDER_WINDOW, VDIFGapAnalyser, VDIFGapReport
+from vdifheader.headertable import STREAM_MASKS, decode_extended_data, \
+    decode_header_words, encode_header_table, header_table_chunks, \
+    header_word_chunks, map_words, read_header_words, resync_offset
+from vdifheader.rates import VDIFRateEstimator
+from vdifheader.stats import StatsFile, VDIFScanStats, timed_parse
+from vdifheader.summary import VDIFFileSummary, VDIFSummariser
+from vdifheader.receiver import VDIFReceiver
+from vdifheader.parallel import scan_header_table
+from vdifheader.validation import VDIFValidationReport, validate_header_table
+from vdifheader.vdifframeindex import VDIFFrameIndex
 from vdifheader.vdifheader import VDIFHeader
+from vdifheader.vdifheaderrecord import VDIFHeaderRecord
 from vdifheader.vdifheaderfield import VDIFHeaderField
 
 
 VDIF_HEADER_BYTES = 32
+ERRORS_RAISE = "raise"      # raise ValueError at first damaged header
+ERRORS_SKIP = "skip"        # skip damaged header by previous frame length
+ERRORS_RESYNC = "resync"    # search forward from damaged header for a frame
+ERRORS_POLICIES = (ERRORS_RAISE, ERRORS_SKIP, ERRORS_RESYNC)
+ASYNC_BATCH_HEADERS = 1024  # headers read by each executor call of aget_headers
 
 
 def get_first_header(input_filepath: str) -> Optional[VDIFHeader]:
@@ -59,17 +99,41 @@ def get_first_header(input_filepath: str) -> Optional[VDIFHeader]:
 
 
 def get_headers(input_filepath: str, 
-        count: Optional[int]=None) -> Iterator[VDIFHeader]:
+        count: Optional[int]=None,
+        memory_map: bool=False,
+        compact: bool=False,
+        validate: bool=True,
+        errors: str=ERRORS_RAISE,
+        damaged_ranges: Optional[list[Tuple[int,int]]]=None,
+        stats: Optional[VDIFScanStats]=None
+        ) -> Iterator[Union[VDIFHeader,VDIFHeaderRecord]]:
     """
     Returns iterator of first count headers from file at input filepath
 
         parameter:
             input_filepath: str     the path to a valid VDIF file
             count: Optional[int]    number of headers to parse, else parse all
+            memory_map: bool        scan a memory map of file instead of
+                                    reading and seeking through it
+            compact: bool           return read-only VDIFHeaderRecord objects
+                                    that hold only the raw header bytes
+            validate: bool          check field values as they are parsed, 
+                                    else call VDIFHeader.validate() later
+            errors: str             at a damaged header, "raise" ValueError, 
+                                    "skip" it by previous data_frame_length, 
+                                    or "resync" by searching for next frame
+            damaged_ranges: Optional[list]  list to append (start, end) byte
+                                            range of each damaged area to
+            stats: Optional[VDIFScanStats]  stats to add reads, seeks, and
+                                            time spent in I/O, decoding and
+                                            validation to
 
         returns:
            Iterator[VDIFHeader]     header data if found, else empty    
     """
+    if errors not in ERRORS_POLICIES:
+        raise ValueError(f"errors must be one of {ERRORS_POLICIES}, " \
+            f"not {errors!r}.")
     header_limit = False
     # if count is invalid, header_limit is disabled. include all headers in file
     if count is not None and count > 0:
@@ -77,21 +141,475 @@ def get_headers(input_filepath: str,
     parsed_count = 0
     # allow relative/home-relative filepaths
     with open(sanitized_path(input_filepath), "rb") as input_file:
+        scan_headers = _mapped_headers if memory_map else _read_headers
+        parse = VDIFHeaderRecord.parse if compact else VDIFHeader.parse
+        if not compact and not validate:
+            parse = VDIFHeader._parse_unvalidated
+        if errors != ERRORS_RAISE:
+            scan_headers = partial(_tolerant_headers, errors=errors,
+                damaged_ranges=damaged_ranges, memory_map=memory_map)
+        if stats is not None:
+            # only wrapped when asked for, so there is no cost otherwise
+            input_file = StatsFile(input_file, stats)
+            parse = timed_parse(parse, stats) if compact else \
+                partial(VDIFHeader.parse, validate=validate, stats=stats)
+            stats._start()
+        try:
+            # until we find the end of the file, or otherwise break
+            for header in scan_headers(input_file, parse):
+                yield header
+                parsed_count += 1
+                # check if we've found as many headers as asked for
+                if header_limit and parsed_count == count:
+                    break
+        finally:
+            if stats is not None:
+                stats._stop()
+    if header_limit and parsed_count != count:
+        vh_warn(f"get_headers found {parsed_count} headers, expected {count}")
+
+
+async def aget_headers(input_filepath: str,
+        count: Optional[int]=None,
+        batch_size: int=ASYNC_BATCH_HEADERS,
+        executor: Optional[Executor]=None,
+        **kwargs) -> AsyncIterator[Union[VDIFHeader,VDIFHeaderRecord]]:
+    """
+    Returns async iterator of first count headers from file at input filepath
+
+        parameter:
+            input_filepath: str     the path to a valid VDIF file
+            count: Optional[int]    number of headers to parse, else parse all
+            batch_size: int         headers read and parsed in each call to 
+                                    executor, rather than in event loop
+            executor: Optional[Executor]    executor to read with, else loop's
+                                            default thread pool
+            **kwargs                other options, as for get_headers, but
+                                    with memory_map=True unless given
+
+        returns:
+           AsyncIterator[VDIFHeader]    header data if found, else empty    
+    """
+    loop = get_running_loop()
+    # headers are sliced from a map of the file, rather than each needing a
+    # read and seek, so a batch costs the executor no per-frame syscalls
+    kwargs.setdefault("memory_map", True)
+    headers = get_headers(input_filepath, count=count, **kwargs)
+    read_batch = lambda: list(islice(headers, batch_size))
+    try:
+        # blocking page faults and parsing all happen in executor, a batch at
+        # a time, so event loop only waits on one future per batch
+        while True:
+            batch = await loop.run_in_executor(executor, read_batch)
+            for header in batch:
+                yield header
+            if len(batch) < batch_size:
+                break
+    finally:
+        await loop.run_in_executor(executor, headers.close)
+
+
+def get_headers_between(input_filepath: str, start: datetime, 
+        end: datetime) -> Iterator[VDIFHeader]:
+    """
+    Returns iterator of headers with timestamps from start up to (not incl) end
+
+        parameter:
+            input_filepath: str     the path to a valid VDIF file
+            start: datetime         earliest timestamp of headers to include
+            end: datetime           timestamp at which to stop including headers
+
+        returns:
+           Iterator[VDIFHeader]     header data if found, else empty    
+    """
+    _start, _end = to_utc(start), to_utc(end)
+    with open(sanitized_path(input_filepath), "rb") as input_file:
+        # jump straight to first frame that could be in window, then scan on
+        first_frame, first_offset = _first_frame_from(input_file, _start)
+        input_file.seek(first_offset)
+        for header in _read_headers(input_file, first_frame=first_frame):
+            timestamp = header.get_timestamp()
+            # headers are in time order, so stop at first header past window
+            if timestamp >= _end:
+                break
+            if timestamp >= _start:
+                yield header
+
+
+def get_header_table(input_filepath: str,
+        count: Optional[int]=None,
+        workers: Optional[int]=1) -> "numpy.ndarray":
+    """
+    Returns table of first count headers from file at input filepath
+
+        parameter:
+            input_filepath: str     the path to a valid VDIF file
+            count: Optional[int]    number of headers to parse, else parse all
+            workers: Optional[int]  number of processes to scan file with, or
+                                    None for one per CPU
+
+        returns:
+            numpy.ndarray           structured array with one row per header 
+                                    and one column per VDIFHeaderField
+    """
+    if workers != 1:
+        # split bytes holding first count headers between workers
+        _, table = scan_header_table(input_filepath, workers=workers,
+            count=count)
+        return table
+    # decode every header at once from raw words, rather than one at a time
+    _, words = read_header_words(input_filepath, count=count)
+    return decode_header_words(words)
+
+
+def get_extended_data_table(input_filepath: str,
+        count: Optional[int]=None,
+        version: Optional[int]=None) -> "numpy.ndarray":
+    """
+    Returns table of extended data of first count headers from file
+
+        parameter:
+            input_filepath: str     the path to a valid VDIF file
+            count: Optional[int]    number of headers to parse, else parse all
+            version: Optional[int]  extended data version to decode, else
+                                    that of first header
+
+        returns:
+            numpy.ndarray           structured array with one row per header
+                                    (as get_header_table) and one column per
+                                    field of extended data version
+    """
+    # decode every header at once from raw words, rather than one at a time
+    _, words = read_header_words(input_filepath, count=count)
+    if version is None:
+        version = int(words[0, 4] >> 24) if len(words) > 0 else 0
+    return decode_extended_data(words, version)
+
+
+def get_frame_index(input_filepath: str, rebuild: bool=False) -> VDIFFrameIndex:
+    """
+    Returns sidecar frame index of file at input filepath, building if needed
+
+        parameter:
+            input_filepath: str     the path to a valid VDIF file
+            rebuild: bool           rebuild index even if saved one is current
+
+        returns:
+            VDIFFrameIndex          byte offset and raw words of every header
+    """
+    # reuse saved index if file hasn't changed since it was built
+    frame_index = None
+    if not rebuild:
+        frame_index = VDIFFrameIndex.load(input_filepath)
+    if frame_index is None:
+        frame_index = VDIFFrameIndex.build(input_filepath)
+    return frame_index
+
+
+def get_thread_headers(input_filepath: str, thread_id: int,
+        count: Optional[int]=None) -> Iterator[VDIFHeader]:
+    """
+    Returns iterator of first count headers of one thread in file
+
+        parameter:
+            input_filepath: str     the path to a valid VDIF file
+            thread_id: int          thread_id of headers to include
+            count: Optional[int]    number of headers to parse, else parse all
+
+        returns:
+           Iterator[VDIFHeader]     header data if found, else empty    
+    """
+    # frame index groups frames by thread, so other threads are never parsed
+    return get_frame_index(input_filepath).get_thread_headers(thread_id, 
+        count=count)
+
+
+def validate_file(input_filepath: str, 
+        count: Optional[int]=None) -> VDIFValidationReport:
+    """
+    Returns report of VDIF spec rules broken by first count headers in file
+
+        parameter:
+            input_filepath: str     the path to a valid VDIF file
+            count: Optional[int]    number of headers to check, else check all
+
+        returns:
+            VDIFValidationReport    count, first and last offending frame 
+                                    offset, and examples for each rule
+    """
+    # a header with unusable data_frame_length ends the file, but is reported
+    offsets, words = read_header_words(input_filepath, count=count, 
+        strict=False)
+    return validate_header_table(decode_header_words(words), offsets)
+
+
+def analyse_gaps(input_filepath: str, count: Optional[int]=None,
+        frames_per_second: Optional[int]=None,
+        reorder_window: int=REORDER_WINDOW) -> VDIFGapReport:
+    """
+    Returns missing, duplicated and out-of-order frames of each thread in file
+
+        parameter:
+            input_filepath: str     the path to a valid VDIF file
+            count: Optional[int]    number of headers to analyse, else all
+            frames_per_second: Optional[int]    frames of each thread per
+                                                second, else infer it
+            reorder_window: int     frames late a frame can be and still
+                                    fill a gap, rather than be a duplicate
+
+        returns:
+            VDIFGapReport           ranges of frames of each thread
+    """
+    if frames_per_second is None:
+        # same rate as infer_rates() reports, as it sees the whole file
+        frames_per_second = infer_rates(input_filepath,
+            count).max_frames_per_second
+    # decode a chunk of headers at a time, so memory use is bounded
+    analyser = VDIFGapAnalyser(frames_per_second, reorder_window)
+    for table in header_table_chunks(input_filepath, count):
+        for frame in zip(table["thread_id"].tolist(), 
+                table["seconds_from_epoch"].tolist(),
+                table["data_frame_number"].tolist()):
+            analyser.add(*frame)
+    return analyser.finish()
+
+
+def summarise_file(input_filepath: str,
+        count: Optional[int]=None) -> VDIFFileSummary:
+    """
+    Returns frame count, time span and field value counts of headers in file
+
+        parameter:
+            input_filepath: str     the path to a valid VDIF file
+            count: Optional[int]    number of headers to summarise, else all
+
+        returns:
+            VDIFFileSummary         summary of headers, in one pass
+    """
+    # raw words of a chunk of headers at a time, so memory use is bounded
+    summariser = VDIFSummariser()
+    for words in header_word_chunks(input_filepath, count):
+        summariser.add_words(words)
+    return summariser.finish()
+
+
+def infer_rates(input_filepath: str, 
+        count: Optional[int]=None) -> VDIFRateEstimator:
+    """
+    Returns frame, sample and data rates of each thread in file
+
+        parameter:
+            input_filepath: str     the path to a valid VDIF file
+            count: Optional[int]    number of headers to infer from, else all
+
+        returns:
+            VDIFRateEstimator       estimate for each thread, and in total
+    """
+    estimator = VDIFRateEstimator()
+    for table in header_table_chunks(input_filepath, count):
+        for frame in zip(*(table[field].tolist() for field in ["thread_id",
+                "seconds_from_epoch", "data_frame_number", "data_frame_length",
+                "num_channels", "bits_per_sample", "data_type", 
+                "legacy_mode"])):
+            estimator.add(*frame)
+    return estimator
+
+
+def _read_headers(input_file: BinaryIO, parse: Callable=VDIFHeader.parse,
+        first_frame: int=0) -> Iterator[VDIFHeader]:
+    frame_num, offset = first_frame, input_file.tell()
+    raw_header = input_file.read(VDIF_HEADER_BYTES)
+    while raw_header is not None and len(raw_header) > 0:
+        # parse the fetched raw header bytes, so diagnostics know where it was
+        set_context(frame_num, offset)
+        try:
+            header = parse(raw_header)
+        finally:
+            clear_context()
+        yield header
+        _check_frame_length(header)
+        # then scrub past raw frame bytes
+        seek_length = header.data_frame_length - VDIF_HEADER_BYTES
+        input_file.seek(seek_length, 1)  # 1 = relative to current position
+        frame_num += 1
+        offset += header.data_frame_length
+        # and get next raw header bytes
         raw_header = input_file.read(VDIF_HEADER_BYTES)
-        # until we find the end of the file, or otherwise break
-        while raw_header is not None and len(raw_header) > 0:
-            # parse the fetched raw header bytes
-            header = VDIFHeader.parse(raw_header)
+
+
+def _check_frame_length(header: Union[VDIFHeader,VDIFHeaderRecord]):
+    # records aren't validated on parse, but scanning can't go backwards
+    if header.data_frame_length < VDIF_HEADER_BYTES:
+        raise ValueError(f"data_frame_length must be > {VDIF_HEADER_BYTES}.")
+
+
+def _tolerant_headers(input_file: BinaryIO, parse: Callable=VDIFHeader.parse,
+        errors: str=ERRORS_SKIP, 
+        damaged_ranges: Optional[list[Tuple[int,int]]]=None,
+        memory_map: bool=False) -> Iterator[VDIFHeader]:
+    file_length = fstat(input_file.fileno()).st_size
+    if memory_map and file_length > 0:  # mmap cannot map an empty file
+        with mmap(input_file.fileno(), 0, access=ACCESS_READ) as mapped_file:
+            read_at = lambda offset: \
+                mapped_file[offset:offset + VDIF_HEADER_BYTES]
+            yield from _tolerant_scan(input_file, read_at, file_length,
+                parse, errors, damaged_ranges)
+        return
+    yield from _tolerant_scan(input_file, partial(_read_at, input_file),
+        file_length, parse, errors, damaged_ranges)
+
+
+def _tolerant_scan(input_file: BinaryIO, read_at: Callable[[int],bytes],
+        file_length: int, parse: Callable, errors: str,
+        damaged_ranges: Optional[list[Tuple[int,int]]]
+        ) -> Iterator[VDIFHeader]:
+    buffer = None   # only mapped if resync is needed
+    frame_num, offset = 0, input_file.tell()
+    reference_words, frame_length = None, None
+    while offset < file_length:
+        raw_header = read_at(offset)
+        header = _try_parse(raw_header, parse, frame_num, offset)
+        words = None if header is None else VDIFHeader._unpack(raw_header)
+        # only resync can find headers with misleading data_frame_length
+        if header is not None and errors == ERRORS_RESYNC and \
+                reference_words is not None and \
+                not _is_consistent(words, reference_words):
+            header = None
+        # skip trusts a new data_frame_length only if it leads to a header
+        if header is not None and errors == ERRORS_SKIP and \
+                header.data_frame_length != frame_length and \
+                not _is_followed(read_at, offset, words, file_length):
+            header = None
+        if header is not None and \
+                header.data_frame_length >= VDIF_HEADER_BYTES:
             yield header
-            parsed_count += 1
-            # check if we've found as many headers as asked for
-            if header_limit and parsed_count == count:
-                break
-            # otherwise scrub past raw frame bytes
-            seek_length = header.data_frame_length - VDIF_HEADER_BYTES
-            input_file.seek(seek_length, 1)  # 1 = relative to current position
-            # and get next raw header bytes
-            raw_header = input_file.read(VDIF_HEADER_BYTES)
-    if header_limit and parsed_count != count:
-        stderr.write(f"get_headers found {parsed_count} headers, expected " \
-            "{count}.\n")
+            if reference_words is None:
+                reference_words = words
+            frame_num += 1
+            frame_length = header.data_frame_length
+            offset += frame_length
+            continue
+        # damaged header: carry on from next frame, if it can be found
+        next_offset = None
+        if frame_length is not None and errors == ERRORS_SKIP:
+            next_offset = offset + frame_length
+        elif frame_length is not None and errors == ERRORS_RESYNC:
+            if buffer is None:
+                buffer = map_words(input_file.name)
+            next_offset = resync_offset(buffer, offset + 1, frame_length)
+        end = file_length if next_offset is None else min(next_offset, 
+            file_length)
+        set_context(frame_num, offset)
+        vh_warn(f"skipped damaged data from byte {offset} to {end}")
+        clear_context()
+        if damaged_ranges is not None:
+            damaged_ranges.append((offset, end))
+        if next_offset is None:
+            break
+        frame_num += 1
+        offset = next_offset
+
+
+def _read_at(input_file: BinaryIO, offset: int) -> bytes:
+    input_file.seek(offset)
+    return input_file.read(VDIF_HEADER_BYTES)
+
+
+def _is_followed(read_at: Callable[[int],bytes], offset: int, words: tuple,
+        file_length: int) -> bool:
+    # as resync_offset, header is plausible if it shares stream fields with
+    # header one frame later, or its frame ends exactly at end of file
+    next_offset = offset + \
+        VDIFHeaderField.DATA_FRAME_LENGTH._from_words(words)
+    if next_offset == file_length:
+        return True
+    next_header = read_at(next_offset)
+    if len(next_header) < VDIF_HEADER_BYTES:
+        return False
+    # but length of header one frame later may itself be damaged, so ignore it
+    word, shift, mask = VDIFHeaderField.DATA_FRAME_LENGTH._word_layout
+    length_bits = mask << shift
+    next_words = list(VDIFHeader._unpack(next_header))
+    next_words[word] = (next_words[word] & ~length_bits) | \
+        (words[word] & length_bits)
+    return _is_consistent(next_words, words)
+
+
+def _try_parse(raw_header: bytes, parse: Callable, frame_num: int,
+        offset: int) -> Optional[VDIFHeader]:
+    set_context(frame_num, offset)
+    try:
+        return parse(raw_header)
+    except ValueError:
+        return None
+    finally:
+        clear_context()
+
+
+def _is_consistent(words: tuple, reference_words: tuple) -> bool:
+    # headers of one stream share epoch, version, format and station fields
+    return all((words[word] & mask) == (reference_words[word] & mask)
+        for word, mask in enumerate(STREAM_MASKS, start=1))
+
+
+def _first_frame_from(input_file: BinaryIO, 
+        timestamp: datetime) -> Tuple[int,int]:
+    file_length = fstat(input_file.fileno()).st_size
+    first_words = _read_words(input_file, 0)
+    if first_words is None:
+        return (0, 0)
+    frame_length = VDIFHeaderField.DATA_FRAME_LENGTH._from_words(first_words)
+    if frame_length < VDIF_HEADER_BYTES:
+        return (0, 0)
+    # binary search for first frame at or after timestamp, assuming all frames
+    # are the length that first frame says they are (as per VDIF spec)
+    num_frames = (file_length - VDIF_HEADER_BYTES) // frame_length + 1
+    low, high = 0, num_frames
+    while low < high:
+        middle = (low + high) // 2
+        words = _read_words(input_file, middle * frame_length)
+        length = VDIFHeaderField.DATA_FRAME_LENGTH._from_words(words)
+        if length != frame_length:  # frames vary, so must scan from start
+            return (0, 0)
+        if _words_timestamp(words) < timestamp:
+            low = middle + 1
+        else:
+            high = middle
+    return (low, low * frame_length)
+
+
+def _read_words(input_file: BinaryIO, offset: int) -> Optional[tuple]:
+    input_file.seek(offset)
+    raw_header = input_file.read(VDIF_HEADER_BYTES)
+    if len(raw_header) < VDIF_HEADER_BYTES:
+        return None
+    return VDIFHeader._unpack(raw_header)
+
+
+def _words_timestamp(words: tuple) -> datetime:
+    epoch = VDIFHeaderField.REFERENCE_EPOCH._from_words(words)
+    seconds = VDIFHeaderField.SECONDS_FROM_EPOCH._from_words(words)
+    return epoch + timedelta(seconds=seconds)
+
+
+def _mapped_headers(input_file: BinaryIO, 
+        parse: Callable=VDIFHeader.parse) -> Iterator[VDIFHeader]:
+    file_length = fstat(input_file.fileno()).st_size
+    if file_length == 0:  # mmap cannot map an empty file
+        return
+    with mmap(input_file.fileno(), 0, access=ACCESS_READ) as mapped_file:
+        with memoryview(mapped_file) as buffer:
+            frame_num, offset = 0, 0
+            while offset < file_length:
+                # parse header straight from the mapped pages, without copying
+                end = offset + VDIF_HEADER_BYTES
+                set_context(frame_num, offset)
+                try:
+                    with buffer[offset:end] as raw_header:
+                        header = parse(raw_header)
+                finally:
+                    clear_context()
+                yield header
+                _check_frame_length(header)
+                frame_num += 1
+                offset += header.data_frame_length
@@ -30,15 +30,26 @@ __version__ = "0.1"
 
 import sys
 from enum import Enum
-from argparse import ArgumentParser
+from argparse import Action, ArgumentParser
 
 from vdifheader import *
 from vdifheader._utils import *
+from vdifheader.export import FORMATS
 
 
 class VDIFOutputMode(Enum):
     VALUES = "values"
     BINARY = "binary"
+    GAPS = "gaps"
+    SUMMARY = "summary"
+
+
+class CountAction(Action):
+    # stores count, and that it was given, so that modes which default to all
+    # headers can tell -n 1 from no -n at all
+    def __call__(self, parser, namespace, values, option_string=None):
+        setattr(namespace, self.dest, values)
+        namespace.count_given = True
 
 
 def arg_parser() -> ArgumentParser:
@@ -48,7 +59,8 @@ def arg_parser() -> ArgumentParser:
     # arguments about number of headers to parse
     num_group = parser.add_mutually_exclusive_group()
     num_group.add_argument("-n", "--count", dest="num_headers", 
-        metavar="NUM", type=posint, help="number of headers to parse")
+        metavar="NUM", type=posint, action=CountAction,
+        help="number of headers to parse")
     num_group.add_argument("-a", "--all", dest="num_headers", 
         action="store_const", const=-1, help="parse all headers in file")
     # arguments about how to print output
@@ -59,9 +71,25 @@ def arg_parser() -> ArgumentParser:
     print_group.add_argument("-b", "--binary", dest="output_mode", 
         action="store_const", const=VDIFOutputMode.BINARY, 
         help="show raw binary output")
+    print_group.add_argument("-g", "--gaps", dest="output_mode", 
+        action="store_const", const=VDIFOutputMode.GAPS, 
+        help="show missing, duplicated and out-of-order frames per thread")
+    print_group.add_argument("-s", "--summary", dest="output_mode", 
+        action="store_const", const=VDIFOutputMode.SUMMARY, 
+        help="show frame count, time span, threads and field value counts")
+    print_group.add_argument("-f", "--format", dest="output_format", 
+        choices=FORMATS, help="write one machine-readable row per header")
+    # arguments about how to find headers
+    parser.add_argument("-x", "--index", dest="use_index", 
+        action="store_true", help="use (or build) sidecar frame index")
+    # arguments about instrumentation
+    parser.add_argument("--stats", dest="show_stats", action="store_true",
+        help="print throughput and time spent in I/O, decoding and " \
+            "validation to stderr")
     # arguments about file to process
     parser.add_argument("input_file", metavar="INPUT_FILE", type=filepath)
-    parser.set_defaults(num_headers=1, output_mode=VDIFOutputMode.VALUES)
+    parser.set_defaults(num_headers=1, count_given=False,
+        output_mode=VDIFOutputMode.VALUES)
     return parser
 
 
@@ -74,13 +102,53 @@ def main():
     first_header = None
 
     # parse command line args
-    args = vars(arg_parser().parse_args())
+    parser = arg_parser()
+    args = vars(parser.parse_args())
+    file_modes = [VDIFOutputMode.GAPS, VDIFOutputMode.SUMMARY]
+    if args["show_stats"] and (args["use_index"] or
+            args["output_mode"] in file_modes):
+        # these read raw words (or an index) rather than scanning headers
+        parser.error("--stats cannot be used with -g/--gaps, -s/--summary " \
+            "or -x/--index")
+    if args["use_index"] and args["output_mode"] in file_modes:
+        # these read raw words of each chunk of the file, not the index
+        parser.error("-x/--index cannot be used with -g/--gaps or " \
+            "-s/--summary")
 
     num_headers = args["num_headers"]
     output_mode = args["output_mode"]
     input_file = args["input_file"]
+    use_index = args["use_index"]
+    output_format = args["output_format"]
+    stats = VDIFScanStats() if args["show_stats"] else None
+
+    # gaps and summary are only meaningful across many headers, so default
+    # to all, unless -n is given
+    file_count = num_headers if args["count_given"] else None
+    if output_mode == VDIFOutputMode.GAPS:
+        analyse_gaps(input_file, count=file_count).print_report()
+        return
+    if output_mode == VDIFOutputMode.SUMMARY:
+        # summary reads raw words for speed
+        summarise_file(input_file, count=file_count).print_report()
+        return
 
-    for header in get_headers(input_file, count=num_headers):
+    if use_index:
+        input_headers = get_frame_index(input_file).get_headers(num_headers)
+    else:
+        # rows are formatted from raw words, so full headers aren't needed
+        input_headers = get_headers(input_file, count=num_headers,
+            compact=output_format is not None, stats=stats)
+    if output_format is not None:
+        with VDIFHeaderWriter(sys.stdout, output_format) as writer:
+            for header in input_headers:
+                if first_header is None:
+                    first_header = header
+                writer.write_header(header)
+        if stats is not None:
+            stats.print_report(sys.stderr)
+        return
+    for header in input_headers:
         # save first header if this is it
         if first_header is None:
             first_header = header
@@ -92,6 +160,8 @@ def main():
         # print a blank line between separate headers
         if num_headers > 1:
             print()
+    if stats is not None:
+        stats.print_report(sys.stderr)
     return
 
 
@@ -30,10 +30,12 @@ __status__ = "Pre-release"
 __version__ = "0.1"
 
 from os import path, strerror
-from sys import stderr
 from errno import ENOENT
 from pathlib import Path
 from datetime import datetime,timezone
+from typing import Any
+
+from vdifheader import diagnostics
 
 try:  # colors if they have them
     import colorama
@@ -58,14 +60,14 @@ def switch_end(data: str, padded_bits: int=0) -> str:
     return "".join(reversed(data)).ljust(padded_bits, "0")
 
 
-def vh_warn(message: str):
-    """Writes message to stdout in red text with ERROR in front"""
-    stderr.write(f"\033[0;33mWARNING: {message}.\033[0m\n")
+def vh_warn(message: str, field: Any=None):
+    """Sends warning message to diagnostics sink (by default, stderr)"""
+    diagnostics.emit(diagnostics.WARNING, message, field)
 
 
-def vh_error(message: str):
-    """Writes message to stdout in yellow text with WARNING in front"""
-    stderr.write(f"\033[0;31mERROR: {message}.\033[0m\n")
+def vh_error(message: str, field: Any=None):
+    """Sends error message to diagnostics sink (by default, stderr)"""
+    diagnostics.emit(diagnostics.ERROR, message, field)
 
 
 def posint(value: int) -> int:
@@ -0,0 +1,274 @@
+# > vdifheader - diagnostics.py
+# Defines pluggable sinks that receive warnings and errors found while parsing
+
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+> vdifheader - diagnostics.py
+Defines pluggable sinks that receive warnings and errors found while parsing
+"""
+__author__ = "Mars Buttfield-Addison"
+__authors__ = [__author__]
+__contact__ = "hello@themartianlife.com"
+__copyright__ = f"Copyright 2022, {__author__}"
+__credits__ = __authors__
+__date__ = "2022/04/07"
+__deprecated__ = False
+__email__ = __contact__
+__license__ = "GPLv3"
+__maintainer__ = __author__
+__status__ = "Pre-release"
+__version__ = "0.1"
+
+import logging
+from sys import stderr
+from threading import Lock, local
+from time import monotonic
+from typing import Any, Optional, Tuple
+
+
+ERROR = "error"         # severity of diagnostics written by vh_error
+WARNING = "warning"     # severity of diagnostics written by vh_warn
+COLORS = {ERROR: "\033[0;31m", WARNING: "\033[0;33m"}
+LOG_LEVELS = {ERROR: logging.ERROR, WARNING: logging.WARNING}
+REPEAT_INTERVAL = 60.0  # seconds after which output sinks pass repeats again
+
+
+class VDIFDiagnostic:
+    """A class that represents one warning or error, and where it was found"""
+
+    __slots__ = ("severity", "message", "field", "frame_index", "byte_offset")
+
+    def __init__(self, severity: str, message: str, field: Any=None,
+            frame_index: Optional[int]=None, byte_offset: Optional[int]=None):
+        self.severity: str = severity
+        self.message: str = message
+        self.field: Any = field     # VDIFHeaderField, if diagnostic is of one
+        self.frame_index: Optional[int] = frame_index
+        self.byte_offset: Optional[int] = byte_offset
+        return
+
+    @property
+    def key(self) -> Tuple[str,str]:
+        """Identifies repeats of this diagnostic, regardless of context"""
+        return (self.severity, self.message)
+
+    def to_dict(self) -> dict[str,Any]:
+        """Creates dict of diagnostic attributes as format name: value"""
+        return {
+            "severity": self.severity,
+            "message": self.message,
+            "field": None if self.field is None else self.field.value,
+            "frame_index": self.frame_index,
+            "byte_offset": self.byte_offset,
+        }
+
+    def __str__(self) -> str:
+        context = []
+        if self.frame_index is not None:
+            context.append(f"frame {self.frame_index}")
+        if self.byte_offset is not None:
+            context.append(f"byte {self.byte_offset}")
+        if len(context) == 0:
+            return f"{self.message}."
+        return f"{self.message} ({', '.join(context)})."
+
+
+class DiagnosticsSink:
+    """Base class of sinks, that drops repeats of the same diagnostic"""
+
+    enabled = True  # if False, diagnostics are not even created for this sink
+
+    def __init__(self, max_repeats: Optional[int]=None,
+            interval: Optional[float]=None):
+        """
+        Creates new sink that passes on at most max_repeats of each diagnostic
+
+            parameter:
+                max_repeats: Optional[int]  times each distinct message is
+                                            passed on, else pass on all
+                interval: Optional[float]   seconds after which max_repeats
+                                            starts again, else never
+        """
+        self.max_repeats: Optional[int] = max_repeats
+        self.interval: Optional[float] = interval
+        self.counts: dict[Tuple[str,str],int] = {}
+        self.suppressed: dict[Tuple[str,str],int] = {}
+        self.__windows: dict[Tuple[str,str],list] = {}
+        self.__lock = Lock()
+        return
+
+    def emit(self, diagnostic: VDIFDiagnostic):
+        """Counts diagnostic, and passes it on unless it has been rate-limited"""
+        key = diagnostic.key
+        with self.__lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+            if self.max_repeats is None:
+                passed, first_suppressed = True, False
+            else:
+                passed, first_suppressed = self.__check_window(key)
+            if not passed:
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+        if passed:
+            self.handle(diagnostic)
+        elif first_suppressed:
+            self.handle_suppressed(diagnostic)
+        return
+
+    def handle(self, diagnostic: VDIFDiagnostic):
+        """Receives each diagnostic that has not been rate-limited"""
+        raise NotImplementedError("DiagnosticsSink subclasses must implement " \
+            "handle().")
+
+    def handle_suppressed(self, diagnostic: VDIFDiagnostic):
+        """Receives first diagnostic to be rate-limited in each interval"""
+        return
+
+    def _suppressed_for(self) -> str:
+        # how long suppression lasts, for notices of it
+        if self.interval is None:
+            return ""
+        return f" for {self.interval:g} s"
+
+    def __check_window(self, key: Tuple[str,str]) -> Tuple[bool,bool]:
+        # window is [number passed on, start time] for this message
+        now = monotonic() if self.interval is not None else 0.0
+        window = self.__windows.get(key)
+        if window is None or (self.interval is not None and
+                now - window[1] >= self.interval):
+            window = [0, now]
+            self.__windows[key] = window
+        window[0] += 1
+        return (window[0] <= self.max_repeats,
+            window[0] == self.max_repeats + 1)
+
+
+class StderrSink(DiagnosticsSink):
+    """Sink that writes colored lines to stderr (the default sink)"""
+
+    def __init__(self, max_repeats: Optional[int]=5,
+            interval: Optional[float]=REPEAT_INTERVAL):
+        super().__init__(max_repeats, interval)
+        return
+
+    def handle(self, diagnostic: VDIFDiagnostic):
+        color = COLORS.get(diagnostic.severity, "")
+        stderr.write(f"{color}{diagnostic.severity.upper()}: " \
+            f"{diagnostic}\033[0m\n")
+        return
+
+    def handle_suppressed(self, diagnostic: VDIFDiagnostic):
+        color = COLORS.get(diagnostic.severity, "")
+        stderr.write(f"{color}{diagnostic.severity.upper()}: further " \
+            f"\"{diagnostic.message}\" messages suppressed" \
+            f"{self._suppressed_for()}.\033[0m\n")
+        return
+
+
+class CollectorSink(DiagnosticsSink):
+    """Sink that keeps diagnostics in a list, for inspection after parsing"""
+
+    def __init__(self, max_repeats: Optional[int]=100,
+            interval: Optional[float]=None):
+        super().__init__(max_repeats, interval)
+        self.diagnostics: list[VDIFDiagnostic] = []
+        return
+
+    def handle(self, diagnostic: VDIFDiagnostic):
+        self.diagnostics.append(diagnostic)
+        return
+
+    def clear(self):
+        """Forgets all collected diagnostics and counts"""
+        self.diagnostics.clear()
+        self.counts.clear()
+        self.suppressed.clear()
+        return
+
+
+class LoggingSink(DiagnosticsSink):
+    """Sink that passes diagnostics to a logging.Logger"""
+
+    def __init__(self, logger: Optional[logging.Logger]=None,
+            max_repeats: Optional[int]=5,
+            interval: Optional[float]=REPEAT_INTERVAL):
+        super().__init__(max_repeats, interval)
+        self.logger: logging.Logger = logger or logging.getLogger("vdifheader")
+        return
+
+    def handle(self, diagnostic: VDIFDiagnostic):
+        # context is attached to log record, so handlers can filter on it
+        level = LOG_LEVELS.get(diagnostic.severity, logging.WARNING)
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, "%s", diagnostic, extra={
+                "diagnostic": diagnostic,
+                "field": diagnostic.field,
+                "frame_index": diagnostic.frame_index,
+                "byte_offset": diagnostic.byte_offset})
+        return
+
+    def handle_suppressed(self, diagnostic: VDIFDiagnostic):
+        level = LOG_LEVELS.get(diagnostic.severity, logging.WARNING)
+        self.logger.log(level, "further \"%s\" messages suppressed%s.",
+            diagnostic.message, self._suppressed_for())
+        return
+
+
+class NullSink(DiagnosticsSink):
+    """Sink that discards all diagnostics"""
+
+    enabled = False
+
+    def handle(self, diagnostic: VDIFDiagnostic):
+        return
+
+
+_sink: DiagnosticsSink = StderrSink()
+_context = local()
+
+
+def get_diagnostics_sink() -> DiagnosticsSink:
+    """Gets sink that currently receives all warnings and errors"""
+    return _sink
+
+
+def set_diagnostics_sink(sink: Optional[DiagnosticsSink]) -> DiagnosticsSink:
+    """Sets sink to receive all warnings and errors, returning previous sink"""
+    global _sink
+    previous = _sink
+    _sink = sink if sink is not None else NullSink()
+    return previous
+
+
+def emit(severity: str, message: str, field: Any=None):
+    """Sends diagnostic with context of header being parsed to current sink"""
+    sink = _sink
+    if not sink.enabled:
+        return
+    sink.emit(VDIFDiagnostic(severity, message, field,
+        getattr(_context, "frame_index", None),
+        getattr(_context, "byte_offset", None)))
+    return
+
+
+def set_context(frame_index: Optional[int]=None,
+        byte_offset: Optional[int]=None):
+    """Sets position of header being parsed by current thread"""
+    _context.frame_index = frame_index
+    _context.byte_offset = byte_offset
+    return
+
+
+def clear_context():
+    """Forgets position of header being parsed by current thread"""
+    _context.frame_index = None
+    _context.byte_offset = None
+    return
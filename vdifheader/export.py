@@ -0,0 +1,379 @@
+# > vdifheader - export.py
+# Defines streaming export of headers as machine-readable rows
+
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+> vdifheader - export.py
+Defines streaming export of headers as machine-readable rows
+"""
+__author__ = "Mars Buttfield-Addison"
+__authors__ = [__author__]
+__contact__ = "hello@themartianlife.com"
+__copyright__ = f"Copyright 2022, {__author__}"
+__credits__ = __authors__
+__date__ = "2022/04/07"
+__deprecated__ = False
+__email__ = __contact__
+__license__ = "GPLv3"
+__maintainer__ = __author__
+__status__ = "Pre-release"
+__version__ = "0.1"
+
+import json
+from datetime import datetime
+from os.path import splitext
+from struct import Struct
+from typing import Any, Callable, Iterable, Iterator, Optional, TextIO
+
+try:  # exporting whole files needs numpy, but the rest of the package does not
+    import numpy as np
+except ImportError:
+    np = None
+try:  # parquet export needs pyarrow, but the rest of the package does not
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from vdifheader._utils import sanitized_path
+from vdifheader.headertable import CHUNK_FRAMES, ED_MASK, ED_WORD, \
+    HEADER_WORDS, header_table_chunks, decode_header_words, \
+    header_table_dtype, header_word_chunks, numpy_required
+from vdifheader.vdifheader import HEADER_STRUCT
+from vdifheader.vdifheaderfield import VDIFHeaderField as Field
+
+
+FORMATS = ["jsonl", "csv", "tsv"]   # row formats of VDIFHeaderWriter
+DELIMITERS = {"csv": ",", "tsv": "\t"}
+BATCH_ROWS = 4096       # rows formatted before each write to output
+MAX_CACHED_MASK = 0xffff    # widest field whose formatted values are cached
+EXPORTED_FIELDS = Field.primary_values()    # columns, in header order
+# last column(s), as extended_data column of get_header_table
+EXTENDED_DATA_COLUMNS = [f"{Field.EXTENDED_DATA.value}_{i}"
+    for i in range(HEADER_WORDS - ED_WORD)]
+FILE_FORMATS = FORMATS + ["npy", "parquet"]    # formats of export_headers
+NPY_ALIGN = 64          # .npy header (and so data) starts are aligned to this
+NPY_MAX_ROWS = (1 << 63) - 1    # most rows .npy header is reserved room for
+NPY_HEADER_LENGTH = Struct("<H")    # length field of version 1.0 .npy header
+ROW_GROUP_ROWS = 1 << 18    # headers in each parquet row group (and batch)
+PARQUET_COMPRESSION = "zstd"
+# low-cardinality columns, stored as a dictionary of values plus indices
+DICTIONARY_FIELDS = [Field.INVALID_FLAG, Field.LEGACY_MODE,
+    Field.UNASSIGNED_FIELD, Field.REFERENCE_EPOCH, Field.VDIF_VERSION,
+    Field.NUM_CHANNELS, Field.DATA_FRAME_LENGTH, Field.DATA_TYPE,
+    Field.BITS_PER_SAMPLE, Field.THREAD_ID, Field.STATION_ID,
+    Field.EXTENDED_DATA_VERSION]
+# counters that mostly step by 0 or 1, so are stored as differences
+DELTA_FIELDS = [Field.SECONDS_FROM_EPOCH, Field.DATA_FRAME_NUMBER]
+
+
+class VDIFHeaderWriter:
+    """A class that writes headers to a text stream, one row per header"""
+
+    def __init__(self, output: TextIO, output_format: str="csv",
+            batch_rows: int=BATCH_ROWS):
+        """
+        Creates new writer, and queues the column names row (if any)
+
+            parameter:
+                output: TextIO          stream to write rows to
+                output_format: str      "jsonl", "csv" or "tsv"
+                batch_rows: int         rows formatted before each write
+        """
+        if output_format not in FORMATS:
+            raise ValueError(f"output_format must be one of {FORMATS}, " \
+                f"not {output_format!r}.")
+        self.output_format: str = output_format
+        self.num_rows: int = 0
+        self.__output: TextIO = output
+        self.__batch_rows: int = batch_rows
+        self.__rows: list[str] = []
+        # formatter of each column, worked out once rather than per value
+        self.__columns: list[tuple[int,int,int,Optional[dict[int,str]],
+            Callable[[int],str]]] = [
+            (*field._word_layout,
+                {} if field._word_layout[2] <= MAX_CACHED_MASK else None,
+                _raw_formatter(field, output_format))
+            for field in EXPORTED_FIELDS]
+        names = [field.value for field in EXPORTED_FIELDS]
+        if output_format == "jsonl":
+            # each row fills in values between precomputed keys, with
+            # extended data words as one list
+            self.__template: str = "{{" + ", ".join(
+                f"{json.dumps(name)}: {{}}" for name in names) + \
+                f", {json.dumps(Field.EXTENDED_DATA.value)}: [" + \
+                ", ".join(["{}"] * len(EXTENDED_DATA_COLUMNS)) + "]}}\n"
+        else:
+            # extended data words as one column each
+            names += EXTENDED_DATA_COLUMNS
+            delimiter = DELIMITERS[output_format]
+            self.__template = delimiter.join(["{}"] * len(names)) + "\n"
+            self.__rows.append(delimiter.join(names) + "\n")
+        return
+
+    ######## PUBLIC METHODS
+
+    def write_words(self, words: tuple[int,...]):
+        """Queues row of header given as its 8 raw header words"""
+        values = []
+        for word, shift, mask, cache, format_raw in self.__columns:
+            raw_value = (words[word] >> shift) & mask
+            if cache is None:
+                values.append(format_raw(raw_value))
+                continue
+            text = cache.get(raw_value)
+            if text is None:
+                text = cache[raw_value] = format_raw(raw_value)
+            values.append(text)
+        values.append(words[ED_WORD] & ED_MASK)
+        values.extend(words[ED_WORD + 1:])
+        self.__rows.append(self.__template.format(*values))
+        self.num_rows += 1
+        if len(self.__rows) >= self.__batch_rows:
+            self.flush()
+        return
+
+    def write_header(self, header: Any):
+        """Queues row of VDIFHeader or VDIFHeaderRecord"""
+        self.write_words(HEADER_STRUCT.unpack(header.to_bytes()))
+        return
+
+    def write_headers(self, headers: Iterable[Any]) -> int:
+        """Queues row of each header, and returns number of rows queued"""
+        num_rows = self.num_rows
+        for header in headers:
+            self.write_words(HEADER_STRUCT.unpack(header.to_bytes()))
+        return self.num_rows - num_rows
+
+    def flush(self):
+        """Writes queued rows to output in one call"""
+        if self.__rows:
+            self.__output.write("".join(self.__rows))
+            self.__rows.clear()
+        return
+
+    ######## OVERLOADED METHODS
+
+    def __enter__(self) -> "VDIFHeaderWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+        return
+
+
+def export_headers(input_filepath: str, output_filepath: str,
+        output_format: Optional[str]=None, count: Optional[int]=None,
+        chunk_frames: int=CHUNK_FRAMES) -> int:
+    """
+    Writes first count headers in file into one file, a chunk at a time
+
+        parameter:
+            input_filepath: str         the path to a valid VDIF file
+            output_filepath: str        the path of file to (over)write
+            output_format: Optional[str]    "jsonl", "csv", "tsv" (rows as
+                                        VDIFHeaderWriter), "npy" (table as
+                                        get_header_table) or "parquet" (as
+                                        write_parquet), else from extension
+                                        of output filepath
+            count: Optional[int]        number of headers to export, else all
+            chunk_frames: int           most headers read from file at once
+
+        returns:
+            int                         number of headers written
+    """
+    numpy_required("export_headers")
+    if output_format is None:
+        output_format = splitext(output_filepath)[1].lstrip(".").lower()
+    if output_format not in FILE_FORMATS:
+        raise ValueError(f"output_format must be one of {FILE_FORMATS}, " \
+            f"not {output_format!r}.")
+    output_filepath = sanitized_path(output_filepath)
+    if output_format == "npy":
+        return _export_npy(input_filepath, output_filepath, count,
+            chunk_frames)
+    if output_format == "parquet":
+        # each chunk of headers is one row group
+        return _write_batches((_record_batch(table) for table in
+            header_table_chunks(input_filepath, count, chunk_frames)),
+            output_filepath)
+    with open(output_filepath, "w", newline="") as output_file, \
+            VDIFHeaderWriter(output_file, output_format) as writer:
+        for words in header_word_chunks(input_filepath, count, chunk_frames):
+            for row in words.tolist():
+                writer.write_words(row)
+    return writer.num_rows
+
+
+def header_record_batches(headers: Iterable[Any],
+        batch_rows: int=ROW_GROUP_ROWS) -> Iterator["pa.RecordBatch"]:
+    """
+    Converts stream of headers into Arrow record batches, one column per field
+
+        parameter:
+            headers: Iterable[Any]  VDIFHeader or VDIFHeaderRecord objects,
+                                    e.g. from get_headers
+            batch_rows: int         most headers in each batch
+
+        returns:
+            Iterator[pa.RecordBatch]    batches with same columns as
+                                        get_header_table, so memory use is
+                                        bounded by batch_rows
+    """
+    numpy_required("header_record_batches")
+    pyarrow_required("header_record_batches")
+    raw_headers = []
+    for header in headers:
+        raw_headers.append(header.to_bytes())
+        if len(raw_headers) == batch_rows:
+            yield _record_batch(_decode_raw_headers(raw_headers))
+            raw_headers.clear()
+    if raw_headers:
+        yield _record_batch(_decode_raw_headers(raw_headers))
+
+
+def write_parquet(headers: Iterable[Any], output_filepath: str,
+        row_group_rows: int=ROW_GROUP_ROWS,
+        compression: str=PARQUET_COMPRESSION) -> int:
+    """
+    Writes stream of headers to Parquet file, a row group at a time
+
+        parameter:
+            headers: Iterable[Any]  VDIFHeader or VDIFHeaderRecord objects,
+                                    e.g. from get_headers
+            output_filepath: str    the path of file to (over)write
+            row_group_rows: int     most headers in each row group
+            compression: str        parquet compression codec of each column
+
+        returns:
+            int                     number of headers written
+    """
+    numpy_required("write_parquet")
+    pyarrow_required("write_parquet")
+    return _write_batches(header_record_batches(headers, row_group_rows),
+        sanitized_path(output_filepath), compression)
+
+
+def pyarrow_required(caller: str):
+    """Raises ImportError if optional pyarrow dependency is not installed"""
+    if pa is None:
+        raise ImportError(f"{caller} requires pyarrow, which is not " \
+            "installed. Install it with `pip install pyarrow`.")
+
+######## PRIVATE METHODS
+
+def _raw_formatter(field: Field, output_format: str) -> Callable[[int],str]:
+    # from raw unsigned int straight to text of decoded value
+    decode = field._word_decoder
+    if field.data_type == int:
+        if decode is int:
+            return str
+        return lambda raw_value: str(decode(raw_value))
+    if field.data_type == bool:
+        return lambda raw_value: "true" if decode(raw_value) else "false"
+    if field.data_type == datetime:
+        format_value = lambda value: value.date().isoformat()
+    else:
+        format_value = lambda value: value
+    if output_format == "jsonl":
+        return lambda raw_value: json.dumps(format_value(decode(raw_value)))
+    delimiter = DELIMITERS[output_format]
+    return lambda raw_value: _quoted(format_value(decode(raw_value)),
+        delimiter)
+
+
+def _quoted(text: str, delimiter: str) -> str:
+    # as csv module's minimal quoting, so any csv reader gets text back
+    if any(char in text for char in (delimiter, '"', "\n", "\r")):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def _export_npy(input_filepath: str, output_filepath: str,
+        count: Optional[int], chunk_frames: int) -> int:
+    # number of rows isn't known until the end, so room is left for header
+    # of any size, which is filled in once all tables have been written
+    dtype = header_table_dtype()
+    num_rows = 0
+    with open(output_filepath, "wb") as output_file:
+        output_file.write(_npy_header(dtype, NPY_MAX_ROWS))
+        for table in header_table_chunks(input_filepath, count, chunk_frames):
+            output_file.write(table.tobytes())
+            num_rows += len(table)
+        output_file.seek(0)
+        output_file.write(_npy_header(dtype, num_rows))
+    return num_rows
+
+
+def _npy_header(dtype: "np.dtype", num_rows: int) -> bytes:
+    # version 1.0 header, padded to same length whatever the number of rows
+    prefix = np.lib.format.magic(1, 0)
+    header = repr({"descr": np.lib.format.dtype_to_descr(dtype),
+        "fortran_order": False, "shape": (num_rows,)})
+    longest = len(repr({"descr": np.lib.format.dtype_to_descr(dtype),
+        "fortran_order": False, "shape": (NPY_MAX_ROWS,)}))
+    total = len(prefix) + NPY_HEADER_LENGTH.size + longest + 1
+    total += -total % NPY_ALIGN
+    header_length = total - len(prefix) - NPY_HEADER_LENGTH.size
+    header = header.ljust(header_length - 1) + "\n"
+    return prefix + NPY_HEADER_LENGTH.pack(header_length) + \
+        header.encode("latin1")
+
+
+def _decode_raw_headers(raw_headers: list[bytes]) -> "np.ndarray":
+    return decode_header_words(np.frombuffer(b"".join(raw_headers),
+        dtype="<u4"))
+
+
+def _arrow_schema() -> "pa.Schema":
+    # as header_table_dtype, with epoch as UTC and strings of any length
+    types = {
+        Field.REFERENCE_EPOCH.value: pa.timestamp("s", tz="UTC"),
+        Field.DATA_TYPE.value: pa.string(),
+        Field.STATION_ID.value: pa.string(),
+        Field.EXTENDED_DATA.value: pa.list_(pa.uint32(),
+            header_table_dtype()[Field.EXTENDED_DATA.value].shape[0]),
+    }
+    dtype = header_table_dtype()
+    return pa.schema([(name, types[name] if name in types else
+        pa.from_numpy_dtype(dtype[name])) for name in dtype.names])
+
+
+def _record_batch(table: "np.ndarray") -> "pa.RecordBatch":
+    schema = _arrow_schema()
+    columns = []
+    for column in schema:
+        values = table[column.name]
+        if column.name == Field.REFERENCE_EPOCH.value:
+            values = values.astype(np.int64)
+        elif column.name == Field.EXTENDED_DATA.value:
+            columns.append(pa.FixedSizeListArray.from_arrays(
+                pa.array(values.reshape(-1)), column.type.list_size))
+            continue
+        columns.append(pa.array(values, type=column.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def _write_batches(batches: Iterable["pa.RecordBatch"], output_filepath: str,
+        compression: str=PARQUET_COMPRESSION) -> int:
+    pyarrow_required("parquet export")
+    num_rows = 0
+    with pq.ParquetWriter(output_filepath, _arrow_schema(),
+            compression=compression,
+            use_dictionary=[field.value for field in DICTIONARY_FIELDS],
+            column_encoding={field.value: "DELTA_BINARY_PACKED"
+                for field in DELTA_FIELDS}) as writer:
+        for batch in batches:
+            # one row group per batch, so memory use is bounded by its size
+            writer.write_batch(batch, row_group_size=max(1, batch.num_rows))
+            num_rows += batch.num_rows
+    return num_rows
@@ -0,0 +1,289 @@
+# > vdifheader - gaps.py
+# Defines streaming analysis of missing, duplicated and out-of-order frames
+
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+> vdifheader - gaps.py
+Defines streaming analysis of missing, duplicated and out-of-order frames
+"""
+__author__ = "Mars Buttfield-Addison"
+__authors__ = [__author__]
+__contact__ = "hello@themartianlife.com"
+__copyright__ = f"Copyright 2022, {__author__}"
+__credits__ = __authors__
+__date__ = "2022/04/07"
+__deprecated__ = False
+__email__ = __contact__
+__license__ = "GPLv3"
+__maintainer__ = __author__
+__status__ = "Pre-release"
+__version__ = "0.1"
+
+from sys import stdout
+from typing import Any, Optional, Tuple
+
+from vdifheader.rates import VDIFRateEstimator
+
+
+REORDER_WINDOW = 1024   # frames late a frame can arrive and not be a duplicate
+INFERENCE_SECONDS = 3   # distinct seconds to see before inferring frame rate
+MAX_PENDING = 1 << 20   # frames held while frame rate is still being inferred
+
+
+class VDIFFrameRange:
+    """A class that represents a run of consecutive frames of one thread"""
+
+    def __init__(self, start: Tuple[int,int], end: Tuple[int,int],
+            count: int):
+        self.start: Tuple[int,int] = start  # (seconds_from_epoch, frame num)
+        self.end: Tuple[int,int] = end      # of first and last frame in range
+        self.count: int = count
+        return
+
+    def to_dict(self) -> dict[str,Any]:
+        """Creates dict of range attributes as format name: value"""
+        return {"start": list(self.start), "end": list(self.end),
+            "count": self.count}
+
+    def __str__(self) -> str:
+        if self.count == 1:
+            return f"{self.start[0]}s #{self.start[1]}"
+        return f"{self.start[0]}s #{self.start[1]} to " \
+            f"{self.end[0]}s #{self.end[1]} ({self.count} frames)"
+
+    def __eq__(self, other: "VDIFFrameRange") -> bool:
+        return (isinstance(other, VDIFFrameRange) and
+            (self.start, self.end, self.count) ==
+            (other.start, other.end, other.count))
+
+
+class VDIFThreadGaps:
+    """A class that represents the frames missing from one thread's stream"""
+
+    def __init__(self, thread_id: int, num_frames: int,
+            first: Optional[Tuple[int,int]], last: Optional[Tuple[int,int]],
+            missing: list[VDIFFrameRange], duplicated: list[VDIFFrameRange],
+            out_of_order: list[VDIFFrameRange]):
+        self.thread_id: int = thread_id
+        self.num_frames: int = num_frames
+        self.first: Optional[Tuple[int,int]] = first
+        self.last: Optional[Tuple[int,int]] = last
+        self.missing: list[VDIFFrameRange] = missing
+        self.duplicated: list[VDIFFrameRange] = duplicated
+        self.out_of_order: list[VDIFFrameRange] = out_of_order
+        return
+
+    @property
+    def num_missing(self) -> int:
+        """Number of frames in this thread's stream never seen"""
+        return sum(frame_range.count for frame_range in self.missing)
+
+    @property
+    def num_duplicated(self) -> int:
+        """Number of frames seen again after they were first seen"""
+        return sum(frame_range.count for frame_range in self.duplicated)
+
+    @property
+    def num_out_of_order(self) -> int:
+        """Number of frames seen after a frame that should follow them"""
+        return sum(frame_range.count for frame_range in self.out_of_order)
+
+    def to_dict(self) -> dict[str,Any]:
+        """Creates dict of thread gap attributes as format name: value"""
+        return {
+            "thread_id": self.thread_id,
+            "num_frames": self.num_frames,
+            "first": None if self.first is None else list(self.first),
+            "last": None if self.last is None else list(self.last),
+            "missing": [r.to_dict() for r in self.missing],
+            "duplicated": [r.to_dict() for r in self.duplicated],
+            "out_of_order": [r.to_dict() for r in self.out_of_order],
+        }
+
+
+class VDIFGapReport:
+    """A class that represents the frames missing from every thread's stream"""
+
+    def __init__(self, frames_per_second: int,
+            threads: dict[int,VDIFThreadGaps]):
+        self.frames_per_second: int = frames_per_second
+        self.threads: dict[int,VDIFThreadGaps] = threads
+        return
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether every thread has no missing, duplicated or late frames"""
+        return all(len(gaps.missing) + len(gaps.duplicated) +
+            len(gaps.out_of_order) == 0 for gaps in self.threads.values())
+
+    def to_dict(self) -> dict[str,Any]:
+        """Creates dict of report as format name: value"""
+        return {
+            "frames_per_second": self.frames_per_second,
+            "threads": [gaps.to_dict() for gaps in self.threads.values()],
+        }
+
+    def print_report(self):
+        """Prints count and ranges of frames missing from each thread"""
+        stdout.write(f"Frames per second: {self.frames_per_second}\n")
+        for thread_id, gaps in sorted(self.threads.items()):
+            stdout.write(f"Thread {thread_id}: {gaps.num_frames} frames, " \
+                f"{gaps.num_missing} missing, {gaps.num_duplicated} " \
+                f"duplicated, {gaps.num_out_of_order} out of order\n")
+            for name, ranges in [("Missing", gaps.missing),
+                    ("Duplicated", gaps.duplicated),
+                    ("Out of order", gaps.out_of_order)]:
+                for frame_range in ranges:
+                    stdout.write(f"  {name}: {frame_range}\n")
+        return
+
+
+class VDIFGapAnalyser:
+    """A class that finds missing frames in a stream of headers, as they come"""
+
+    def __init__(self, frames_per_second: Optional[int]=None,
+            reorder_window: int=REORDER_WINDOW):
+        """
+        Creates new analyser, that infers frame rate if it is not given
+
+            parameter:
+                frames_per_second: Optional[int]    frames of each thread per
+                                                    second, else infer it
+                reorder_window: int                 frames late a frame can
+                                                    be and still fill a gap
+        """
+        self.frames_per_second: Optional[int] = frames_per_second
+        self.reorder_window: int = reorder_window
+        self.__threads: dict[int,_ThreadState] = {}
+        # frames held until frame rate is known, only if it wasn't given
+        self.__pending: list[Tuple[int,int,int]] = []
+        self.__pending_seconds: set[int] = set()
+        self.__rates: VDIFRateEstimator = VDIFRateEstimator()
+        return
+
+    def add(self, thread_id: int, seconds_from_epoch: int,
+            data_frame_number: int):
+        """Adds next frame in stream, by its thread and time fields"""
+        if self.frames_per_second is None:
+            self.__pending.append((thread_id, seconds_from_epoch,
+                data_frame_number))
+            self.__pending_seconds.add(seconds_from_epoch)
+            self.__rates.add_frame(thread_id, seconds_from_epoch,
+                data_frame_number)
+            if len(self.__pending_seconds) >= INFERENCE_SECONDS or \
+                    len(self.__pending) >= MAX_PENDING:
+                self.__infer_frame_rate()
+            return
+        state = self.__threads.get(thread_id)
+        if state is None:
+            state = _ThreadState(self.reorder_window)
+            self.__threads[thread_id] = state
+        state.add(seconds_from_epoch * self.frames_per_second +
+            data_frame_number)
+        return
+
+    def add_header(self, header: Any):
+        """Adds next header in stream (VDIFHeader or VDIFHeaderRecord)"""
+        self.add(header.thread_id, header.seconds_from_epoch,
+            header.data_frame_number)
+        return
+
+    def finish(self) -> VDIFGapReport:
+        """Ends stream, and reports frames missing from each thread"""
+        if self.frames_per_second is None:
+            self.__infer_frame_rate()
+        fps = self.frames_per_second
+        to_frame = lambda position: tuple(divmod(position, fps))
+        to_ranges = lambda ranges: [VDIFFrameRange(to_frame(start),
+            to_frame(end - 1), end - start) for start, end in ranges]
+        threads = {}
+        for thread_id, state in self.__threads.items():
+            state.finish()
+            threads[thread_id] = VDIFThreadGaps(thread_id, state.num_frames,
+                None if state.first is None else to_frame(state.first),
+                None if state.last is None else to_frame(state.last),
+                to_ranges(state.missing), to_ranges(state.duplicated),
+                to_ranges(state.out_of_order))
+        return VDIFGapReport(fps, threads)
+
+    def __infer_frame_rate(self):
+        # as infer_rates() would from the same frames, but every thread is
+        # positioned at the same rate, so use the highest if they disagree
+        pending = self.__pending
+        self.frames_per_second = self.__rates.max_frames_per_second or 1
+        self.__pending, self.__pending_seconds = [], set()
+        for frame in pending:
+            self.add(*frame)
+        return
+
+
+######## PRIVATE METHODS
+
+class _ThreadState:
+    # positions are frames since epoch (seconds * frame rate + frame number).
+    # gaps stay open for reorder_window frames, so memory use is constant
+
+    def __init__(self, reorder_window: int):
+        self.reorder_window = reorder_window
+        self.num_frames = 0
+        self.first: Optional[int] = None
+        self.last: Optional[int] = None
+        self.next: Optional[int] = None     # position of next expected frame
+        self.open_gaps: list[list[int]] = []    # [start, end) not yet closed
+        self.missing: list[list[int]] = []
+        self.duplicated: list[list[int]] = []
+        self.out_of_order: list[list[int]] = []
+        return
+
+    def add(self, position: int):
+        self.num_frames += 1
+        if self.next is None:
+            self.first = position
+        elif position < self.next:
+            self.__add_late(position)
+            return
+        elif position > self.next:
+            self.open_gaps.append([self.next, position])
+        self.next = position + 1
+        self.last = position
+        # gaps too old to be filled by a late frame are now missing
+        oldest = self.next - self.reorder_window
+        while len(self.open_gaps) > 0 and self.open_gaps[0][1] <= oldest:
+            _append_range(self.missing, *self.open_gaps.pop(0))
+        return
+
+    def finish(self):
+        for start, end in self.open_gaps:
+            _append_range(self.missing, start, end)
+        self.open_gaps = []
+        return
+
+    def __add_late(self, position: int):
+        # frame fills an open gap (out of order), or was already seen
+        for i, (start, end) in enumerate(self.open_gaps):
+            if start <= position < end:
+                pieces = [[start, position], [position + 1, end]]
+                self.open_gaps[i:i + 1] = [[s, e] for s, e in pieces if s < e]
+                _append_range(self.out_of_order, position, position + 1)
+                return
+        _append_range(self.duplicated, position, position + 1)
+        return
+
+
+def _append_range(ranges: list[list[int]], start: int, end: int):
+    # extend last range if this one carries straight on from it
+    if len(ranges) > 0 and ranges[-1][1] == start:
+        ranges[-1][1] = end
+    else:
+        ranges.append([start, end])
+    return
+
@@ -0,0 +1,269 @@
+# > vdifheader - generator.py
+# Defines generation of synthetic VDIF files, optionally with injected faults
+
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+> vdifheader - generator.py
+Defines generation of synthetic VDIF files, optionally with injected faults
+"""
+__author__ = "Mars Buttfield-Addison"
+__authors__ = [__author__]
+__contact__ = "hello@themartianlife.com"
+__copyright__ = f"Copyright 2022, {__author__}"
+__credits__ = __authors__
+__date__ = "2022/04/07"
+__deprecated__ = False
+__email__ = __contact__
+__license__ = "GPLv3"
+__maintainer__ = __author__
+__status__ = "Pre-release"
+__version__ = "0.1"
+
+from argparse import ArgumentParser
+from datetime import datetime
+from typing import Any, Optional
+
+try:  # vectorized encoding needs numpy, but the rest of the package does not
+    import numpy as np
+except ImportError:
+    np = None
+
+from vdifheader._utils import posint, sanitized_path
+from vdifheader.headertable import HEADER_BYTES, encode_header_table, \
+    numpy_required
+from vdifheader.vdifheaderfield import VDIFHeaderField as Field
+
+
+CHUNK_BYTES = 64 << 20  # bytes of frames built in memory before each write
+PAYLOADS = ["zeros", "random"]  # what fills each frame after its header
+SIZE_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+class VDIFFaults:
+    """A class that represents how often each fault is injected into frames"""
+
+    def __init__(self, gap_rate: float=0.0, duplicate_rate: float=0.0,
+            invalid_rate: float=0.0, bad_length_rate: float=0.0):
+        """
+        Creates new set of fault rates, each a probability per frame
+
+            parameter:
+                gap_rate: float         frame is left out of file
+                duplicate_rate: float   frame is written twice in a row
+                invalid_rate: float     frame has invalid_flag set
+                bad_length_rate: float  frame's data_frame_length is wrong,
+                                        though the frame is not
+        """
+        rates = [gap_rate, duplicate_rate, invalid_rate, bad_length_rate]
+        if any(not 0.0 <= rate <= 1.0 for rate in rates):
+            raise ValueError("VDIFFaults rates must be between 0 and 1.")
+        self.gap_rate: float = gap_rate
+        self.duplicate_rate: float = duplicate_rate
+        self.invalid_rate: float = invalid_rate
+        self.bad_length_rate: float = bad_length_rate
+        return
+
+    def to_dict(self) -> dict[str,Any]:
+        """Creates dict of fault rates as format name: value"""
+        return dict(vars(self))
+
+
+def generate_file(output_filepath: str, num_frames: int,
+        num_threads: int=1, frames_per_second: int=10000,
+        data_frame_length: int=8032, station_id: str="Tt",
+        reference_epoch: datetime=datetime(2021, 7, 1),
+        start_seconds: int=0, num_channels: int=1, bits_per_sample: int=2,
+        data_type: str="real", extended_data_version: int=0,
+        faults: Optional[VDIFFaults]=None, seed: Optional[int]=None,
+        payload: str="zeros") -> dict[str,int]:
+    """
+    Writes VDIF file of evenly interleaved threads, a chunk at a time
+
+        parameter:
+            output_filepath: str        the path of file to (over)write
+            num_frames: int             frames to generate across all threads,
+                                        before any are dropped or duplicated
+            num_threads: int            threads, numbered from 0
+            frames_per_second: int      frames of each thread per second
+            data_frame_length: int      bytes of each frame, including header
+            station_id: str             station of every frame
+            reference_epoch: datetime   epoch of every frame
+            start_seconds: int          seconds_from_epoch of first frame
+            num_channels: int           (header values of every frame)
+            bits_per_sample: int
+            data_type: str
+            extended_data_version: int
+            faults: Optional[VDIFFaults]    faults to inject, else none
+            seed: Optional[int]         seed of faults and random payload, so
+                                        same arguments give same file
+            payload: str                "zeros" (fastest) or "random" bytes
+
+    returns:
+            dict[str,int]               number of frames written, and of each
+                                        fault injected
+    """
+    numpy_required("generate_file")
+    if payload not in PAYLOADS:
+        raise ValueError(f"payload must be one of {PAYLOADS}.")
+    if data_frame_length < HEADER_BYTES or data_frame_length % 8 != 0:
+        raise ValueError("data_frame_length must be a multiple of 8 bytes " \
+            f">= {HEADER_BYTES}.")
+    rng = np.random.default_rng(seed)
+    faults = faults or VDIFFaults()
+    # header fields shared by every frame, encoded once
+    template = encode_header_table({
+        Field.REFERENCE_EPOCH.value: np.array([reference_epoch],
+            dtype="<M8[s]"),
+        Field.NUM_CHANNELS.value: [num_channels],
+        Field.DATA_FRAME_LENGTH.value: [data_frame_length],
+        Field.DATA_TYPE.value: [data_type],
+        Field.BITS_PER_SAMPLE.value: [bits_per_sample],
+        Field.STATION_ID.value: [station_id],
+        Field.EXTENDED_DATA_VERSION.value: [extended_data_version],
+    })
+    counts = {"frames": 0, "gaps": 0, "duplicates": 0, "invalid": 0,
+        "bad_lengths": 0}
+    chunk_frames = max(1, CHUNK_BYTES // data_frame_length)
+    # one buffer is reused for every chunk (with room for each frame to be
+    # duplicated), so a zero payload is only ever written into it once
+    frames = np.zeros((min(num_frames, chunk_frames) * 2, data_frame_length),
+        dtype=np.uint8)
+    with open(sanitized_path(output_filepath), "wb") as output_file:
+        for first in range(0, num_frames, chunk_frames):
+            indices = np.arange(first, min(first + chunk_frames, num_frames))
+            words = _frame_words(template, indices, num_threads,
+                frames_per_second, start_seconds)
+            words, counts_delta = _inject_faults(words, faults, rng,
+                data_frame_length)
+            chunk = frames[:len(words)]
+            if payload == "random":
+                payload_bytes = data_frame_length - HEADER_BYTES
+                chunk[:, HEADER_BYTES:] = np.frombuffer(rng.bytes(
+                    len(words) * payload_bytes), dtype=np.uint8).reshape(
+                    len(words), payload_bytes)
+            chunk[:, :HEADER_BYTES] = words.view(np.uint8)
+            output_file.write(chunk.data)
+            for name, count in counts_delta.items():
+                counts[name] += count
+    return counts
+
+
+def arg_parser() -> ArgumentParser:
+    # parse command line args
+    parser = ArgumentParser(prog="vdifheader.generator",
+        description="Generate synthetic VDIF files")
+    # arguments about size of file
+    size_group = parser.add_mutually_exclusive_group(required=True)
+    size_group.add_argument("-n", "--frames", dest="num_frames",
+        metavar="NUM", type=posint, help="number of frames to generate")
+    size_group.add_argument("-s", "--size", dest="size_bytes",
+        metavar="SIZE", type=_byte_size,
+        help="approximate file size, e.g. 4G")
+    # arguments about stream format
+    parser.add_argument("-t", "--threads", dest="num_threads", type=posint,
+        default=1, help="number of interleaved threads")
+    parser.add_argument("--fps", dest="frames_per_second", type=posint,
+        default=10000, help="frames per second of each thread")
+    parser.add_argument("--frame-length", dest="data_frame_length",
+        type=posint, default=8032, help="bytes per frame, including header")
+    parser.add_argument("--station", dest="station_id", default="Tt",
+        help="station id of every frame")
+    parser.add_argument("--epoch", dest="reference_epoch",
+        type=datetime.fromisoformat, default=datetime(2021, 7, 1),
+        help="reference epoch, e.g. 2021-07-01")
+    parser.add_argument("--edv", dest="extended_data_version",
+        type=lambda x: int(x, 0), default=0,
+        help="extended data version, e.g. 0x02")
+    parser.add_argument("--payload", choices=PAYLOADS, default="zeros",
+        help="what fills each frame after its header")
+    parser.add_argument("--seed", type=int, default=None,
+        help="seed for reproducible faults and payload")
+    # arguments about faults to inject
+    for name, description in [("gap", "dropped"),
+            ("duplicate", "written twice"), ("invalid", "flagged invalid"),
+            ("bad-length", "given a wrong data_frame_length")]:
+        parser.add_argument(f"--{name}-rate", type=float, default=0.0,
+            help=f"probability of each frame being {description}")
+    # arguments about file to write
+    parser.add_argument("output_file", metavar="OUTPUT_FILE")
+    return parser
+
+
+def main(argv: Optional[list[str]]=None):
+    """Generates file as per command line args, and prints faults injected"""
+    args = vars(arg_parser().parse_args(argv))
+    num_frames = args["num_frames"] or \
+        max(1, args["size_bytes"] // args["data_frame_length"])
+    faults = VDIFFaults(args["gap_rate"], args["duplicate_rate"],
+        args["invalid_rate"], args["bad_length_rate"])
+    counts = generate_file(args["output_file"], num_frames,
+        num_threads=args["num_threads"],
+        frames_per_second=args["frames_per_second"],
+        data_frame_length=args["data_frame_length"],
+        station_id=args["station_id"],
+        reference_epoch=args["reference_epoch"],
+        extended_data_version=args["extended_data_version"],
+        faults=faults, seed=args["seed"], payload=args["payload"])
+    print(", ".join(f"{name}: {count}" for name, count in counts.items()))
+    return
+
+######## PRIVATE METHODS
+
+def _frame_words(template: "np.ndarray", indices: "np.ndarray",
+        num_threads: int, frames_per_second: int,
+        start_seconds: int) -> "np.ndarray":
+    # frame i is thread (i % num_threads) at time step (i // num_threads)
+    time_steps = indices // num_threads
+    columns = {
+        Field.SECONDS_FROM_EPOCH.value:
+            start_seconds + time_steps // frames_per_second,
+        Field.DATA_FRAME_NUMBER.value: time_steps % frames_per_second,
+        Field.THREAD_ID.value: indices % num_threads,
+    }
+    return encode_header_table(columns) | template
+
+
+def _inject_faults(words: "np.ndarray", faults: VDIFFaults,
+        rng: "np.random.Generator",
+        data_frame_length: int) -> tuple["np.ndarray",dict[str,int]]:
+    # header faults first, then frames are dropped or repeated
+    num_frames = len(words)
+    invalid = rng.random(num_frames) < faults.invalid_rate
+    words[invalid, 0] |= np.uint32(1 << 31)
+    bad_length = rng.random(num_frames) < faults.bad_length_rate
+    word, bit, mask = Field.DATA_FRAME_LENGTH._word_layout
+    # any length but the true one (in units of 8 bytes)
+    raw_length = data_frame_length // 8
+    wrong_lengths = rng.integers(1, mask, size=num_frames, dtype=np.int64)
+    wrong_lengths += wrong_lengths >= raw_length
+    words[bad_length, word] = (words[bad_length, word] & ~np.uint32(mask)) | \
+        wrong_lengths[bad_length].astype("<u4")
+    gaps = rng.random(num_frames) < faults.gap_rate
+    duplicates = (rng.random(num_frames) < faults.duplicate_rate) & ~gaps
+    repeats = np.where(gaps, 0, np.where(duplicates, 2, 1))
+    words = np.repeat(words, repeats, axis=0)
+    # faulty headers are counted as often as they are written
+    return words, {"frames": len(words), "gaps": int(gaps.sum()),
+        "duplicates": int(duplicates.sum()),
+        "invalid": int(repeats[invalid].sum()),
+        "bad_lengths": int(repeats[bad_length].sum())}
+
+
+def _byte_size(value: str) -> int:
+    unit = SIZE_UNITS.get(value[-1:].upper())
+    if unit is None:
+        return posint(value)
+    return posint(float(value[:-1]) * unit)
+
+
+if __name__ == "__main__":
+    main()
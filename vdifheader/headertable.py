@@ -0,0 +1,529 @@
+# > vdifheader - headertable.py
+# Defines vectorized methods that decode many VDIF headers into a single table
+
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+> vdifheader - headertable.py
+Defines vectorized methods that decode many VDIF headers into a single table
+"""
+__author__ = "Mars Buttfield-Addison"
+__authors__ = [__author__]
+__contact__ = "hello@themartianlife.com"
+__copyright__ = f"Copyright 2022, {__author__}"
+__credits__ = __authors__
+__date__ = "2022/04/07"
+__deprecated__ = False
+__email__ = __contact__
+__license__ = "GPLv3"
+__maintainer__ = __author__
+__status__ = "Pre-release"
+__version__ = "0.1"
+
+from os import path
+from typing import Any, Iterator, Optional, Tuple, Union
+
+try:  # vectorized decoding needs numpy, but the rest of the package does not
+    import numpy as np
+except ImportError:
+    np = None
+
+from vdifheader._utils import sanitized_path, to_utc
+from vdifheader.vdifheaderfield import VDIFHeaderField as Field, \
+    ASCII_START
+
+
+WORD_BYTES = 4          # number of bytes in a word
+WORD_BITS = 32          # number of bits in a word
+HEADER_WORDS = 8        # number of words in a (non-legacy) header
+HEADER_BYTES = 32       # number of bytes in a (non-legacy) header
+ED_WORD = 4             # first word of extended data
+ED_MASK = 0xffffff      # bits of first extended data word not used by edv
+CHUNK_FRAMES = 1 << 16  # headers decoded at once by header_table_chunks
+RESYNC_BLOCK_WORDS = 1 << 20    # candidate words checked at once by resync
+STREAM_MASKS = [0x3f000000, 0xffffffff, 0xfc00ffff]   # bits of words 1 to 3
+                                # (epoch, format, station) equal in a stream
+
+# dtypes of extended data columns that are not unsigned ints
+_EXTENDED_DATA_DTYPES = {
+    Field.SAMPLE_RATE_UNIT: "<U3",
+    Field.DAS_ID: "<U8",
+    Field.SIDEBAND: "<U3",
+    Field.TEST_DATA: "?",
+    Field.FRACTIONAL_SECONDS: "<f8",
+}
+
+
+def header_table_dtype() -> "np.dtype":
+    """Gets structured dtype with one column per VDIFHeaderField"""
+    numpy_required("header_table_dtype")
+    return np.dtype([
+        (Field.INVALID_FLAG.value, "?"),
+        (Field.LEGACY_MODE.value, "?"),
+        (Field.SECONDS_FROM_EPOCH.value, "<u4"),
+        (Field.UNASSIGNED_FIELD.value, "u1"),
+        (Field.REFERENCE_EPOCH.value, "<M8[s]"),
+        (Field.DATA_FRAME_NUMBER.value, "<u4"),
+        (Field.VDIF_VERSION.value, "u1"),
+        (Field.NUM_CHANNELS.value, "<u4"),
+        (Field.DATA_FRAME_LENGTH.value, "<u4"),
+        (Field.DATA_TYPE.value, "<U7"),
+        (Field.BITS_PER_SAMPLE.value, "u1"),
+        (Field.THREAD_ID.value, "<u2"),
+        (Field.STATION_ID.value, "<U5"),
+        (Field.EXTENDED_DATA_VERSION.value, "u1"),
+        (Field.EXTENDED_DATA.value, "<u4", (HEADER_WORDS - ED_WORD,)),
+    ])
+
+
+def read_header_words(input_filepath: str, count: Optional[int]=None,
+        strict: bool=True) -> Tuple["np.ndarray","np.ndarray"]:
+    """Gets byte offset and eight raw words of first count headers in file"""
+    numpy_required("read_header_words")
+    buffer = map_words(input_filepath)
+    offsets = frame_offsets(buffer, count=count, strict=strict)
+    return offsets, header_words(buffer, offsets)
+
+
+def header_table_chunks(input_filepath: str, count: Optional[int]=None,
+        chunk_frames: int=CHUNK_FRAMES) -> Iterator["np.ndarray"]:
+    """
+    Decodes first count headers in file into tables, a chunk at a time
+
+        parameter:
+            input_filepath: str     the path to a valid VDIF file
+            count: Optional[int]    number of headers to decode, else all
+            chunk_frames: int       most headers in each table
+
+        returns:
+            Iterator[np.ndarray]    tables as from decode_header_words, in
+                                    file order, so memory use is bounded
+    """
+    numpy_required("header_table_chunks")
+    for words in header_word_chunks(input_filepath, count, chunk_frames):
+        yield decode_header_words(words)
+
+
+def header_word_chunks(input_filepath: str, count: Optional[int]=None,
+        chunk_frames: int=CHUNK_FRAMES) -> Iterator["np.ndarray"]:
+    """
+    Gathers raw words of first count headers in file, a chunk at a time
+
+        parameter:
+            input_filepath: str     the path to a valid VDIF file
+            count: Optional[int]    number of headers to gather, else all
+            chunk_frames: int       most headers in each chunk
+
+        returns:
+            Iterator[np.ndarray]    shape (n, 8) arrays of raw header words,
+                                    in file order, so memory use is bounded
+    """
+    numpy_required("header_word_chunks")
+    buffer = map_words(input_filepath)
+    remaining = count if count is not None and count > 0 else None
+    offset = 0
+    while remaining is None or remaining > 0:
+        chunk_count = chunk_frames if remaining is None else \
+            min(chunk_frames, remaining)
+        offsets = frame_offsets(buffer, start=offset, count=chunk_count)
+        if len(offsets) == 0:
+            break
+        yield header_words(buffer, offsets)
+        offset = int(offsets[-1]) + _frame_length(buffer, int(offsets[-1]))
+        if remaining is not None:
+            remaining -= len(offsets)
+
+
+def map_words(input_filepath: str) -> "np.ndarray":
+    """Memory maps file at input filepath as array of little-endian words"""
+    numpy_required("map_words")
+    filepath = sanitized_path(input_filepath)
+    num_words = path.getsize(filepath) // WORD_BYTES
+    if num_words == 0:  # np.memmap cannot map an empty file
+        return np.zeros(0, dtype="<u4")
+    return np.memmap(filepath, dtype="<u4", mode="r", shape=(num_words,))
+
+
+def frame_offsets(buffer: "np.ndarray", start: int=0,
+        count: Optional[int]=None, strict: bool=True,
+        end: Optional[int]=None) -> "np.ndarray":
+    """
+    Finds byte offset of each header by following data_frame_length values
+
+        parameter:
+            buffer: np.ndarray      file content as array of little-endian words
+            start: int              byte offset of first header in buffer
+            count: Optional[int]    number of headers to find, else find all
+            strict: bool            raise ValueError at a header with invalid
+                                    data_frame_length, else stop after it
+            end: Optional[int]      only find headers starting before this
+                                    byte offset, else find to end of buffer
+
+        returns:
+            np.ndarray              byte offset of each header found
+    """
+    numpy_required("frame_offsets")
+    if count is not None and count <= 0:
+        count = None
+    buffer_bytes = len(buffer) * WORD_BYTES
+    # last byte offset at which a header may start
+    last_start = buffer_bytes - HEADER_BYTES
+    if end is not None:
+        last_start = min(last_start, end - 1)
+    length_word, length_bit, length_mask = Field.DATA_FRAME_LENGTH._word_layout
+    segments = []
+    found = 0
+    offset = start
+    # frame lengths should all be equal, so stride over the buffer in runs of
+    # equal length, only slowing down where a header says otherwise
+    while offset <= last_start:
+        if count is not None and found >= count:
+            break
+        frame_length = _frame_length(buffer, offset)
+        if frame_length < HEADER_BYTES:  # next header can't be found
+            if strict:
+                raise ValueError(f"data_frame_length {frame_length} of " \
+                    f"header at byte {offset} must be >= {HEADER_BYTES}.")
+            segments.append(np.array([offset], dtype=np.int64))
+            break
+        run_length = (last_start - offset) // frame_length + 1
+        if count is not None:
+            run_length = min(run_length, count - found)
+        run = offset + frame_length * np.arange(run_length, dtype=np.int64)
+        run_words = (run // WORD_BYTES) + length_word
+        run_lengths = ((buffer[run_words] >> length_bit) & length_mask) * 8
+        changes = np.flatnonzero(run_lengths != frame_length)
+        if changes.size > 0:  # next run starts at first differing header
+            run = run[:changes[0]]
+        offset = int(run[-1]) + frame_length
+        segments.append(run)
+        found += len(run)
+    if len(segments) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate(segments)
+
+
+def resync_offset(buffer: "np.ndarray", start: int, frame_length: int,
+        end: Optional[int]=None) -> Optional[int]:
+    """
+    Finds first header at or after start that is consistent with the next one
+
+        parameter:
+            buffer: np.ndarray      file content as array of little-endian words
+            start: int              byte offset from which to search
+            frame_length: int       data_frame_length that headers should have
+            end: Optional[int]      only search before this byte offset, else
+                                    search to end of buffer
+
+        returns:
+            Optional[int]           byte offset of header if found, else None
+    """
+    numpy_required("resync_offset")
+    if frame_length < HEADER_BYTES or frame_length % WORD_BYTES != 0:
+        return None
+    stride = frame_length // WORD_BYTES
+    first_word = -(-start // WORD_BYTES)    # round up to a word boundary
+    last_word = len(buffer) - HEADER_WORDS
+    if end is not None:
+        last_word = min(last_word, -(-end // WORD_BYTES) - 1)
+    # frames are usually back to back from start of file, so check that first
+    aligned_word = -(-start // frame_length) * stride
+    if aligned_word <= last_word and _is_consistent(buffer,
+            np.array([aligned_word]), stride, frame_length)[0]:
+        return aligned_word * WORD_BYTES
+    # otherwise check every word, a block at a time to bound memory use
+    for block_start in range(first_word, last_word + 1, RESYNC_BLOCK_WORDS):
+        block_end = min(block_start + RESYNC_BLOCK_WORDS, last_word + 1)
+        candidates = np.arange(block_start, block_end, dtype=np.int64)
+        matches = np.flatnonzero(_is_consistent(buffer, candidates, stride,
+            frame_length))
+        if matches.size > 0:
+            return int(candidates[matches[0]]) * WORD_BYTES
+    return None
+
+
+def header_words(buffer: "np.ndarray", offsets: "np.ndarray") -> "np.ndarray":
+    """Gathers the eight words of the header at each byte offset in buffer"""
+    numpy_required("header_words")
+    first_words = np.asarray(offsets, dtype=np.int64) // WORD_BYTES
+    word_indices = first_words[:, None] + np.arange(HEADER_WORDS)
+    return np.ascontiguousarray(buffer[word_indices], dtype="<u4")
+
+
+def raw_column(words: "np.ndarray", field: Field) -> "np.ndarray":
+    """Gets undecoded bits of field from each row of header words"""
+    numpy_required("raw_column")
+    word, bit, mask = field._word_layout
+    return (words[:, word] >> bit) & mask
+
+
+def decode_header_words(words: "np.ndarray") -> "np.ndarray":
+    """
+    Decodes array of raw header words into table of header field values
+
+        parameter:
+            words: np.ndarray       shape (n, 8) array of raw header words
+
+        returns:
+            np.ndarray              structured array, one row per header
+    """
+    numpy_required("decode_header_words")
+    words = np.asarray(words, dtype="<u4").reshape(-1, HEADER_WORDS)
+    table = np.zeros(len(words), dtype=header_table_dtype())
+    raw = lambda field: raw_column(words, field)
+    table[Field.INVALID_FLAG.value] = raw(Field.INVALID_FLAG) == 1
+    table[Field.LEGACY_MODE.value] = raw(Field.LEGACY_MODE) == 1
+    table[Field.SECONDS_FROM_EPOCH.value] = raw(Field.SECONDS_FROM_EPOCH)
+    table[Field.UNASSIGNED_FIELD.value] = raw(Field.UNASSIGNED_FIELD)
+    table[Field.REFERENCE_EPOCH.value] = _epoch_column(
+        raw(Field.REFERENCE_EPOCH))
+    table[Field.DATA_FRAME_NUMBER.value] = raw(Field.DATA_FRAME_NUMBER)
+    table[Field.VDIF_VERSION.value] = raw(Field.VDIF_VERSION)
+    table[Field.NUM_CHANNELS.value] = np.left_shift(1,
+        raw(Field.NUM_CHANNELS), dtype="<u4")
+    table[Field.DATA_FRAME_LENGTH.value] = raw(Field.DATA_FRAME_LENGTH) * 8
+    table[Field.DATA_TYPE.value] = np.where(raw(Field.DATA_TYPE) == 1,
+        "complex", "real")
+    table[Field.BITS_PER_SAMPLE.value] = raw(Field.BITS_PER_SAMPLE) + 1
+    table[Field.THREAD_ID.value] = raw(Field.THREAD_ID)
+    table[Field.STATION_ID.value] = _station_column(raw(Field.STATION_ID))
+    table[Field.EXTENDED_DATA_VERSION.value] = raw(Field.EXTENDED_DATA_VERSION)
+    extended_data = words[:, ED_WORD:].copy()
+    extended_data[:, 0] &= ED_MASK
+    table[Field.EXTENDED_DATA.value] = extended_data
+    return table
+
+
+def extended_data_dtype(version: int) -> "np.dtype":
+    """Gets structured dtype with one column per field of extended data"""
+    numpy_required("extended_data_dtype")
+    return np.dtype([(field.value, _EXTENDED_DATA_DTYPES.get(field,
+        _uint_dtype(bit_length))) for field, _, _, bit_length in
+        Field._extended_data_layout(version)])
+
+
+def decode_extended_data(words: "np.ndarray", version: int) -> "np.ndarray":
+    """
+    Decodes words 4 to 7 of headers into table of extended data field values
+
+        parameter:
+            words: np.ndarray       shape (n, 8) array of raw header words
+            version: int            extended data version to decode them as
+
+        returns:
+            np.ndarray              structured array, one row per header and
+                                    one column per field of version (all zero
+                                    in rows of headers of another version)
+    """
+    numpy_required("decode_extended_data")
+    words = np.asarray(words, dtype="<u4").reshape(-1, HEADER_WORDS)
+    table = np.zeros(len(words), dtype=extended_data_dtype(version))
+    for field, word, shift, bit_length in \
+            Field._extended_data_layout(version):
+        table[field.value] = _extended_data_column(words, field, word, shift,
+            bit_length)
+    other_version = raw_column(words, Field.EXTENDED_DATA_VERSION) != version
+    table[other_version] = np.zeros(1, dtype=table.dtype)
+    return table
+
+
+def encode_header_table(table: Union["np.ndarray",dict[str,Any]]
+        ) -> "np.ndarray":
+    """
+    Encodes table of header field values into array of raw header words
+
+        parameter:
+            table: Union[np.ndarray,dict[str,Any]]  structured array as from
+                                        decode_header_words, or dict of
+                                        field name: column of values (fields
+                                        left out are encoded as zero bits)
+
+        returns:
+            np.ndarray                  shape (n, 8) array of raw header words,
+                                        whose bytes are n contiguous headers
+    """
+    numpy_required("encode_header_table")
+    names = table.dtype.names if isinstance(table, np.ndarray) else \
+        list(table.keys())
+    lengths = {len(np.atleast_1d(table[name])) for name in names}
+    if len(lengths) > 1:
+        raise ValueError("encode_header_table requires columns of equal " \
+            f"length, but got lengths {sorted(lengths)}.")
+    words = np.zeros((lengths.pop() if lengths else 0, HEADER_WORDS),
+        dtype="<u4")
+    for field in Field.primary_values():
+        if field.value not in names:
+            continue
+        raw_values = _encode_column(field, np.atleast_1d(table[field.value]))
+        word, bit, mask = field._word_layout
+        if ((raw_values < 0) | (raw_values > mask)).any():
+            raise ValueError(f"Cannot encode {field.value} values in " \
+                f"{field._bit_length} bits.")
+        words[:, word] |= raw_values.astype("<u4") << np.uint32(bit)
+    if Field.EXTENDED_DATA.value in names:
+        extended_data = np.asarray(table[Field.EXTENDED_DATA.value],
+            dtype="<u4").reshape(-1, HEADER_WORDS - ED_WORD)
+        words[:, ED_WORD] |= extended_data[:, 0] & ED_MASK
+        words[:, ED_WORD + 1:] = extended_data[:, 1:]
+    return words
+
+
+def numpy_required(caller: str):
+    """Raises ImportError if optional numpy dependency is not installed"""
+    if np is None:
+        raise ImportError(f"{caller} requires numpy, which is not installed. " \
+            "Install it with `pip install numpy`.")
+
+######## PRIVATE METHODS
+
+def _frame_length(buffer: "np.ndarray", offset: int) -> int:
+    length_word, length_bit, length_mask = Field.DATA_FRAME_LENGTH._word_layout
+    raw_length = int(buffer[offset // WORD_BYTES + length_word])
+    return ((raw_length >> length_bit) & length_mask) * 8
+
+
+def _is_consistent(buffer: "np.ndarray", candidates: "np.ndarray",
+        stride: int, frame_length: int) -> "np.ndarray":
+    # header at each candidate must have expected length, and share stream
+    # fields with header one frame later (if there is one)
+    length_word, length_bit, length_mask = Field.DATA_FRAME_LENGTH._word_layout
+    lengths = ((buffer[candidates + length_word] >> length_bit) & length_mask)
+    consistent = lengths * 8 == frame_length
+    following = candidates + stride
+    has_following = following <= len(buffer) - HEADER_WORDS
+    following = np.where(has_following, following, candidates)
+    for word, mask in enumerate(STREAM_MASKS, start=1):
+        consistent &= (buffer[candidates + word] & mask) == \
+            (buffer[following + word] & mask)
+    return consistent
+
+
+def _extended_data_column(words: "np.ndarray", field: Field, word: int,
+        shift: int, bit_length: int) -> "np.ndarray":
+    # counterpart of Field._decode_extended_data, for whole column at once
+    raw = words[:, word].astype(np.uint64)
+    if shift + bit_length > WORD_BITS:   # 64-bit values span two words
+        raw |= words[:, word + 1].astype(np.uint64) << np.uint64(WORD_BITS)
+    raw = (raw >> np.uint64(shift)) & np.uint64((1 << bit_length) - 1)
+    if field == Field.SAMPLE_RATE_UNIT:
+        return np.where(raw == 1, "MHz", "kHz")
+    if field == Field.SIDEBAND:
+        return np.where(raw == 1, "USB", "LSB")
+    if field == Field.DAS_ID:
+        return np.char.decode(raw.astype("<u8").view("S8"), "latin-1")
+    if field == Field.QUADRANT:
+        return raw + 1
+    if field == Field.TEST_DATA:
+        return raw == 1
+    if field in [Field.SECONDS_OF_DAY, Field.TRUNCATED_MJD]:
+        return _bcd_column(raw, bit_length)
+    if field == Field.FRACTIONAL_SECONDS:
+        return _bcd_column(raw, bit_length) / 10000
+    return raw
+
+
+def _bcd_column(raw: "np.ndarray", bit_length: int) -> "np.ndarray":
+    # binary-coded decimal, one digit per 4 bits (not checked to be < 10)
+    values = np.zeros(len(raw), dtype=np.uint64)
+    for digit in range((bit_length + 3) // 4):
+        values += ((raw >> np.uint64(4 * digit)) & np.uint64(0xf)) * \
+            np.uint64(10 ** digit)
+    return values
+
+
+def _uint_dtype(bit_length: int) -> str:
+    for dtype, bits in [("u1", 8), ("<u2", 16), ("<u4", 32)]:
+        if bit_length <= bits:
+            return dtype
+    return "<u8"
+
+
+def _encode_column(field: Field, values: "np.ndarray") -> "np.ndarray":
+    # counterpart of decode_header_words, from column of values to raw ints,
+    # raising ValueError for the values that VDIFHeader setters would
+    if values.dtype == object:
+        if field == Field.REFERENCE_EPOCH:  # e.g. aware datetimes
+            values = np.array([to_utc(value).replace(tzinfo=None)
+                for value in values], dtype="<M8[s]")
+    if field == Field.REFERENCE_EPOCH:
+        epochs = values.astype("<M8[s]")
+        months = epochs.astype("<M8[M]") - np.datetime64("2000-01", "M")
+        months = months.astype(np.int64)
+        if (months < 0).any():
+            raise ValueError("reference_epoch can only be post-2000.")
+        month_starts = (np.datetime64("2000-01", "M") +
+            months.astype("<m8[M]")).astype("<M8[D]")
+        if ((months % 6 != 0) |
+                (epochs.astype("<M8[D]") != month_starts)).any():
+            raise ValueError("reference_epoch can only be Jan or Jul 1st.")
+        return months // 6
+    if field == Field.NUM_CHANNELS:
+        channels = values.astype(np.int64)
+        if ((channels < 1) | (channels & (channels - 1) != 0)).any():
+            raise ValueError(f"num_channels must be power of 2.")
+        return np.rint(np.log2(channels)).astype(np.int64)
+    if field == Field.DATA_FRAME_LENGTH:
+        lengths = values.astype(np.int64)
+        if (lengths % 8 != 0).any():
+            raise ValueError("data_frame_length must be multiple of 8.")
+        return lengths // 8
+    if field == Field.DATA_TYPE:
+        complex_types = values == "complex"
+        invalid = ~complex_types & (values != "real")
+        if invalid.any():
+            raise ValueError(f"Cannot assign value {values[invalid][0]} to " \
+                "field data_type with expected values=['real'|'complex'].")
+        return complex_types.astype(np.int64)
+    if field == Field.BITS_PER_SAMPLE:
+        bits = values.astype(np.int64)
+        if (bits < 1).any():
+            raise ValueError("bits_per_sample must be >= 1.")
+        return bits - 1
+    if field == Field.STATION_ID:
+        return _encode_station_column(values)
+    return values.astype(np.int64)
+
+
+def _encode_station_column(station_ids: "np.ndarray") -> "np.ndarray":
+    # counterpart of Field._encode_station_id_value, for whole column at once
+    station_ids = station_ids.astype(str)
+    if station_ids.dtype.itemsize < 8:  # room for 2 chars, of 4 bytes each
+        station_ids = station_ids.astype("<U2")
+    numeric = np.char.isnumeric(station_ids)
+    numeric_ids = np.where(numeric, station_ids, "0").astype(np.int64)
+    if (numeric_ids >> 8 >= ASCII_START).any():
+        raise ValueError("numeric station_id first bit must be < 0x30.")
+    # a 1-char id has a null second char, as it is decoded
+    lengths = np.char.str_len(station_ids[~numeric])
+    if ((lengths < 1) | (lengths > 2)).any():
+        raise ValueError("ASCII station_id length must be 1 or 2 chars.")
+    # code point of first 2 chars of each id, zero past end of id
+    chars = station_ids.view(np.uint32).reshape(len(station_ids),
+        station_ids.dtype.itemsize // 4)[:, :2].astype(np.int64)
+    if (chars[~numeric] > 0xff).any():
+        raise ValueError("ASCII station_id chars must be 1 byte each.")
+    ascii_ids = (chars[:, 0] << 8) | chars[:, 1]
+    return np.where(numeric, numeric_ids, ascii_ids)
+
+
+def _epoch_column(raw_epochs: "np.ndarray") -> "np.ndarray":
+    # each count is half a year, starting at 2000-01-01
+    months = (raw_epochs.astype(np.int64) * 6).astype("<m8[M]")
+    epochs = np.datetime64("2000-01", "M") + months
+    return epochs.astype("<M8[s]")
+
+
+def _station_column(raw_stations: "np.ndarray") -> "np.ndarray":
+    # each distinct id is decoded as VDIFHeader.station_id decodes it
+    unique_stations, inverse = np.unique(raw_stations, return_inverse=True)
+    station_ids = np.array([Field._decode_station_id(int(raw_station))
+        for raw_station in unique_stations], dtype="<U5")
+    return station_ids[inverse.reshape(-1)]
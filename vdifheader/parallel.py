@@ -0,0 +1,162 @@
+# > vdifheader - parallel.py
+# Defines scanning of one VDIF file by many processes at once
+
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+> vdifheader - parallel.py
+Defines scanning of one VDIF file by many processes at once
+"""
+__author__ = "Mars Buttfield-Addison"
+__authors__ = [__author__]
+__contact__ = "hello@themartianlife.com"
+__copyright__ = f"Copyright 2022, {__author__}"
+__credits__ = __authors__
+__date__ = "2022/04/07"
+__deprecated__ = False
+__email__ = __contact__
+__license__ = "GPLv3"
+__maintainer__ = __author__
+__status__ = "Pre-release"
+__version__ = "0.1"
+
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count, path
+from typing import Optional, Tuple
+
+try:  # vectorized decoding needs numpy, but the rest of the package does not
+    import numpy as np
+except ImportError:
+    np = None
+
+from vdifheader._utils import sanitized_path
+from vdifheader.headertable import HEADER_BYTES, WORD_BYTES, \
+    decode_header_words, frame_offsets, header_table_dtype, header_words, \
+    map_words, numpy_required, resync_offset, _frame_length
+
+
+MIN_RANGE_BYTES = 64 << 20  # smallest byte range worth giving to a worker
+RANGES_PER_WORKER = 4       # more ranges than workers evens out slow ranges
+
+
+def scan_header_table(input_filepath: str, workers: Optional[int]=None,
+        range_bytes: Optional[int]=None,
+        count: Optional[int]=None) -> Tuple["np.ndarray","np.ndarray"]:
+    """
+    Decodes every header in file using a pool of worker processes
+
+        parameter:
+            input_filepath: str         the path to a valid VDIF file
+            workers: Optional[int]      number of worker processes, else one
+                                        per CPU
+            range_bytes: Optional[int]  bytes of file scanned by each task,
+                                        else split file evenly between workers
+            count: Optional[int]        number of headers to decode, else
+                                        decode all
+
+        returns:
+            Tuple[np.ndarray,np.ndarray]    byte offset of each header, and
+                                            table of each header's values, in
+                                            file order
+    """
+    numpy_required("scan_header_table")
+    filepath = sanitized_path(input_filepath)
+    file_bytes = path.getsize(filepath)
+    buffer = map_words(filepath)
+    if len(buffer) * WORD_BYTES < HEADER_BYTES:
+        return _empty_scan()
+    # all frames in a file should be the length that the first one says it is
+    frame_length = _frame_length(buffer, 0)
+    if frame_length < HEADER_BYTES:
+        raise ValueError(f"data_frame_length {frame_length} of header at " \
+            f"byte 0 must be >= {HEADER_BYTES}.")
+    # only scan as far as count frames of that length reach
+    scan_bytes = file_bytes
+    if count is not None and count > 0:
+        scan_bytes = min(file_bytes, count * frame_length)
+    _workers = workers or cpu_count() or 1
+    ranges = _byte_ranges(scan_bytes, frame_length, _workers, range_bytes)
+    if _workers == 1 or len(ranges) == 1:
+        results = [_scan_range(filepath, start, end, frame_length)
+            for start, end in ranges]
+    else:
+        with ProcessPoolExecutor(max_workers=_workers) as executor:
+            results = list(executor.map(_scan_range,
+                [filepath] * len(ranges), [start for start, _ in ranges],
+                [end for _, end in ranges], [frame_length] * len(ranges)))
+    offsets, table = _merge(buffer, ranges, results)
+    if count is None or count <= 0:
+        return offsets, table
+    if len(offsets) < count and scan_bytes < file_bytes:
+        # later frames are longer than the first, so scan whole file instead
+        offsets, table = scan_header_table(input_filepath, workers,
+            range_bytes)
+    return offsets[:count], table[:count]
+
+######## PRIVATE METHODS
+
+def _byte_ranges(file_bytes: int, frame_length: int, workers: int,
+        range_bytes: Optional[int]) -> list[Tuple[int,int]]:
+    if range_bytes is None:
+        range_bytes = max(MIN_RANGE_BYTES,
+            -(-file_bytes // (workers * RANGES_PER_WORKER)))
+    # ranges of whole frames, so that workers usually start on a boundary
+    range_bytes = max(frame_length, range_bytes // frame_length * frame_length)
+    return [(start, min(start + range_bytes, file_bytes))
+        for start in range(0, file_bytes, range_bytes)]
+
+
+def _scan_range(input_filepath: str, start: int, end: int,
+        frame_length: int) -> Tuple["np.ndarray","np.ndarray"]:
+    # runs in worker: find first frame boundary in range, then decode every
+    # header that starts in range
+    buffer = map_words(input_filepath)
+    first_offset = 0 if start == 0 else resync_offset(buffer, start,
+        frame_length, end)
+    if first_offset is None:
+        return _empty_scan()
+    return _decode_range(buffer, first_offset, end)
+
+
+def _decode_range(buffer: "np.ndarray", start: int,
+        end: int) -> Tuple["np.ndarray","np.ndarray"]:
+    offsets = frame_offsets(buffer, start=start, strict=False, end=end)
+    return offsets, decode_header_words(header_words(buffer, offsets))
+
+
+def _merge(buffer: "np.ndarray", ranges: list[Tuple[int,int]],
+        results: list[Tuple["np.ndarray","np.ndarray"]]
+        ) -> Tuple["np.ndarray","np.ndarray"]:
+    # each range must carry on from where the previous range's last frame
+    # ends, else its worker resynchronised wrongly and it is scanned again
+    all_offsets, all_tables = [], []
+    expected = 0
+    for (start, end), (offsets, table) in zip(ranges, results):
+        if expected >= end:
+            continue    # a frame spans this whole range
+        if len(offsets) == 0 or offsets[0] != expected:
+            offsets, table = _decode_range(buffer, expected, end)
+        if len(offsets) == 0:
+            continue
+        all_offsets.append(offsets)
+        all_tables.append(table)
+        last_length = int(table["data_frame_length"][-1])
+        if last_length < HEADER_BYTES:  # next header can't be found
+            raise ValueError(f"data_frame_length {last_length} of header " \
+                f"at byte {offsets[-1]} must be >= {HEADER_BYTES}.")
+        expected = int(offsets[-1]) + last_length
+    if len(all_offsets) == 0:
+        return _empty_scan()
+    return np.concatenate(all_offsets), np.concatenate(all_tables)
+
+
+def _empty_scan() -> Tuple["np.ndarray","np.ndarray"]:
+    return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=header_table_dtype())
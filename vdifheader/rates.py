@@ -0,0 +1,277 @@
+# > vdifheader - rates.py
+# Defines incremental inference of frame, sample and data rates of a stream
+
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+> vdifheader - rates.py
+Defines incremental inference of frame, sample and data rates of a stream
+"""
+__author__ = "Mars Buttfield-Addison"
+__authors__ = [__author__]
+__contact__ = "hello@themartianlife.com"
+__copyright__ = f"Copyright 2022, {__author__}"
+__credits__ = __authors__
+__date__ = "2022/04/07"
+__deprecated__ = False
+__email__ = __contact__
+__license__ = "GPLv3"
+__maintainer__ = __author__
+__status__ = "Pre-release"
+__version__ = "0.1"
+
+from collections import Counter, deque
+from typing import Any, Optional, Tuple
+
+
+MAX_SECONDS = 16        # most recent whole seconds kept for each thread
+CONFIDENT_SECONDS = 2   # whole seconds that must agree on frame rate
+HEADER_BYTES = 32       # number of bytes in a (non-legacy) header
+LEGACY_HEADER_BYTES = 16    # number of bytes in a legacy header
+
+
+class VDIFRateEstimate:
+    """A class that represents the inferred rates of one thread's stream"""
+
+    def __init__(self, thread_id: int, frames_per_second: int,
+            data_frame_length: int, num_channels: int, bits_per_sample: int,
+            data_type: str, legacy_mode: bool, num_seconds: int,
+            issues: list[str]):
+        self.thread_id: int = thread_id
+        self.frames_per_second: int = frames_per_second
+        self.data_frame_length: int = data_frame_length
+        self.num_channels: int = num_channels
+        self.bits_per_sample: int = bits_per_sample
+        self.data_type: str = data_type
+        self.legacy_mode: bool = legacy_mode
+        self.num_seconds: int = num_seconds     # whole seconds seen
+        self.issues: list[str] = issues         # reasons not to be confident
+        return
+
+    @property
+    def is_confident(self) -> bool:
+        """Whether enough consistent data was seen to trust this estimate"""
+        return len(self.issues) == 0
+
+    @property
+    def payload_bytes(self) -> int:
+        """Bytes of sample data in each frame, excluding header"""
+        header_bytes = LEGACY_HEADER_BYTES if self.legacy_mode else \
+            HEADER_BYTES
+        return self.data_frame_length - header_bytes
+
+    @property
+    def samples_per_frame(self) -> float:
+        """Samples of each channel in each frame"""
+        # complex samples have a real and an imaginary part, each of bits
+        parts = 2 if self.data_type == "complex" else 1
+        bits_per_time = self.num_channels * self.bits_per_sample * parts
+        return self.payload_bytes * 8 / bits_per_time
+
+    @property
+    def sample_rate(self) -> float:
+        """Samples of each channel per second"""
+        return self.samples_per_frame * self.frames_per_second
+
+    @property
+    def data_rate(self) -> int:
+        """Bits per second of whole frames, including headers"""
+        return self.data_frame_length * 8 * self.frames_per_second
+
+    @property
+    def payload_rate(self) -> int:
+        """Bits per second of sample data, excluding headers"""
+        return self.payload_bytes * 8 * self.frames_per_second
+
+    def frame_offset(self, first: Tuple[int,int], frame: Tuple[int,int],
+            num_threads: int=1) -> int:
+        """
+        Gets byte offset of frame from first frame, assuming none are missing
+
+            parameter:
+                first: Tuple[int,int]   (seconds_from_epoch, data_frame_number)
+                                        of frame at offset 0
+                frame: Tuple[int,int]   (seconds_from_epoch, data_frame_number)
+                                        of frame to find
+                num_threads: int        number of threads interleaved evenly
+                                        with this one
+
+            returns:
+                int                     byte offset of frame
+        """
+        frames = (frame[0] - first[0]) * self.frames_per_second + \
+            (frame[1] - first[1])
+        return frames * self.data_frame_length * num_threads
+
+    def to_dict(self) -> dict[str,Any]:
+        """Creates dict of estimate attributes as format name: value"""
+        return {
+            "thread_id": self.thread_id,
+            "frames_per_second": self.frames_per_second,
+            "samples_per_frame": self.samples_per_frame,
+            "sample_rate": self.sample_rate,
+            "data_rate": self.data_rate,
+            "payload_rate": self.payload_rate,
+            "num_seconds": self.num_seconds,
+            "is_confident": self.is_confident,
+            "issues": self.issues,
+        }
+
+
+class VDIFRateEstimator:
+    """A class that infers the rates of each thread in a stream, as it comes"""
+
+    def __init__(self):
+        self.__threads: dict[int,_ThreadRate] = {}
+        return
+
+    ######## PROPERTIES
+
+    @property
+    def thread_ids(self) -> list[int]:
+        """Sorted thread_id of every thread seen so far"""
+        return sorted(self.__threads.keys())
+
+    @property
+    def estimates(self) -> dict[int,VDIFRateEstimate]:
+        """Current estimate for each thread seen so far, with format fields"""
+        estimates = {thread_id: self.estimate(thread_id)
+            for thread_id in self.thread_ids}
+        return {thread_id: estimate for thread_id, estimate
+            in estimates.items() if estimate is not None}
+
+    @property
+    def frames_per_second(self) -> Optional[int]:
+        """Frame rate shared by every thread, else None if they disagree"""
+        rates = {thread.frames_per_second
+            for thread in self.__threads.values()}
+        return rates.pop() if len(rates) == 1 else None
+
+    @property
+    def max_frames_per_second(self) -> Optional[int]:
+        """Highest frame rate of any thread, else None if none were seen"""
+        return max((thread.frames_per_second
+            for thread in self.__threads.values()), default=None)
+
+    @property
+    def data_rate(self) -> int:
+        """Bits per second of whole frames across all threads"""
+        return sum(estimate.data_rate for estimate in self.estimates.values())
+
+    ######## PUBLIC METHODS
+
+    def add(self, thread_id: int, seconds_from_epoch: int,
+            data_frame_number: int, data_frame_length: int,
+            num_channels: int, bits_per_sample: int, data_type: str,
+            legacy_mode: bool=False):
+        """Adds next frame in stream, by its thread, time and format fields"""
+        self.__thread(thread_id).add(seconds_from_epoch, data_frame_number,
+            (data_frame_length, num_channels, bits_per_sample, data_type,
+            legacy_mode))
+        return
+
+    def add_frame(self, thread_id: int, seconds_from_epoch: int,
+            data_frame_number: int):
+        """Adds next frame in stream, by its thread and time fields only"""
+        # enough for frames_per_second, but not for estimates of the thread
+        self.__thread(thread_id).add(seconds_from_epoch, data_frame_number,
+            None)
+        return
+
+    def add_header(self, header: Any):
+        """Adds next header in stream (VDIFHeader or VDIFHeaderRecord)"""
+        self.add(header.thread_id, header.seconds_from_epoch,
+            header.data_frame_number, header.data_frame_length,
+            header.num_channels, header.bits_per_sample, header.data_type,
+            header.legacy_mode)
+        return
+
+    def estimate(self, thread_id: int) -> Optional[VDIFRateEstimate]:
+        """Gets estimate for thread, else None if unseen or only by add_frame"""
+        thread = self.__threads.get(thread_id)
+        if thread is None or thread.format is None:
+            return None
+        return thread.estimate(thread_id)
+
+    def __thread(self, thread_id: int) -> "_ThreadRate":
+        thread = self.__threads.get(thread_id)
+        if thread is None:
+            thread = _ThreadRate()
+            self.__threads[thread_id] = thread
+        return thread
+
+######## PRIVATE METHODS
+
+class _ThreadRate:
+    # frame rate is one more than the highest frame number in a whole second.
+    # only a few recent seconds are kept, so memory use is constant
+
+    def __init__(self):
+        self.second: Optional[int] = None   # second currently being seen
+        self.max_frame: int = -1            # highest frame number in it
+        self.maxima: deque = deque(maxlen=MAX_SECONDS)  # of whole seconds
+        self.num_seconds: int = 0
+        self.format: Optional[Tuple] = None
+        self.format_changed: bool = False
+        self.late_frames: int = 0
+        return
+
+    @property
+    def frames_per_second(self) -> int:
+        if len(self.maxima) == 0:
+            # only part of a second seen, so rate is at least this
+            return self.max_frame + 1
+        return max(self.maxima) + 1
+
+    def add(self, seconds: int, frame_num: int,
+            frame_format: Optional[Tuple]):
+        if self.format is None:
+            self.format = frame_format
+        elif frame_format is not None and frame_format != self.format:
+            self.format_changed = True
+        if self.second is None:
+            self.second = seconds
+        elif seconds > self.second:
+            # moving on means previous second is over (first may be partial,
+            # but still ends with its highest frame numbers)
+            self.maxima.append(self.max_frame)
+            self.num_seconds += 1
+            self.second, self.max_frame = seconds, -1
+        elif seconds < self.second:
+            self.late_frames += 1
+            return
+        self.max_frame = max(self.max_frame, frame_num)
+        return
+
+    def estimate(self, thread_id: int) -> VDIFRateEstimate:
+        issues = []
+        frames_per_second = self.frames_per_second
+        if len(self.maxima) == 0:
+            issues.append("no whole second seen")
+        else:
+            # most seconds should end on the same (highest) frame number
+            agreeing = Counter(self.maxima)[frames_per_second - 1]
+            if agreeing < CONFIDENT_SECONDS:
+                issues.append(f"only {agreeing} whole second(s) agree on " \
+                    f"frame rate")
+            if self.max_frame >= frames_per_second:
+                issues.append("current second has more frames than previous")
+        if self.format_changed:
+            issues.append("frame format changed within stream")
+        if self.late_frames > 0:
+            issues.append(f"{self.late_frames} frame(s) from earlier seconds")
+        frame_length, num_channels, bits, data_type, legacy = self.format
+        estimate = VDIFRateEstimate(thread_id, frames_per_second,
+            frame_length, num_channels, bits, data_type, legacy,
+            self.num_seconds, issues)
+        if estimate.samples_per_frame != int(estimate.samples_per_frame):
+            issues.append("payload is not a whole number of samples")
+        return estimate
@@ -0,0 +1,387 @@
+# > vdifheader - receiver.py
+# Defines VDIFReceiver class that decodes headers of VDIF packets sent by UDP
+
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+> vdifheader - receiver.py
+Defines VDIFReceiver class that decodes headers of VDIF packets sent by UDP
+"""
+__author__ = "Mars Buttfield-Addison"
+__authors__ = [__author__]
+__contact__ = "hello@themartianlife.com"
+__copyright__ = f"Copyright 2022, {__author__}"
+__credits__ = __authors__
+__date__ = "2022/04/07"
+__deprecated__ = False
+__email__ = __contact__
+__license__ = "GPLv3"
+__maintainer__ = __author__
+__status__ = "Pre-release"
+__version__ = "0.1"
+
+import socket
+from sys import stdout
+from time import time
+from typing import Any, Optional, Tuple
+
+try:  # vectorized decoding needs numpy, but the rest of the package does not
+    import numpy as np
+except ImportError:
+    np = None
+
+from vdifheader.headertable import HEADER_BYTES, frame_offsets, \
+    map_words, numpy_required, raw_column, _epoch_column, _frame_length
+from vdifheader.vdifheaderfield import VDIFHeaderField as Field
+
+
+VTP_BYTES = 8               # VTP sequence number before each VDIF frame
+MAX_THREADS = 1 << 10       # thread_id is a 10-bit field
+MAX_PACKET_BYTES = 9000     # jumbo frame, larger than most VDIF frames
+RING_PACKETS = 1 << 14      # packets held in ring buffer
+BATCH_PACKETS = 256         # packets received before decoding them at once
+SOCKET_BUFFER_BYTES = 64 << 20  # requested kernel receive buffer
+
+
+class VDIFThreadReception:
+    """A class that represents packets received of one thread's stream"""
+
+    def __init__(self, thread_id: int, packets: int, lost: int,
+            reordered: int, latency_min: float, latency_mean: float,
+            latency_max: float):
+        self.thread_id: int = thread_id
+        self.packets: int = packets
+        self.lost: int = lost               # frames in span never received
+        self.reordered: int = reordered     # received after a later frame
+        self.latency_min: float = latency_min   # seconds after header time
+        self.latency_mean: float = latency_mean
+        self.latency_max: float = latency_max
+        return
+
+    def to_dict(self) -> dict[str,Any]:
+        """Creates dict of reception attributes as format name: value"""
+        return dict(vars(self))
+
+
+class VDIFReceptionReport:
+    """A class that represents packets received of every thread's stream"""
+
+    def __init__(self, packets: int, bytes_received: int, invalid: int,
+            vtp_lost: Optional[int], threads: dict[int,VDIFThreadReception]):
+        self.packets: int = packets
+        self.bytes_received: int = bytes_received
+        self.invalid: int = invalid     # packets too short to hold a header
+        self.vtp_lost: Optional[int] = vtp_lost     # by VTP sequence numbers
+        self.threads: dict[int,VDIFThreadReception] = threads
+        return
+
+    def to_dict(self) -> dict[str,Any]:
+        """Creates dict of report as format name: value"""
+        return {
+            "packets": self.packets,
+            "bytes_received": self.bytes_received,
+            "invalid": self.invalid,
+            "vtp_lost": self.vtp_lost,
+            "threads": [thread.to_dict() for thread in self.threads.values()],
+        }
+
+    def print_report(self):
+        """Prints packet loss, reordering and latency of each thread"""
+        stdout.write(f"Received {self.packets} packets " \
+            f"({self.bytes_received} bytes), {self.invalid} invalid\n")
+        if self.vtp_lost is not None:
+            stdout.write(f"Lost by VTP sequence: {self.vtp_lost}\n")
+        for thread_id, thread in sorted(self.threads.items()):
+            stdout.write(f"Thread {thread_id}: {thread.packets} packets, " \
+                f"{thread.lost} lost, {thread.reordered} reordered, " \
+                f"latency {thread.latency_min:.6f}/" \
+                f"{thread.latency_mean:.6f}/{thread.latency_max:.6f} s " \
+                "(min/mean/max)\n")
+        return
+
+
+class VDIFReceiver:
+    """A class that receives VDIF packets by UDP into a ring buffer"""
+
+    def __init__(self, port: int=0, host: str="0.0.0.0", vtp: bool=False,
+            frames_per_second: Optional[int]=None,
+            max_packet_bytes: int=MAX_PACKET_BYTES,
+            ring_packets: int=RING_PACKETS,
+            batch_packets: int=BATCH_PACKETS):
+        """
+        Creates new receiver bound to UDP host and port
+
+            parameter:
+                port: int               UDP port to bind, or 0 for any free
+                host: str               address to bind
+                vtp: bool               whether each packet starts with an
+                                        8-byte VTP sequence number
+                frames_per_second: Optional[int]    frames per second of
+                                        each thread, else infer it
+                max_packet_bytes: int   largest packet to receive whole
+                ring_packets: int       packets held in ring buffer
+                batch_packets: int      packets received between decodes
+        """
+        numpy_required("VDIFReceiver")
+        self.vtp: bool = vtp
+        self.frames_per_second: Optional[int] = frames_per_second
+        self.__header_start: int = VTP_BYTES if vtp else 0
+        # batches end at end of ring, so a batch is never split by wrapping
+        self.__batch_packets: int = batch_packets
+        num_batches = max(1, -(-ring_packets // batch_packets))
+        ring_packets = num_batches * batch_packets
+        self.__ring: "np.ndarray" = np.zeros((ring_packets, max_packet_bytes),
+            dtype=np.uint8)
+        self.__lengths: "np.ndarray" = np.zeros(ring_packets, dtype=np.int64)
+        self.__times: "np.ndarray" = np.zeros(ring_packets, dtype=np.float64)
+        # views are made once, so receiving a packet creates no new buffers
+        self.__views: list[memoryview] = [memoryview(row)
+            for row in self.__ring]
+        self.__next_slot: int = 0
+        self.__batch_start: int = 0
+        self.__last_batch: slice = slice(0, 0)
+        self.__stats: _ThreadStats = _ThreadStats()
+        self.__socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self.__socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF,
+                SOCKET_BUFFER_BYTES)
+        except OSError:  # kernel may cap buffer size, which is not fatal
+            pass
+        self.__socket.bind((host, port))
+        return
+
+    ######## PROPERTIES
+
+    @property
+    def address(self) -> Tuple[str,int]:
+        """Host and port that this receiver is bound to"""
+        return self.__socket.getsockname()
+
+    @property
+    def ring(self) -> "np.ndarray":
+        """Ring buffer of received packets, one row per packet"""
+        return self.__ring
+
+    @property
+    def last_batch(self) -> "np.ndarray":
+        """Raw header words of each packet in most recently decoded batch"""
+        return self.__header_words(self.__last_batch)
+
+    @property
+    def report(self) -> VDIFReceptionReport:
+        """Packet loss, reordering and latency of each thread so far"""
+        return self.__stats.report(self.frames_per_second)
+
+    ######## PUBLIC METHODS
+
+    def receive(self, max_packets: Optional[int]=None,
+            timeout: Optional[float]=1.0) -> int:
+        """
+        Receives packets, decoding their headers a batch at a time
+
+            parameter:
+                max_packets: Optional[int]  packets to receive, else receive
+                                            until timeout
+                timeout: Optional[float]    seconds to wait for each packet,
+                                            else wait forever
+
+        returns:
+                int                         number of packets received
+        """
+        self.__socket.settimeout(timeout)
+        received = 0
+        # local names avoid attribute lookups for every packet
+        recv_into, views = self.__socket.recv_into, self.__views
+        lengths, times = self.__lengths, self.__times
+        batch_end = self.__batch_end()
+        try:
+            while max_packets is None or received < max_packets:
+                slot = self.__next_slot
+                lengths[slot] = recv_into(views[slot])
+                times[slot] = time()
+                received += 1
+                self.__next_slot = slot + 1
+                if self.__next_slot == batch_end:
+                    self.__decode_batch()
+                    batch_end = self.__batch_end()
+        except socket.timeout:
+            pass
+        # decode any partial batch, so report is up to date
+        self.__decode_batch()
+        return received
+
+    def close(self):
+        """Closes socket of this receiver"""
+        self.__socket.close()
+        return
+
+    ######## PRIVATE METHODS
+
+    def __decode_batch(self):
+        batch = slice(self.__batch_start, self.__next_slot)
+        if batch.stop > batch.start:
+            sequence = None
+            if self.vtp:
+                sequence = self.__ring[batch, :VTP_BYTES].copy().view(
+                    "<u8").reshape(-1)
+            self.__stats.add(self.__header_words(batch),
+                self.__lengths[batch], self.__times[batch], sequence,
+                self.__header_start + HEADER_BYTES, self.frames_per_second)
+            self.__last_batch = batch
+        # start next batch, wrapping around ring if it is full
+        if self.__next_slot == len(self.__ring):
+            self.__next_slot = 0
+        self.__batch_start = self.__next_slot
+        return
+
+    def __batch_end(self) -> int:
+        # a batch after a partial batch starts mid-ring, so may end early
+        return min(self.__batch_start + self.__batch_packets, len(self.__ring))
+
+    def __header_words(self, batch: slice) -> "np.ndarray":
+        start = self.__header_start
+        header_bytes = self.__ring[batch, start:start + HEADER_BYTES]
+        return np.ascontiguousarray(header_bytes).view("<u4")
+
+    ######## OVERLOADED METHODS
+
+    def __enter__(self) -> "VDIFReceiver":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return
+
+
+def send_file(input_filepath: str, address: Tuple[str,int],
+        count: Optional[int]=None, vtp: bool=False,
+        first_sequence: int=0) -> int:
+    """
+    Sends each frame of file as a UDP packet, e.g. to test a VDIFReceiver
+
+        parameter:
+            input_filepath: str         the path to a valid VDIF file
+            address: Tuple[str,int]     host and port to send packets to
+            count: Optional[int]        number of frames to send, else all
+            vtp: bool                   prefix each packet with an 8-byte VTP
+                                        sequence number
+            first_sequence: int         VTP sequence number of first packet
+
+        returns:
+            int                         number of packets sent
+    """
+    numpy_required("send_file")
+    buffer = map_words(input_filepath)
+    offsets = frame_offsets(buffer, count=count)
+    raw = buffer.view(np.uint8)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+        for sequence, offset in enumerate(offsets.tolist(), first_sequence):
+            frame = raw[offset:offset + _frame_length(buffer, offset)]
+            if vtp:
+                frame = np.concatenate([np.array([sequence], "<u8").view(
+                    np.uint8), frame])
+            sender.sendto(frame, address)
+    return len(offsets)
+
+######## PRIVATE METHODS
+
+class _ThreadStats:
+    # per-thread running statistics kept in arrays indexed by thread_id, so
+    # each batch updates them with a few vectorized operations
+
+    def __init__(self):
+        self.packets = np.zeros(MAX_THREADS, dtype=np.int64)
+        self.reordered = np.zeros(MAX_THREADS, dtype=np.int64)
+        self.first_key = np.full(MAX_THREADS, np.iinfo(np.int64).max)
+        self.last_key = np.full(MAX_THREADS, -1, dtype=np.int64)
+        self.max_frame = np.full(MAX_THREADS, -1, dtype=np.int64)
+        self.latency_sum = np.zeros(MAX_THREADS, dtype=np.float64)
+        self.latency_min = np.full(MAX_THREADS, np.inf)
+        self.latency_max = np.full(MAX_THREADS, -np.inf)
+        self.total_packets = 0
+        self.total_bytes = 0
+        self.invalid = 0
+        self.sequenced = 0     # packets long enough to hold a VTP number
+        self.first_sequence: Optional[int] = None
+        self.last_sequence: Optional[int] = None
+        return
+
+    def add(self, words: "np.ndarray", lengths: "np.ndarray",
+            times: "np.ndarray", sequence: Optional["np.ndarray"],
+            min_length: int, frames_per_second: Optional[int]):
+        self.total_packets += len(lengths)
+        self.total_bytes += int(lengths.sum())
+        if sequence is not None:
+            # a packet too short for a header still arrived, so is not lost
+            self.__add_sequence(sequence[lengths >= VTP_BYTES])
+        valid = lengths >= min_length
+        self.invalid += int(np.count_nonzero(~valid))
+        words, times = words[valid], times[valid]
+        if len(words) == 0:
+            return
+        raw = lambda field: raw_column(words, field).astype(np.int64)
+        threads = raw(Field.THREAD_ID)
+        seconds = raw(Field.SECONDS_FROM_EPOCH)
+        frames = raw(Field.DATA_FRAME_NUMBER)
+        # key orders frames of a thread without needing the frame rate
+        keys = (seconds << 32) | frames
+        np.add.at(self.packets, threads, 1)
+        np.minimum.at(self.first_key, threads, keys)
+        np.maximum.at(self.max_frame, threads, frames)
+        for thread_id in np.unique(threads).tolist():
+            thread_keys = keys[threads == thread_id]
+            # frames that arrive after a later frame has are reordered
+            previous_max = np.maximum.accumulate(np.concatenate([
+                [self.last_key[thread_id]], thread_keys]))[:-1]
+            self.reordered[thread_id] += int(np.count_nonzero(
+                thread_keys < previous_max))
+            self.last_key[thread_id] = max(int(previous_max[-1]),
+                int(thread_keys[-1]))
+        # latency against header timestamp (at frame rate known so far)
+        fps = frames_per_second or np.maximum(self.max_frame[threads] + 1, 1)
+        epochs = _epoch_column(raw(Field.REFERENCE_EPOCH)).astype(np.int64)
+        latencies = times - (epochs + seconds + frames / fps)
+        np.add.at(self.latency_sum, threads, latencies)
+        np.minimum.at(self.latency_min, threads, latencies)
+        np.maximum.at(self.latency_max, threads, latencies)
+        return
+
+    def report(self, frames_per_second: Optional[int]) -> VDIFReceptionReport:
+        threads = {}
+        for thread_id in np.flatnonzero(self.packets).tolist():
+            packets = int(self.packets[thread_id])
+            fps = frames_per_second or int(self.max_frame[thread_id]) + 1
+            first, last = int(self.first_key[thread_id]), \
+                int(self.last_key[thread_id])
+            span = ((last >> 32) - (first >> 32)) * fps + \
+                ((last & 0xffffffff) - (first & 0xffffffff)) + 1
+            threads[thread_id] = VDIFThreadReception(thread_id, packets,
+                max(0, span - packets), int(self.reordered[thread_id]),
+                float(self.latency_min[thread_id]),
+                float(self.latency_sum[thread_id]) / packets,
+                float(self.latency_max[thread_id]))
+        vtp_lost = None
+        if self.first_sequence is not None:
+            vtp_lost = max(0, self.last_sequence - self.first_sequence + 1 -
+                self.sequenced)
+        return VDIFReceptionReport(self.total_packets, self.total_bytes,
+            self.invalid, vtp_lost, threads)
+
+    def __add_sequence(self, sequence: "np.ndarray"):
+        if len(sequence) == 0:
+            return
+        self.sequenced += len(sequence)
+        first, last = int(sequence.min()), int(sequence.max())
+        if self.first_sequence is None:
+            self.first_sequence, self.last_sequence = first, last
+        self.first_sequence = min(self.first_sequence, first)
+        self.last_sequence = max(self.last_sequence, last)
+        return
@@ -0,0 +1,161 @@
+# > vdifheader - stats.py
+# Defines opt-in counters and timers of where time goes while scanning a file
+
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+> vdifheader - stats.py
+Defines opt-in counters and timers of where time goes while scanning a file
+"""
+__author__ = "Mars Buttfield-Addison"
+__authors__ = [__author__]
+__contact__ = "hello@themartianlife.com"
+__copyright__ = f"Copyright 2022, {__author__}"
+__credits__ = __authors__
+__date__ = "2022/04/07"
+__deprecated__ = False
+__email__ = __contact__
+__license__ = "GPLv3"
+__maintainer__ = __author__
+__status__ = "Pre-release"
+__version__ = "0.1"
+
+from sys import stdout
+from time import perf_counter
+from typing import Any, BinaryIO, Callable, Optional, TextIO
+
+
+class VDIFScanStats:
+    """A class that counts reads, seeks and time spent scanning a file"""
+
+    def __init__(self):
+        self.bytes_read: int = 0
+        self.bytes_scanned: int = 0     # of whole frames parsed, not just read
+        self.frames_parsed: int = 0
+        self.reads: int = 0
+        self.seeks: int = 0
+        self.io_seconds: float = 0.0            # in read() and seek()
+        self.decode_seconds: float = 0.0        # unpacking header fields
+        self.validation_seconds: float = 0.0    # checking field values
+        self.elapsed_seconds: float = 0.0       # from start to end of scan(s)
+        self.__started: Optional[float] = None
+        return
+
+    ######## PROPERTIES
+
+    @property
+    def other_seconds(self) -> float:
+        """Time in scan outside of I/O and parsing (e.g. caller's own work)"""
+        return max(0.0, self.elapsed_seconds - self.io_seconds -
+            self.decode_seconds - self.validation_seconds)
+
+    @property
+    def frames_per_second(self) -> float:
+        """Frames parsed per second of elapsed time"""
+        if self.elapsed_seconds == 0.0:
+            return 0.0
+        return self.frames_parsed / self.elapsed_seconds
+
+    @property
+    def bytes_per_second(self) -> float:
+        """Bytes of frames parsed per second of elapsed time"""
+        if self.elapsed_seconds == 0.0:
+            return 0.0
+        return self.bytes_scanned / self.elapsed_seconds
+
+    ######## PUBLIC METHODS
+
+    def to_dict(self) -> dict[str,Any]:
+        """Creates dict of counters and timers as format name: value"""
+        return {
+            "bytes_read": self.bytes_read,
+            "bytes_scanned": self.bytes_scanned,
+            "frames_parsed": self.frames_parsed,
+            "reads": self.reads,
+            "seeks": self.seeks,
+            "io_seconds": self.io_seconds,
+            "decode_seconds": self.decode_seconds,
+            "validation_seconds": self.validation_seconds,
+            "other_seconds": self.other_seconds,
+            "elapsed_seconds": self.elapsed_seconds,
+            "frames_per_second": self.frames_per_second,
+            "bytes_per_second": self.bytes_per_second,
+        }
+
+    def print_report(self, output: TextIO=stdout):
+        """Prints throughput and breakdown of elapsed time"""
+        output.write(f"Parsed {self.frames_parsed} frames in " \
+            f"{self.elapsed_seconds:.3f} s ({self.frames_per_second:.0f} " \
+            f"frames/s), {self.bytes_scanned} bytes of frames " \
+            f"({self.bytes_per_second / (1 << 20):.1f} MiB/s)\n")
+        output.write(f"Read {self.bytes_read} bytes in {self.reads} reads " \
+            f"and {self.seeks} seeks\n")
+        for name, seconds in [("I/O", self.io_seconds),
+                ("Decode", self.decode_seconds),
+                ("Validation", self.validation_seconds),
+                ("Other", self.other_seconds)]:
+            share = 0.0 if self.elapsed_seconds == 0.0 else \
+                100 * seconds / self.elapsed_seconds
+            output.write(f"  {name + ':':<12}{seconds:>10.3f} s " \
+                f"{share:>5.1f}%\n")
+        return
+
+    ######## PRIVATE METHODS
+
+    def _start(self):
+        self.__started = perf_counter()
+        return
+
+    def _stop(self):
+        if self.__started is not None:
+            self.elapsed_seconds += perf_counter() - self.__started
+            self.__started = None
+        return
+
+
+def timed_parse(parse: Callable, stats: VDIFScanStats) -> Callable:
+    """Wraps parse function so its calls are counted and timed as decoding"""
+    def parse_timed(raw_data: bytes) -> Any:
+        start = perf_counter()
+        header = parse(raw_data)
+        stats.decode_seconds += perf_counter() - start
+        stats.frames_parsed += 1
+        stats.bytes_scanned += header.data_frame_length
+        return header
+    return parse_timed
+
+
+class StatsFile:
+    """A class that wraps binary file, counting and timing reads and seeks"""
+
+    def __init__(self, input_file: BinaryIO, stats: VDIFScanStats):
+        self.__file: BinaryIO = input_file
+        self.__stats: VDIFScanStats = stats
+        return
+
+    def read(self, size: int=-1) -> bytes:
+        start = perf_counter()
+        data = self.__file.read(size)
+        self.__stats.io_seconds += perf_counter() - start
+        self.__stats.reads += 1
+        self.__stats.bytes_read += len(data)
+        return data
+
+    def seek(self, offset: int, whence: int=0) -> int:
+        start = perf_counter()
+        position = self.__file.seek(offset, whence)
+        self.__stats.io_seconds += perf_counter() - start
+        self.__stats.seeks += 1
+        return position
+
+    def __getattr__(self, name: str) -> Any:
+        # anything else (tell, fileno, name...) goes straight to file
+        return getattr(self.__file, name)
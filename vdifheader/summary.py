@@ -0,0 +1,211 @@
+# > vdifheader - summary.py
+# Defines one-pass summary of the frames, threads and field values in a file
+
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+> vdifheader - summary.py
+Defines one-pass summary of the frames, threads and field values in a file
+"""
+__author__ = "Mars Buttfield-Addison"
+__authors__ = [__author__]
+__contact__ = "hello@themartianlife.com"
+__copyright__ = f"Copyright 2022, {__author__}"
+__credits__ = __authors__
+__date__ = "2022/04/07"
+__deprecated__ = False
+__email__ = __contact__
+__license__ = "GPLv3"
+__maintainer__ = __author__
+__status__ = "Pre-release"
+__version__ = "0.1"
+
+from datetime import datetime, timedelta
+from sys import stdout
+from typing import Any, Optional
+
+try:  # vectorized decoding needs numpy, but the rest of the package does not
+    import numpy as np
+except ImportError:
+    np = None
+
+from vdifheader.headertable import HEADER_WORDS, numpy_required, raw_column
+from vdifheader.vdifheaderfield import VDIFHeaderField as Field
+
+
+# fields counted by value (seconds and frame numbers have too many values)
+HISTOGRAM_FIELDS = [Field.INVALID_FLAG, Field.LEGACY_MODE,
+    Field.UNASSIGNED_FIELD, Field.REFERENCE_EPOCH, Field.VDIF_VERSION,
+    Field.NUM_CHANNELS, Field.DATA_FRAME_LENGTH, Field.DATA_TYPE,
+    Field.BITS_PER_SAMPLE, Field.THREAD_ID, Field.STATION_ID,
+    Field.EXTENDED_DATA_VERSION]
+MAX_PRINTED_VALUES = 10     # most values of each histogram printed
+MAX_BINCOUNT_MASK = 0xffff  # widest field counted with np.bincount
+
+
+class VDIFFileSummary:
+    """A class that represents the frames and field values seen in a file"""
+
+    def __init__(self, num_frames: int, num_bytes: int,
+            first_timestamp: Optional[datetime],
+            last_timestamp: Optional[datetime],
+            histograms: dict[Field,dict[Any,int]]):
+        self.num_frames: int = num_frames
+        self.num_bytes: int = num_bytes     # total data_frame_length
+        self.first_timestamp: Optional[datetime] = first_timestamp
+        self.last_timestamp: Optional[datetime] = last_timestamp
+        self.histograms: dict[Field,dict[Any,int]] = histograms
+        return
+
+    ######## PROPERTIES
+
+    @property
+    def time_span(self) -> Optional[timedelta]:
+        """Time from earliest to latest header timestamp (to the second)"""
+        if self.first_timestamp is None:
+            return None
+        return self.last_timestamp - self.first_timestamp
+
+    @property
+    def thread_ids(self) -> list[int]:
+        """Sorted thread_id of every thread in file"""
+        return sorted(self.histograms[Field.THREAD_ID])
+
+    @property
+    def frame_lengths(self) -> list[int]:
+        """Sorted distinct data_frame_length values"""
+        return sorted(self.histograms[Field.DATA_FRAME_LENGTH])
+
+    @property
+    def station_ids(self) -> list[str]:
+        """Sorted distinct station_id values"""
+        return sorted(self.histograms[Field.STATION_ID])
+
+    @property
+    def extended_data_versions(self) -> list[int]:
+        """Sorted distinct extended_data_version values"""
+        return sorted(self.histograms[Field.EXTENDED_DATA_VERSION])
+
+    @property
+    def num_invalid(self) -> int:
+        """Number of frames with invalid_flag set"""
+        return self.histograms[Field.INVALID_FLAG].get(True, 0)
+
+    ######## PUBLIC METHODS
+
+    def to_dict(self) -> dict[str,Any]:
+        """Creates dict of summary as format name: value"""
+        to_str = lambda value: value.isoformat() \
+            if isinstance(value, datetime) else value
+        return {
+            "num_frames": self.num_frames,
+            "num_bytes": self.num_bytes,
+            "first_timestamp": to_str(self.first_timestamp),
+            "last_timestamp": to_str(self.last_timestamp),
+            "time_span_seconds": None if self.time_span is None else
+                self.time_span.total_seconds(),
+            "num_invalid": self.num_invalid,
+            "histograms": {field.value: [[to_str(value), count]
+                for value, count in histogram.items()]
+                for field, histogram in self.histograms.items()},
+        }
+
+    def print_report(self):
+        """Prints frame count, time span and histogram of each field"""
+        stdout.write(f"Frames: {self.num_frames} ({self.num_bytes} bytes)\n")
+        if self.first_timestamp is not None:
+            stdout.write(f"Time span: {self.first_timestamp} to " \
+                f"{self.last_timestamp} ({self.time_span})\n")
+        stdout.write(f"Threads: {_join(self.thread_ids)}\n")
+        stdout.write(f"Frame lengths: {_join(self.frame_lengths)}\n")
+        stdout.write(f"Stations: {_join(self.station_ids)}\n")
+        stdout.write(f"Extended data versions: " \
+            f"{_join(self.extended_data_versions)}\n")
+        stdout.write(f"Invalid frames: {self.num_invalid}\n")
+        for field, histogram in self.histograms.items():
+            stdout.write(f"{field.value}:\n")
+            by_count = sorted(histogram.items(), key=lambda item: -item[1])
+            for value, count in by_count[:MAX_PRINTED_VALUES]:
+                stdout.write(f"  {value}: {count}\n")
+            if len(by_count) > MAX_PRINTED_VALUES:
+                stdout.write(f"  ({len(by_count) - MAX_PRINTED_VALUES} " \
+                    "more values)\n")
+        return
+
+
+class VDIFSummariser:
+    """A class that summarises raw header words, a chunk at a time"""
+
+    def __init__(self):
+        numpy_required("VDIFSummariser")
+        self.__num_frames: int = 0
+        self.__num_bytes: int = 0
+        self.__first_time: Optional[int] = None    # epoch << 32 | seconds
+        self.__last_time: Optional[int] = None
+        # counts by raw field value, only decoded when finished
+        self.__raw_counts: dict[Field,dict[int,int]] = {field: {}
+            for field in HISTOGRAM_FIELDS}
+        return
+
+    def add_words(self, words: "np.ndarray"):
+        """Adds headers as array of raw header words, shape (n, 8)"""
+        words = np.asarray(words, dtype="<u4").reshape(-1, HEADER_WORDS)
+        if len(words) == 0:
+            return
+        self.__num_frames += len(words)
+        self.__num_bytes += int(raw_column(words,
+            Field.DATA_FRAME_LENGTH).sum(dtype=np.int64)) * 8
+        times = (raw_column(words, Field.REFERENCE_EPOCH).astype(np.int64)
+            << 32) | raw_column(words, Field.SECONDS_FROM_EPOCH)
+        first, last = int(times.min()), int(times.max())
+        if self.__first_time is None:
+            self.__first_time, self.__last_time = first, last
+        self.__first_time = min(self.__first_time, first)
+        self.__last_time = max(self.__last_time, last)
+        for field in HISTOGRAM_FIELDS:
+            counts = self.__raw_counts[field]
+            column = raw_column(words, field)
+            if field._word_layout[2] <= MAX_BINCOUNT_MASK:
+                # counting into bins is faster than sorting, for small fields
+                value_counts = np.bincount(column)
+                values = np.flatnonzero(value_counts)
+                value_counts = value_counts[values]
+            else:
+                values, value_counts = np.unique(column, return_counts=True)
+            for value, count in zip(values.tolist(), value_counts.tolist()):
+                counts[value] = counts.get(value, 0) + count
+        return
+
+    def finish(self) -> VDIFFileSummary:
+        """Decodes distinct field values, and reports summary"""
+        histograms = {}
+        for field, counts in self.__raw_counts.items():
+            histogram = {}
+            for raw_value, count in sorted(counts.items()):
+                value = field._word_decoder(raw_value)
+                histogram[value] = histogram.get(value, 0) + count
+            histograms[field] = histogram
+        first_timestamp = last_timestamp = None
+        if self.__first_time is not None:
+            first_timestamp, last_timestamp = [_timestamp(time)
+                for time in (self.__first_time, self.__last_time)]
+        return VDIFFileSummary(self.__num_frames, self.__num_bytes,
+            first_timestamp, last_timestamp, histograms)
+
+######## PRIVATE METHODS
+
+def _timestamp(time: int) -> datetime:
+    epoch = Field.REFERENCE_EPOCH._word_decoder(time >> 32)
+    return epoch + timedelta(seconds=time & 0xffffffff)
+
+
+def _join(values: list) -> str:
+    return ", ".join(str(value) for value in values) or "none"
@@ -0,0 +1,177 @@
+# > vdifheader - validation.py
+# Defines vectorized validation of every header in a VDIF file at once
+
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+> vdifheader - validation.py
+Defines vectorized validation of every header in a VDIF file at once
+"""
+__author__ = "Mars Buttfield-Addison"
+__authors__ = [__author__]
+__contact__ = "hello@themartianlife.com"
+__copyright__ = f"Copyright 2022, {__author__}"
+__credits__ = __authors__
+__date__ = "2022/04/07"
+__deprecated__ = False
+__email__ = __contact__
+__license__ = "GPLv3"
+__maintainer__ = __author__
+__status__ = "Pre-release"
+__version__ = "0.1"
+
+from sys import stdout
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+try:  # vectorized decoding needs numpy, but the rest of the package does not
+    import numpy as np
+except ImportError:
+    np = None
+
+from vdifheader.headertable import numpy_required
+from vdifheader.vdifheader import HIGHEST_VERSION
+from vdifheader.vdifheaderfield import VDIFHeaderField as Field
+
+
+MAX_EXAMPLES = 5    # number of example offending frames kept for each rule
+ERROR = "error"     # severity of rules that would raise or vh_error on parse
+WARNING = "warning" # severity of rules that would vh_warn on parse
+RECOGNISED_EDVS = [0x00, 0x01, 0x02, 0x03, 0x04, 0xab]
+
+
+class VDIFValidationResult:
+    """A class that represents all failures of one rule across many headers"""
+
+    def __init__(self, rule: str, severity: str, message: str, field: Field,
+            count: int, offsets: list[int], examples: list[Any]):
+        self.rule: str = rule
+        self.severity: str = severity
+        self.message: str = message
+        self.field: Field = field
+        self.count: int = count
+        self.first_offset: Optional[int] = offsets[0] if offsets else None
+        self.last_offset: Optional[int] = offsets[-1] if offsets else None
+        self.examples: list[tuple[int,Any]] = list(zip(offsets, examples))
+        return
+
+    def to_dict(self) -> dict[str,Any]:
+        """Creates dict of result attributes as format name: value"""
+        return {
+            "rule": self.rule,
+            "severity": self.severity,
+            "message": self.message,
+            "field": self.field.value,
+            "count": self.count,
+            "first_offset": self.first_offset,
+            "last_offset": self.last_offset,
+            "examples": self.examples,
+        }
+
+
+class VDIFValidationReport:
+    """A class that represents results of validating many headers at once"""
+
+    def __init__(self, num_frames: int, results: list[VDIFValidationResult]):
+        self.num_frames: int = num_frames
+        self.results: list[VDIFValidationResult] = results
+        return
+
+    @property
+    def is_valid(self) -> bool:
+        """Whether no header broke a rule of error severity"""
+        return all(result.severity != ERROR for result in self.failures)
+
+    @property
+    def failures(self) -> list[VDIFValidationResult]:
+        """Results of rules that were broken by at least one header"""
+        return [result for result in self.results if result.count > 0]
+
+    def to_dict(self) -> dict[str,Any]:
+        """Creates dict of report as format name: value"""
+        return {
+            "num_frames": self.num_frames,
+            "results": [result.to_dict() for result in self.results],
+        }
+
+    def print_report(self):
+        """Prints one line for each rule broken by at least one header"""
+        stdout.write(f"Validated {self.num_frames} headers: " \
+            f"{len(self.failures)} rule(s) broken\n")
+        for result in self.failures:
+            stdout.write(f"{result.severity.upper()}: {result.message} " \
+                f"({result.count} frames, first at byte " \
+                f"{result.first_offset}, last at byte {result.last_offset})\n")
+        return
+
+
+def validate_header_table(table: "np.ndarray",
+        offsets: "np.ndarray") -> VDIFValidationReport:
+    """
+    Checks every header in table against VDIF spec, all at once
+
+        parameter:
+            table: np.ndarray       header table, as from decode_header_words
+            offsets: np.ndarray     byte offset in file of each header in table
+
+        returns:
+            VDIFValidationReport    count and examples of each broken rule
+    """
+    numpy_required("validate_header_table")
+    results = []
+    for rule, severity, message, field, check in _rules(table):
+        failed = np.flatnonzero(check(table))
+        # keep first few failures as examples, and always keep the last one
+        kept = failed[:MAX_EXAMPLES]
+        if len(failed) > MAX_EXAMPLES:
+            kept = np.append(failed[:MAX_EXAMPLES - 1], failed[-1])
+        kept_offsets = [int(offsets[i]) for i in kept]
+        examples = [table[field.value][i].item() for i in kept]
+        results.append(VDIFValidationResult(rule, severity, message, field,
+            len(failed), kept_offsets, examples))
+    return VDIFValidationReport(len(table), results)
+
+######## PRIVATE METHODS
+
+def _rules(table: "np.ndarray") -> list[tuple[str,str,str,Field,Callable]]:
+    # same checks as VDIFHeader property setters, plus whole-file consistency
+    now = np.datetime64(datetime.now(timezone.utc).replace(tzinfo=None), "s")
+    first_length = table[Field.DATA_FRAME_LENGTH.value][:1]
+    min_length = np.where(table[Field.LEGACY_MODE.value], 16, 32)
+    return [
+        ("unassigned_field", ERROR, "unassigned_field value should always be 0",
+            Field.UNASSIGNED_FIELD,
+            lambda t: t[Field.UNASSIGNED_FIELD.value] != 0),
+        ("reference_epoch", WARNING,
+            "reference_epoch should not be in the future",
+            Field.REFERENCE_EPOCH,
+            lambda t: t[Field.REFERENCE_EPOCH.value] > now),
+        ("vdif_version", WARNING,
+            f"vdif_version value > {HIGHEST_VERSION} not recognised",
+            Field.VDIF_VERSION,
+            lambda t: t[Field.VDIF_VERSION.value] > HIGHEST_VERSION),
+        ("data_frame_length", ERROR,
+            "data_frame_length must be > 32 (or 16 in legacy mode)",
+            Field.DATA_FRAME_LENGTH,
+            lambda t: t[Field.DATA_FRAME_LENGTH.value] < min_length),
+        ("extended_data_version", WARNING,
+            "extended_data_version not recognised",
+            Field.EXTENDED_DATA_VERSION,
+            lambda t: ~np.isin(t[Field.EXTENDED_DATA_VERSION.value],
+                RECOGNISED_EDVS)),
+        ("invalid_flag", WARNING, "invalid_flag is set",
+            Field.INVALID_FLAG,
+            lambda t: t[Field.INVALID_FLAG.value]),
+        ("equal_frame_lengths", WARNING,
+            "data_frame_length should equal that of first frame",
+            Field.DATA_FRAME_LENGTH,
+            lambda t: t[Field.DATA_FRAME_LENGTH.value] != first_length),
+    ]
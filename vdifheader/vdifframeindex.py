@@ -0,0 +1,262 @@
+# > vdifheader - vdifframeindex.py
+# Defines VDIFFrameIndex class that represents a sidecar index of a VDIF file
+
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+> vdifheader - vdifframeindex.py
+Defines VDIFFrameIndex class that represents a sidecar index of a VDIF file
+"""
+__author__ = "Mars Buttfield-Addison"
+__authors__ = [__author__]
+__contact__ = "hello@themartianlife.com"
+__copyright__ = f"Copyright 2022, {__author__}"
+__credits__ = __authors__
+__date__ = "2022/04/07"
+__deprecated__ = False
+__email__ = __contact__
+__license__ = "GPLv3"
+__maintainer__ = __author__
+__status__ = "Pre-release"
+__version__ = "0.1"
+
+from os import getpid, path, replace, remove, stat
+from struct import Struct
+from typing import Iterator, Optional, Tuple
+
+try:  # vectorized decoding needs numpy, but the rest of the package does not
+    import numpy as np
+except ImportError:
+    np = None
+
+from vdifheader._utils import sanitized_path, vh_warn
+from vdifheader.headertable import HEADER_WORDS, decode_header_words, \
+    numpy_required, read_header_words
+from vdifheader.vdifheader import VDIFHeader
+from vdifheader.vdifheaderfield import VDIFHeaderField as Field
+
+
+INDEX_EXTENSION = ".vdifidx"        # appended to input filepath for sidecar
+INDEX_MAGIC = b"VDIFIDX1"           # first bytes of every index file
+INDEX_PREAMBLE_BYTES = 64           # index preamble is padded to this length
+INDEX_PREAMBLE = Struct("<8sQqQ")   # magic, file size, mtime (ns), num frames
+
+
+class VDIFFrameIndex:
+    """A class that represents the byte offset and raw words of every header"""
+
+    def __init__(self, valid_caller: bool=False):
+        """Private initialiser that raises NotImplementedError on direct call"""
+        if not valid_caller:
+            raise NotImplementedError("VDIFFrameIndex object cannot be " \
+                "directly instatiated. Values must be extracted using " \
+                "factory methods VDIFFrameIndex.build() or " \
+                "VDIFFrameIndex.load().")
+        self.__input_filepath: str = ""
+        self.__index_filepath: str = ""
+        self.__file_key: Tuple[int,int] = (0, 0)
+        self.__records: "np.ndarray" = None
+        self.__thread_frames: Optional[dict[int,"np.ndarray"]] = None
+        return
+
+    @staticmethod
+    def build(input_filepath: str, index_filepath: Optional[str]=None,
+            save: bool=True) -> "VDIFFrameIndex":
+        """Creates new index by scanning file, and saves it if requested"""
+        numpy_required("VDIFFrameIndex.build")
+        frame_index = VDIFFrameIndex(valid_caller=True)
+        frame_index.__input_filepath = sanitized_path(input_filepath)
+        frame_index.__index_filepath = index_path(input_filepath,
+            index_filepath)
+        frame_index.__file_key = _file_key(frame_index.__input_filepath)
+        offsets, words = read_header_words(frame_index.__input_filepath)
+        records = np.zeros(len(offsets), dtype=index_record_dtype())
+        records["offset"] = offsets
+        records["words"] = words
+        frame_index.__records = records
+        if save:
+            frame_index.save()
+        return frame_index
+
+    @staticmethod
+    def load(input_filepath: str,
+            index_filepath: Optional[str]=None) -> Optional["VDIFFrameIndex"]:
+        """Memory maps saved index if it exists and is current, else None"""
+        numpy_required("VDIFFrameIndex.load")
+        _input_filepath = sanitized_path(input_filepath)
+        _index_filepath = index_path(input_filepath, index_filepath)
+        if not path.isfile(_index_filepath):
+            return None
+        with open(_index_filepath, "rb") as index_file:
+            preamble = index_file.read(INDEX_PREAMBLE_BYTES)
+        if len(preamble) < INDEX_PREAMBLE_BYTES:
+            return None
+        magic, file_size, mtime, num_frames = INDEX_PREAMBLE.unpack_from(
+            preamble)
+        # index is only valid for the exact file content it was built from
+        if magic != INDEX_MAGIC:
+            return None
+        if (file_size, mtime) != _file_key(_input_filepath):
+            return None
+        records_dtype = index_record_dtype()
+        records_size = num_frames * records_dtype.itemsize
+        if path.getsize(_index_filepath) != INDEX_PREAMBLE_BYTES + records_size:
+            return None
+        frame_index = VDIFFrameIndex(valid_caller=True)
+        frame_index.__input_filepath = _input_filepath
+        frame_index.__index_filepath = _index_filepath
+        frame_index.__file_key = (file_size, mtime)
+        if num_frames == 0:  # np.memmap cannot map zero records
+            frame_index.__records = np.zeros(0, dtype=records_dtype)
+        else:
+            frame_index.__records = np.memmap(_index_filepath, mode="r",
+                dtype=records_dtype, offset=INDEX_PREAMBLE_BYTES,
+                shape=(num_frames,))
+        return frame_index
+
+    ######## PROPERTIES
+
+    @property
+    def input_filepath(self) -> str:
+        """Path of the VDIF file that this index describes"""
+        return self.__input_filepath
+
+    @property
+    def index_filepath(self) -> str:
+        """Path of the sidecar file that this index is saved to"""
+        return self.__index_filepath
+
+    @property
+    def offsets(self) -> "np.ndarray":
+        """Byte offset of each header within the VDIF file"""
+        return self.__records["offset"]
+
+    @property
+    def words(self) -> "np.ndarray":
+        """Eight raw little-endian words of each header"""
+        return self.__records["words"]
+
+    @property
+    def thread_ids(self) -> list[int]:
+        """Sorted thread_id of every thread with at least one frame in file"""
+        return sorted(self.__get_thread_frames().keys())
+
+    @property
+    def is_current(self) -> bool:
+        """Whether the VDIF file is unchanged since this index was built"""
+        if not path.isfile(self.__input_filepath):
+            return False
+        return self.__file_key == _file_key(self.__input_filepath)
+
+    ######## PUBLIC METHODS
+
+    def get_header(self, frame_num: int) -> VDIFHeader:
+        """Gets header of frame at position frame_num in file"""
+        return VDIFHeader.parse(self.words[frame_num].tobytes())
+
+    def get_headers(self, count: Optional[int]=None,
+            start: int=0) -> Iterator[VDIFHeader]:
+        """Gets iterator of count headers from position start in file"""
+        stop = len(self)
+        if count is not None and count > 0:
+            stop = min(stop, start + count)
+        for frame_num in range(start, stop):
+            yield self.get_header(frame_num)
+
+    def to_table(self) -> "np.ndarray":
+        """Decodes all indexed headers into table of header field values"""
+        return decode_header_words(self.words)
+
+    def thread_frame_nums(self, thread_id: int) -> "np.ndarray":
+        """Gets position in file of each frame of thread, in file order"""
+        frame_nums = self.__get_thread_frames().get(thread_id)
+        if frame_nums is None:
+            return np.zeros(0, dtype=np.int64)
+        return frame_nums
+
+    def thread_offsets(self, thread_id: int) -> "np.ndarray":
+        """Gets byte offset in file of each frame of thread, in file order"""
+        return self.offsets[self.thread_frame_nums(thread_id)]
+
+    def get_thread_headers(self, thread_id: int, 
+            count: Optional[int]=None) -> Iterator[VDIFHeader]:
+        """Gets iterator of first count headers of thread, in file order"""
+        frame_nums = self.thread_frame_nums(thread_id)
+        if count is not None and count > 0:
+            frame_nums = frame_nums[:count]
+        for frame_num in frame_nums:
+            yield self.get_header(frame_num)
+
+    def thread_table(self, thread_id: int) -> "np.ndarray":
+        """Decodes only headers of thread into table of header field values"""
+        return decode_header_words(self.words[self.thread_frame_nums(
+            thread_id)])
+
+    def save(self):
+        """Writes index to its sidecar file, replacing any existing index"""
+        file_size, mtime = self.__file_key
+        preamble = INDEX_PREAMBLE.pack(INDEX_MAGIC, file_size, mtime,
+            len(self)).ljust(INDEX_PREAMBLE_BYTES, b"\0")
+        # write whole index to a temporary file, then move it into place so
+        # that other processes never map a partially written index
+        temp_filepath = f"{self.__index_filepath}.{getpid()}.tmp"
+        try:
+            with open(temp_filepath, "wb") as temp_file:
+                temp_file.write(preamble)
+                temp_file.write(np.ascontiguousarray(self.__records).tobytes())
+            replace(temp_filepath, self.__index_filepath)
+        except OSError as error:
+            vh_warn(f"could not save frame index to {self.__index_filepath} " \
+                f"({error.strerror})")
+            if path.exists(temp_filepath):
+                remove(temp_filepath)
+        return
+
+    ######## PRIVATE METHODS
+
+    def __get_thread_frames(self) -> dict[int,"np.ndarray"]:
+        # group frame positions by thread in one pass over thread_id words,
+        # the first time any thread is asked for
+        if self.__thread_frames is None:
+            word, bit, mask = Field.THREAD_ID._word_layout
+            thread_ids = (self.words[:, word] >> bit) & mask
+            # stable sort keeps each thread's frames in file order
+            order = np.argsort(thread_ids, kind="stable")
+            unique_ids, starts = np.unique(thread_ids[order], 
+                return_index=True)
+            self.__thread_frames = {int(thread_id): frame_nums 
+                for thread_id, frame_nums in zip(unique_ids, 
+                    np.split(order, starts[1:]))}
+        return self.__thread_frames
+
+    ######## OVERLOADED METHODS
+
+    def __len__(self) -> int:
+        return len(self.__records)
+
+
+def index_path(input_filepath: str, index_filepath: Optional[str]=None) -> str:
+    """Gets path of sidecar index file for VDIF file at input filepath"""
+    if index_filepath is not None:
+        return sanitized_path(index_filepath)
+    return sanitized_path(input_filepath) + INDEX_EXTENSION
+
+
+def index_record_dtype() -> "np.dtype":
+    """Gets structured dtype of a single frame record within an index file"""
+    numpy_required("index_record_dtype")
+    return np.dtype([("offset", "<u8"), ("words", "<u4", (HEADER_WORDS,))])
+
+######## PRIVATE METHODS
+
+def _file_key(input_filepath: str) -> Tuple[int,int]:
+    file_stat = stat(input_filepath)
+    return (file_stat.st_size, file_stat.st_mtime_ns)
@@ -29,18 +29,68 @@ __status__ = "Pre-release"
 __version__ = "0.1"
 
 from math import log2
+from struct import Struct
 from sys import stdout
-from datetime import datetime, timedelta
-from typing import Any, Union
+from time import perf_counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, Union
 
 from vdifheader._utils import *
-from vdifheader.vdifheaderfield import VDIFHeaderField as Field
+from vdifheader.vdifheaderfield import VDIFHeaderField as Field, ASCII_START
 
 
 HIGHEST_VERSION = 1     # highest vdif version that is recognised
 WORD_BYTES = 4          # number of bytes in a word
 WORD_BITS = 32          # number of bits in a word
 HEADER_WORDS = 8        # number of words in a (non-legacy) header
+HEADER_BYTES = 32       # number of bytes in a (non-legacy) header
+HEADER_STRUCT = Struct("<8I")   # header as eight little-endian 32-bit words
+ED_WORD = 4             # first word of extended data
+ED_MASK = 0xffffff      # bits of first extended data word not used by edv
+PRIMARY_FIELDS = frozenset(Field.primary_values())  # fields assignable by user
+BOOL_FIELDS = [f for f in Field.primary_values() if f.data_type == bool]
+DATETIME_FIELDS = [f for f in Field.primary_values() if f.data_type == datetime]
+INT_FIELDS = [f for f in Field.primary_values() if f.data_type == int]
+STR_FIELDS = [f for f in Field.primary_values() if f.data_type == str]
+# (field, (word, shift, mask), encoder) of each field packed by to_bytes()
+ENCODED_FIELDS = [(f, f._word_layout, f._word_encoder) 
+    for f in Field.primary_values()]
+# names of extended data fields as printed by print_values
+ED_LABELS = {
+    Field.SYNC_WORD: "Sync word",
+    Field.DAS_ID: "DAS ID",
+    Field.POLARISATION_BLOCK: "Polarisation block",
+    Field.QUADRANT: "Quadrant",
+    Field.CORRELATOR: "Correlator",
+    Field.STATUS_WORD: "Status word",
+    Field.PACKET_SERIAL_NUMBER: "Packet serial number",
+    Field.TUNING_WORD: "Tuning word",
+    Field.DBE_PERSONALITY: "DBE personality",
+    Field.MINOR_REVISION: "Minor revision",
+    Field.MAJOR_REVISION: "Major revision",
+    Field.SIDEBAND: "Sideband",
+    Field.SUBBAND: "Subband",
+    Field.IF_NUMBER: "IF number",
+    Field.DBE_UNIT: "DBE unit",
+    Field.VALIDITY_MASK_LENGTH: "Validity mask length",
+    Field.VALIDITY_MASK: "Validity mask",
+    Field.MARK5B_FRAME_NUMBER: "Mark 5B frame number",
+    Field.TEST_DATA: "Test data",
+    Field.USER_DATA: "User data",
+    Field.TRUNCATED_MJD: "Truncated MJD",
+    Field.SECONDS_OF_DAY: "Seconds of day",
+    Field.FRACTIONAL_SECONDS: "Fractional seconds",
+    Field.CRC: "CRC",
+}
+# extended data fields printed in hexadecimal
+HEX_FIELDS = [Field.SYNC_WORD, Field.STATUS_WORD, Field.DBE_PERSONALITY,
+    Field.VALIDITY_MASK, Field.USER_DATA, Field.CRC]
+# order in which fields are checked by validate(), as they depend on each other
+VALIDATION_ORDER = [Field.INVALID_FLAG, Field.LEGACY_MODE, 
+    Field.REFERENCE_EPOCH, Field.SECONDS_FROM_EPOCH, Field.UNASSIGNED_FIELD,
+    Field.DATA_FRAME_NUMBER, Field.VDIF_VERSION, Field.NUM_CHANNELS, 
+    Field.DATA_FRAME_LENGTH, Field.BITS_PER_SAMPLE, Field.THREAD_ID, 
+    Field.EXTENDED_DATA_VERSION, Field.DATA_TYPE, Field.STATION_ID]
 
 
 class VDIFHeader:
@@ -80,38 +130,31 @@ class VDIFHeader:
             Field.STATION_ID: "0",
         }
         self.__extended_data_fields: dict[Field,type] = {}
+        # original header words, from which raw values are derived if unset
+        self.__words: tuple[int,...] = None
+        # whether station id bits are still those of original header words
+        self.__station_id_parsed: bool = False
         return
 
     @staticmethod
-    def parse(raw_data: bytes) -> "VDIFHeader":
+    def parse(raw_data: bytes, validate: bool=True,
+            stats: Optional[Any]=None) -> "VDIFHeader":
         """Creates new VDIFHeader object from interpretation of raw data"""
+        if stats is not None:
+            return VDIFHeader.__parse_timed(raw_data, validate, stats)
         header = VDIFHeader(valid_caller=True)
-        binary_data = VDIFHeader._preprocess(raw_data)
-        # set each of the boolean fields
-        header.invalid_flag = Field.INVALID_FLAG._from(binary_data)
-        header.legacy_mode = Field.LEGACY_MODE._from(binary_data)
-        # now datetime fields
-        header.reference_epoch = Field.REFERENCE_EPOCH._from(binary_data)
-        # now integer fields
-        header.seconds_from_epoch = Field.SECONDS_FROM_EPOCH._from(binary_data)
-        header.unassigned_field = Field.UNASSIGNED_FIELD._from(binary_data)
-        header.data_frame_number = Field.DATA_FRAME_NUMBER._from(binary_data)
-        header.vdif_version = Field.VDIF_VERSION._from(binary_data)
-        header.num_channels = Field.NUM_CHANNELS._from(binary_data)
-        header.data_frame_length = Field.DATA_FRAME_LENGTH._from(binary_data)
-        header.bits_per_sample = Field.BITS_PER_SAMPLE._from(binary_data)
-        header.thread_id = Field.THREAD_ID._from(binary_data)
-        edv = Field.EXTENDED_DATA_VERSION._from(binary_data)
-        header.extended_data_version = edv
-        # now string fields
-        header.data_type = Field.DATA_TYPE._from(binary_data)
-        header.station_id = Field.STATION_ID._from(binary_data)
-        # now extended_data
-        header.__extended_data_fields = Field.EXTENDED_DATA._from(binary_data)
-        raw_extended_data = Field.EXTENDED_DATA._raw_from(binary_data)
-        header.__raw_values[Field.EXTENDED_DATA] = raw_extended_data
+        words = VDIFHeader._unpack(raw_data)
+        # decoded values are trusted, so set them without per-field checks
+        header.__set_words(words)
+        # then check them all at once, unless caller has opted out
+        if validate:
+            header.validate()
         return header
 
+    @staticmethod
+    def _parse_unvalidated(raw_data: bytes) -> "VDIFHeader":
+        return VDIFHeader.parse(raw_data, validate=False)
+
     ######## PROPERTIES
 
     @property
@@ -152,7 +195,8 @@ class VDIFHeader:
     @unassigned_field.setter
     def unassigned_field(self, value: int):
         if type(value) == int and value != 0:
-            vh_error("unassigned_field value should always be 0")
+            vh_error("unassigned_field value should always be 0",
+                Field.UNASSIGNED_FIELD)
         self._try_set_field(Field.UNASSIGNED_FIELD, value)
         return
 
@@ -163,12 +207,13 @@ class VDIFHeader:
 
     @reference_epoch.setter
     def reference_epoch(self, value: datetime):
-        now = to_utc(datetime.now())
+        now = datetime.now(timezone.utc)
         _value = value
         if type(value) == datetime:
             _value = to_utc(value)
             if _value > now:
-                vh_warn("reference_epoch should not be in the future")
+                vh_warn("reference_epoch should not be in the future",
+                    Field.REFERENCE_EPOCH)
             if _value.year < 2000:
                 raise ValueError("reference_epoch can only be post-2000.")
             if _value.month not in [1, 7] or _value.day != 1:
@@ -194,7 +239,8 @@ class VDIFHeader:
     @vdif_version.setter
     def vdif_version(self, value: int):
         if type(value) == int and value > HIGHEST_VERSION:
-            vh_warn(f"vdif_version value > {HIGHEST_VERSION} not recognised")
+            vh_warn(f"vdif_version value > {HIGHEST_VERSION} not recognised",
+                Field.VDIF_VERSION)
         self._try_set_field(Field.VDIF_VERSION, value)
         return
 
@@ -271,9 +317,11 @@ class VDIFHeader:
         if type(value) == str:
             if value.isnumeric() and int(value) // 256 >= 0x30:
                 raise ValueError("numeric station_id first bit must be < 0x30.")
-            elif not value.isnumeric() and len(value) != 2:
-                raise ValueError("ASCII station_id length must be 2 chars.")
+            elif not value.isnumeric() and not 1 <= len(value) <= 2:
+                raise ValueError("ASCII station_id length must be 1 or 2 " \
+                    "chars.")
         self._try_set_field(Field.STATION_ID, value)
+        self.__station_id_parsed = False
         return
 
     @property
@@ -285,7 +333,8 @@ class VDIFHeader:
     def extended_data_version(self, new_value: int):
         recognised_versions = [0x00, 0x01, 0x02, 0x03, 0x04, 0xab]
         if new_value not in recognised_versions:
-            vh_warn(f"extended_data_version {new_value} not recognised")
+            vh_warn(f"extended_data_version {new_value} not recognised",
+                Field.EXTENDED_DATA_VERSION)
         self._try_set_field(Field.EXTENDED_DATA_VERSION, new_value)
         self.__interpret_extended_data()
         return
@@ -310,16 +359,50 @@ class VDIFHeader:
 
     ######## PUBLIC METHODS
 
-    def get_timestamp(self) -> datetime:
-        """Gets reference epoch + seconds from epoch as datetime object"""
+    def validate(self):
+        """Checks each field value as per VDIF spec, as if newly assigned"""
+        # reassigning each value runs the same checks as its property setter
+        station_id_parsed = self.__station_id_parsed
+        for field in VALIDATION_ORDER:
+            setattr(self, field.value, self._get_value(field))
+        self.__station_id_parsed = station_id_parsed
+        return
+
+    def get_timestamp(self, frames_per_second: Optional[int]=None) -> datetime:
+        """Gets epoch + seconds (+ frame number / frame rate) as datetime"""
         epoch = self.reference_epoch
         elapsed = timedelta(seconds=self.seconds_from_epoch)
+        if frames_per_second is not None:
+            elapsed += timedelta(seconds=self.data_frame_number / 
+                frames_per_second)
         return epoch + elapsed
 
     def get_station_information(self) -> str:
         """Gets name of source station for given station id, if known"""
         return station_information(self.station_id)
 
+    def to_bytes(self) -> bytes:
+        """Packs header fields into 32 bytes, as parse() would read them"""
+        words = [0] * HEADER_WORDS
+        values = self.__bool_fields | self.__datetime_fields | \
+            self.__int_fields | self.__str_fields
+        for field, (word, shift, mask), encoder in ENCODED_FIELDS:
+            if field == Field.STATION_ID and self.__station_id_parsed:
+                # kept as parsed, as e.g. "12" is read from both ASCII and
+                # numeric ids, so cannot be encoded back to the same bits
+                words[word] |= self.__words[word] & (mask << shift)
+                continue
+            raw_value = encoder(values[field])
+            if not 0 <= raw_value <= mask:
+                raise ValueError(f"Cannot encode {field.value} " \
+                    f"{values[field]} in {field._bit_length} bits.")
+            words[word] |= raw_value << shift
+        # extended data is kept as parsed, as it cannot yet be assigned
+        if self.__words is not None:
+            words[ED_WORD] |= self.__words[ED_WORD] & ED_MASK
+            words[ED_WORD + 1:] = self.__words[ED_WORD + 1:]
+        return HEADER_STRUCT.pack(*words)
+
     def to_inifile(self, output_filepath: str):
         """Writes file of name=value for each field in header"""
         with open(sanitized_path(output_filepath), "w+") as output_file:
@@ -366,6 +449,29 @@ class VDIFHeader:
 
     ######## PRIVATE METHODS
 
+    @staticmethod
+    def _unpack(raw_data: bytes) -> tuple[int,...]:
+        if len(raw_data) < HEADER_BYTES:
+            raise ValueError(f"VDIFHeader requires {HEADER_BYTES} bytes of " \
+                f"raw data, but got {len(raw_data)}.")
+        return HEADER_STRUCT.unpack_from(raw_data)
+
+    @staticmethod
+    def __parse_timed(raw_data: bytes, validate: bool,
+            stats: Any) -> "VDIFHeader":
+        # as parse(), but adds time taken to a VDIFScanStats
+        start = perf_counter()
+        header = VDIFHeader(valid_caller=True)
+        header.__set_words(VDIFHeader._unpack(raw_data))
+        decoded = perf_counter()
+        stats.decode_seconds += decoded - start
+        if validate:
+            header.validate()
+            stats.validation_seconds += perf_counter() - decoded
+        stats.frames_parsed += 1
+        stats.bytes_scanned += header.data_frame_length
+        return header
+
     @staticmethod
     def _preprocess(raw_data: bytes) -> str:
         data = list(raw_data)
@@ -378,7 +484,7 @@ class VDIFHeader:
 
     def _try_set_field(self, field: Field, 
             new_value: Union[bool,datetime,int,str]):
-        if field not in Field.primary_values(): # an assignable field
+        if field not in PRIMARY_FIELDS: # an assignable field
             raise ValueError("_try_set_field cannot assign value to field " \
                 f"{field.value}.")
         if type(new_value) != field.data_type: # correct type of value
@@ -418,10 +524,42 @@ class VDIFHeader:
             return self.__extended_data_fields
 
     def _get_raw_value(self, field: Field):
-        return self.__raw_values.get(field, None)
+        if field == Field.STATION_ID and self.__station_id_parsed:
+            # as parsed, even if validate() has since reassigned it
+            return self.__station_id_raw_value()
+        raw_value = self.__raw_values.get(field, None)
+        if raw_value is None and self.__words is not None:
+            # not assigned since parse, so derive as assignment would have
+            if field in PRIMARY_FIELDS:
+                raw_value = switch_end(field._encoder(self._get_value(field)))
+                raw_value = raw_value.ljust(field._bit_length, "0")
+            elif field == Field.EXTENDED_DATA:
+                raw_value = field._raw_from_words(self.__words)
+        return raw_value
+
+    def __set_words(self, words: tuple[int,...]):
+        self.__words = words
+        self.__raw_values = {}
+        self.__bool_fields = {f: f._from_words(words) for f in BOOL_FIELDS}
+        self.__datetime_fields = {f: f._from_words(words) 
+            for f in DATETIME_FIELDS}
+        self.__int_fields = {f: f._from_words(words) for f in INT_FIELDS}
+        self.__str_fields = {f: f._from_words(words) for f in STR_FIELDS}
+        self.__extended_data_fields = Field.EXTENDED_DATA._from_words(words)
+        self.__station_id_parsed = True
+        return
+
+    def __station_id_raw_value(self) -> str:
+        # raw bits of parsed station id, in order assignment gives them (with
+        # ASCII chars swapped)
+        int_value = Field.STATION_ID._int_from_words(self.__words)
+        if int_value >> 8 >= ASCII_START:
+            int_value = ((int_value & 0xff) << 8) | (int_value >> 8)
+        bit_length = Field.STATION_ID._bit_length
+        return switch_end(format(int_value, f"0{bit_length}b"))
 
     def __interpret_extended_data(self):
-        raw_value = switch_end(self.__raw_values[Field.EXTENDED_DATA])
+        raw_value = switch_end(self._get_raw_value(Field.EXTENDED_DATA))
         edv = self.extended_data_version
         extended_data = Field.EXTENDED_DATA._decoder((raw_value, edv))
         self.__extended_data_fields = extended_data
@@ -456,6 +594,19 @@ class VDIFHeader:
         stdout.write(f"Word {word_num} {word_content}|\n")
         return
 
+    def __print_extended_data_values(self):
+        sample_rate = self.extended_data.get(Field.SAMPLE_RATE, None)
+        sample_rate_unit = self.extended_data.get(Field.SAMPLE_RATE_UNIT, None)
+        if sample_rate is not None and sample_rate_unit is not None:
+            stdout.write(f"Sample rate: {sample_rate} {sample_rate_unit}\n")
+        for field, value in self.extended_data.items():
+            if field in [Field.SAMPLE_RATE, Field.SAMPLE_RATE_UNIT]:
+                continue
+            if field in HEX_FIELDS:
+                value = f"{value:#x}"
+            stdout.write(f"{ED_LABELS[field]}: {value}\n")
+        return
+
     ######## OVERLOADED METHODS
 
     def __eq__(self, other: "VDIFHeader") -> bool:
@@ -466,12 +617,3 @@ class VDIFHeader:
             self.__str_fields == other.__str_fields and
             self.__extended_data_fields == other.__extended_data_fields)
 
-    ######## NOT IMPLEMENTED METHODS
-
-    def __print_extended_data_values(self):
-        sample_rate = self.extended_data.get(Field.SAMPLE_RATE, None)
-        sample_rate_unit = self.extended_data.get(Field.SAMPLE_RATE_UNIT, None)
-        if sample_rate is not None and sample_rate_unit is not None:
-            stdout.write(f"Sample rate: {sample_rate} {sample_rate_unit}\n")
-        # TODO implement others
-        return
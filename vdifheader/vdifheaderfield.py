@@ -29,6 +29,7 @@ __status__ = "Pre-release"
 __version__ = "0.1"
 
 from enum import Enum
+from functools import lru_cache
 from math import log2, pow
 from datetime import datetime, timezone
 from typing import Any, Callable, Tuple, Union
@@ -39,6 +40,10 @@ WORD_BITS = 32      # number of bits in a word
 ED_START = 128      # start bit of extended data field
 ED_PAUSE = 152      # start of extended data version field
 ED_UNPAUSE = 160    # end of extended data version field
+ED_MASK = 0xffffff  # bits of first extended data word not used by edv
+ED_WORD = 4         # first word of extended data
+ED_VERSION_SHIFT = 24   # start bit of extended data version in first ed word
+ASCII_START = 0x30  # station ids with a first byte below this are numeric
 
 
 class VDIFHeaderField(Enum):
@@ -59,6 +64,30 @@ class VDIFHeaderField(Enum):
     EXTENDED_DATA = "extended_data"
     SAMPLE_RATE = "sample_rate"
     SAMPLE_RATE_UNIT = "sample_rate_unit"
+    SYNC_WORD = "sync_word"
+    DAS_ID = "das_id"
+    POLARISATION_BLOCK = "polarisation_block"
+    QUADRANT = "quadrant"
+    CORRELATOR = "correlator"
+    STATUS_WORD = "status_word"
+    PACKET_SERIAL_NUMBER = "packet_serial_number"
+    TUNING_WORD = "tuning_word"
+    DBE_PERSONALITY = "dbe_personality"
+    MINOR_REVISION = "minor_revision"
+    MAJOR_REVISION = "major_revision"
+    SIDEBAND = "sideband"
+    SUBBAND = "subband"
+    IF_NUMBER = "if_number"
+    DBE_UNIT = "dbe_unit"
+    VALIDITY_MASK_LENGTH = "validity_mask_length"
+    VALIDITY_MASK = "validity_mask"
+    MARK5B_FRAME_NUMBER = "mark5b_frame_number"
+    TEST_DATA = "test_data"
+    USER_DATA = "user_data"
+    TRUNCATED_MJD = "truncated_mjd"
+    SECONDS_OF_DAY = "seconds_of_day"
+    FRACTIONAL_SECONDS = "fractional_seconds"
+    CRC = "crc"
 
     ######## STATIC METHODS
 
@@ -77,6 +106,7 @@ class VDIFHeaderField(Enum):
     ######## PUBLIC PROPERTIES
 
     @property
+    @lru_cache(maxsize=None)
     def data_type(self) -> type:
         bool_fields = [VDIFHeaderField.INVALID_FLAG, 
             VDIFHeaderField.LEGACY_MODE]
@@ -92,11 +122,14 @@ class VDIFHeaderField(Enum):
         str_fields = [VDIFHeaderField.DATA_TYPE, 
             VDIFHeaderField.STATION_ID]
         if self in str_fields: return str
+        if self in VDIFHeaderField.optional_values():
+            return _EXTENDED_DATA_TYPES.get(self, int)
         return
 
     ######## PRIVATE PROPERTIES
 
     @property
+    @lru_cache(maxsize=None)
     def _bit_length(self) -> int:
         bit_lengths = {
             VDIFHeaderField.INVALID_FLAG: 1,
@@ -118,6 +151,7 @@ class VDIFHeaderField(Enum):
         return bit_lengths[self]
 
     @property
+    @lru_cache(maxsize=None)
     def _encoder(self) -> Callable:
         bit_length = self._bit_length
         _simple_bools = [
@@ -153,6 +187,7 @@ class VDIFHeaderField(Enum):
         return encoders[self]
 
     @property
+    @lru_cache(maxsize=None)
     def _decoder(self) -> Callable:
         _simple_bools = [
             VDIFHeaderField.INVALID_FLAG, 
@@ -185,6 +220,7 @@ class VDIFHeaderField(Enum):
         return decoders[self]
 
     @property
+    @lru_cache(maxsize=None)
     def _header_position(self) -> Tuple[int,int]:
         header_positions = {
             VDIFHeaderField.INVALID_FLAG: (0, 31),
@@ -205,6 +241,18 @@ class VDIFHeaderField(Enum):
         }
         return header_positions[self]
 
+    @property
+    def _word_layout(self) -> Tuple[int,int,int]:
+        return _WORD_LAYOUTS[self]
+
+    @property
+    def _word_decoder(self) -> Callable:
+        return _WORD_DECODERS[self]
+
+    @property
+    def _word_encoder(self) -> Callable:
+        return _WORD_ENCODERS[self]
+
     @property
     def _encoder_reference_epoch(self) -> Callable:
         return (lambda x: VDIFHeaderField._encode_reference_epoch(x))
@@ -217,15 +265,12 @@ class VDIFHeaderField(Enum):
     def _encoder_station_id(self) -> Callable:
         return (lambda x:
             format(int(x), "b") if x.isnumeric() 
-            else VDIFHeaderField._encode_ascii(x)
+            else VDIFHeaderField._encode_ascii(x.ljust(2, "\0"))
         )
 
     @property
     def _decoder_station_id(self) -> Callable:
-        return (lambda x:
-            f"{int(x)}" if int(x[-8:], 2) < 48
-            else VDIFHeaderField._decode_ascii(x)
-        )
+        return (lambda x: VDIFHeaderField._decode_station_id(int(x, 2)))
 
     @property
     def _encoder_extended_data(self) -> Callable:
@@ -246,6 +291,25 @@ class VDIFHeaderField(Enum):
             return self._decoder((switch_end(raw_value), edv))
         return self._decoder(switch_end(raw_value))
 
+    def _from_words(self, words: Tuple[int,...]
+            ) -> Union[bool,datetime,int,str,dict]:
+        raw_value = self._int_from_words(words)
+        if self == VDIFHeaderField.EXTENDED_DATA:
+            edv = VDIFHeaderField.EXTENDED_DATA_VERSION._from_words(words)
+            return self._decoder((format(raw_value, "0120b"), edv))
+        return _WORD_DECODERS[self](raw_value)
+
+    def _int_from_words(self, words: Tuple[int,...]) -> int:
+        if self == VDIFHeaderField.EXTENDED_DATA:
+            return ((words[7] << 88) | (words[6] << 56) | (words[5] << 24) |
+                (words[4] & ED_MASK))
+        word, shift, mask = _WORD_LAYOUTS[self]
+        return (words[word] >> shift) & mask
+
+    def _raw_from_words(self, words: Tuple[int,...]) -> str:
+        raw_value = self._int_from_words(words)
+        return switch_end(format(raw_value, f"0{self._bit_length}b"))
+
     def _raw_from(self, raw_data: str) -> str:
         if self == VDIFHeaderField.EXTENDED_DATA:
             word4 = "".join(raw_data[ED_START:ED_PAUSE])
@@ -259,41 +323,86 @@ class VDIFHeaderField(Enum):
 
     ######## PRIVATE STATIC METHODS
 
+    @staticmethod
+    def _extended_data_layout(version: int
+            ) -> list[Tuple["VDIFHeaderField",int,int,int]]:
+        return _EXTENDED_DATA_LAYOUTS.get(version, [])
+
     @staticmethod
     def _encode_reference_epoch(epoch: datetime) -> str:
+        return format(VDIFHeaderField._encode_reference_epoch_value(epoch), "b")
+
+    @staticmethod
+    def _encode_reference_epoch_value(epoch: datetime) -> int:
         _epoch = to_utc(epoch)
         years = (_epoch.year - 2000) * 2
         month_offset = 1 if (_epoch.month == 7) else 0
-        return format(years + month_offset, "b")
+        return years + month_offset
 
     @staticmethod
     def _decode_reference_epoch(raw_data: str) -> datetime:
-        int_value = int(raw_data, 2)
+        return VDIFHeaderField._decode_reference_epoch_value(int(raw_data, 2))
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _decode_reference_epoch_value(int_value: int) -> datetime:
         year = 2000 + (int_value // 2)
         month = 7 if (int_value % 2 == 1) else 1
         return datetime(year, month, day=1, tzinfo=timezone.utc)
 
+    @staticmethod
+    def _encode_station_id_value(station_id: str) -> int:
+        if station_id.isnumeric():
+            return int(station_id)
+        # a 1-char id has a null second char, as it is decoded
+        return (ord(station_id[0]) << 8) | ord(station_id[1:2] or "\0")
+
+    @staticmethod
+    def _decode_station_id(int_value: int) -> str:
+        first_char, second_char = int_value >> 8, int_value & 0xff
+        if first_char < ASCII_START:
+            return f"{int_value}"
+        # null second char pads a 1-char id, as numpy strings would drop it
+        return (chr(first_char) + chr(second_char)).rstrip("\0")
+
     @staticmethod
     def _encode_extended_data(raw_data: str) -> str:
-        # TODO support extended_data fields
-        return
+        # extended data is kept as its raw bits, which are already encoded
+        return raw_data
 
     @staticmethod
     def _decode_extended_data(raw_data: str, 
             version: int=0) -> dict["VDIFHeaderField",Any]:
+        layout = VDIFHeaderField._extended_data_layout(version)
+        if not layout:
+            return {}
+        # words 4 to 7 as one little-endian int, with edv back in word 4
+        value = int(raw_data, 2)
+        ed_words = (value & ED_MASK) | (version << ED_VERSION_SHIFT) | \
+            ((value >> ED_VERSION_SHIFT) << WORD_BITS)
         extended_data = {}
-        if version == 0x01:
-            pass # TODO support extended_data fields
-        elif version == 0x02:
-            pass # TODO support extended_data fields
-        elif version == 0x03:
-            pass # TODO support extended_data fields
-        elif version == 0x04:
-            pass # TODO support extended_data fields
-        elif version == 0xab:
-            pass # TODO support extended_data fields
+        for field, word, shift, bit_length in layout:
+            start = (word - ED_WORD) * WORD_BITS + shift
+            raw_value = (ed_words >> start) & ((1 << bit_length) - 1)
+            extended_data[field] = _EXTENDED_DATA_DECODERS.get(field,
+                int)(raw_value)
         return extended_data
 
+    @staticmethod
+    def _decode_das_id(int_value: int) -> str:
+        # 8 ASCII characters, left-justified and padded with nulls
+        return int_value.to_bytes(8, "little").rstrip(b"\0").decode("latin1")
+
+    @staticmethod
+    def _decode_bcd(int_value: int) -> int:
+        # binary-coded decimal, one digit per 4 bits (not checked to be < 10)
+        value, scale = 0, 1
+        while int_value:
+            value += (int_value & 0xf) * scale
+            int_value >>= 4
+            scale *= 10
+        return value
+
     @staticmethod
     def _encode_ascii(ascii_string: str) -> str:
         binary_string = ""
@@ -311,3 +420,117 @@ class VDIFHeaderField(Enum):
             int_value = int(binary_string[i * 8:(i + 1) * 8], 2)
             ascii_string += chr(int_value)
         return ascii_string
+
+
+# precomputed (word, shift, mask) for extracting each field from header words
+_WORD_LAYOUTS = {
+    field: (*field._header_position, (1 << field._bit_length) - 1)
+    for field in VDIFHeaderField.primary_values()
+}
+
+# decoders from raw unsigned int to field value, counterparts of _decoder
+_WORD_DECODERS = {
+    VDIFHeaderField.INVALID_FLAG: (lambda x: x == 1),
+    VDIFHeaderField.LEGACY_MODE: (lambda x: x == 1),
+    VDIFHeaderField.SECONDS_FROM_EPOCH: int,
+    VDIFHeaderField.UNASSIGNED_FIELD: int,
+    VDIFHeaderField.REFERENCE_EPOCH: 
+        VDIFHeaderField._decode_reference_epoch_value,
+    VDIFHeaderField.DATA_FRAME_NUMBER: int,
+    VDIFHeaderField.VDIF_VERSION: int,
+    VDIFHeaderField.NUM_CHANNELS: (lambda x: 1 << x),
+    VDIFHeaderField.DATA_FRAME_LENGTH: (lambda x: x * 8),
+    VDIFHeaderField.DATA_TYPE: (lambda x: "complex" if x == 1 else "real"),
+    VDIFHeaderField.BITS_PER_SAMPLE: (lambda x: x + 1),
+    VDIFHeaderField.THREAD_ID: int,
+    VDIFHeaderField.STATION_ID: VDIFHeaderField._decode_station_id,
+    VDIFHeaderField.EXTENDED_DATA_VERSION: int,
+}
+
+# encoders from field value to raw unsigned int, counterparts of _WORD_DECODERS
+_WORD_ENCODERS = {
+    VDIFHeaderField.INVALID_FLAG: int,
+    VDIFHeaderField.LEGACY_MODE: int,
+    VDIFHeaderField.SECONDS_FROM_EPOCH: int,
+    VDIFHeaderField.UNASSIGNED_FIELD: int,
+    VDIFHeaderField.REFERENCE_EPOCH: 
+        VDIFHeaderField._encode_reference_epoch_value,
+    VDIFHeaderField.DATA_FRAME_NUMBER: int,
+    VDIFHeaderField.VDIF_VERSION: int,
+    VDIFHeaderField.NUM_CHANNELS: (lambda x: x.bit_length() - 1),
+    VDIFHeaderField.DATA_FRAME_LENGTH: (lambda x: x // 8),
+    VDIFHeaderField.DATA_TYPE: (lambda x: 1 if x == "complex" else 0),
+    VDIFHeaderField.BITS_PER_SAMPLE: (lambda x: x - 1),
+    VDIFHeaderField.THREAD_ID: int,
+    VDIFHeaderField.STATION_ID: VDIFHeaderField._encode_station_id_value,
+    VDIFHeaderField.EXTENDED_DATA_VERSION: int,
+}
+
+# (word, shift, bit length) of each field of words 4 to 7, by extended data
+# version, as per the VDIF extended data version specifications
+_EXTENDED_DATA_LAYOUTS = {
+    0x01: [ # NICT
+        (VDIFHeaderField.SAMPLE_RATE, 4, 0, 23),
+        (VDIFHeaderField.SAMPLE_RATE_UNIT, 4, 23, 1),
+        (VDIFHeaderField.SYNC_WORD, 5, 0, 32),
+        (VDIFHeaderField.DAS_ID, 6, 0, 64),
+    ],
+    0x02: [ # ALMA
+        (VDIFHeaderField.POLARISATION_BLOCK, 4, 0, 1),
+        (VDIFHeaderField.QUADRANT, 4, 1, 2),
+        (VDIFHeaderField.CORRELATOR, 4, 3, 1),
+        (VDIFHeaderField.SYNC_WORD, 4, 4, 20),
+        (VDIFHeaderField.STATUS_WORD, 5, 0, 32),
+        (VDIFHeaderField.PACKET_SERIAL_NUMBER, 6, 0, 64),
+    ],
+    0x03: [ # VLBA
+        (VDIFHeaderField.SAMPLE_RATE, 4, 0, 23),
+        (VDIFHeaderField.SAMPLE_RATE_UNIT, 4, 23, 1),
+        (VDIFHeaderField.SYNC_WORD, 5, 0, 32),
+        (VDIFHeaderField.TUNING_WORD, 6, 0, 32),
+        (VDIFHeaderField.DBE_PERSONALITY, 7, 0, 8),
+        (VDIFHeaderField.MINOR_REVISION, 7, 8, 4),
+        (VDIFHeaderField.MAJOR_REVISION, 7, 12, 4),
+        (VDIFHeaderField.SIDEBAND, 7, 16, 1),
+        (VDIFHeaderField.SUBBAND, 7, 17, 3),
+        (VDIFHeaderField.IF_NUMBER, 7, 20, 4),
+        (VDIFHeaderField.DBE_UNIT, 7, 24, 4),
+    ],
+    0x04: [ # multiplexed threads
+        (VDIFHeaderField.VALIDITY_MASK_LENGTH, 4, 16, 8),
+        (VDIFHeaderField.SYNC_WORD, 5, 0, 32),
+        (VDIFHeaderField.VALIDITY_MASK, 6, 0, 64),
+    ],
+    0xab: [ # Mark 5B header, whose sync word 0xabaddeed sets the edv
+        (VDIFHeaderField.SYNC_WORD, 4, 0, 32),
+        (VDIFHeaderField.MARK5B_FRAME_NUMBER, 5, 0, 15),
+        (VDIFHeaderField.TEST_DATA, 5, 15, 1),
+        (VDIFHeaderField.USER_DATA, 5, 16, 16),
+        (VDIFHeaderField.SECONDS_OF_DAY, 6, 0, 20),
+        (VDIFHeaderField.TRUNCATED_MJD, 6, 20, 12),
+        (VDIFHeaderField.CRC, 7, 0, 16),
+        (VDIFHeaderField.FRACTIONAL_SECONDS, 7, 16, 16),
+    ],
+}
+
+# decoders from raw unsigned int to extended data field value, else int
+_EXTENDED_DATA_DECODERS = {
+    VDIFHeaderField.SAMPLE_RATE_UNIT: (lambda x: "MHz" if x == 1 else "kHz"),
+    VDIFHeaderField.DAS_ID: VDIFHeaderField._decode_das_id,
+    VDIFHeaderField.QUADRANT: (lambda x: x + 1),
+    VDIFHeaderField.SIDEBAND: (lambda x: "USB" if x == 1 else "LSB"),
+    VDIFHeaderField.TEST_DATA: (lambda x: x == 1),
+    VDIFHeaderField.SECONDS_OF_DAY: VDIFHeaderField._decode_bcd,
+    VDIFHeaderField.TRUNCATED_MJD: VDIFHeaderField._decode_bcd,
+    VDIFHeaderField.FRACTIONAL_SECONDS:
+        (lambda x: VDIFHeaderField._decode_bcd(x) / 10000),
+}
+
+# types of extended data field values that are not int
+_EXTENDED_DATA_TYPES = {
+    VDIFHeaderField.SAMPLE_RATE_UNIT: str,
+    VDIFHeaderField.DAS_ID: str,
+    VDIFHeaderField.SIDEBAND: str,
+    VDIFHeaderField.TEST_DATA: bool,
+    VDIFHeaderField.FRACTIONAL_SECONDS: float,
+}
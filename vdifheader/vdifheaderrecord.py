@@ -0,0 +1,196 @@
+# > vdifheader - vdifheaderrecord.py
+# Defines VDIFHeaderRecord class that represents a compact, read-only header
+
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+> vdifheader - vdifheaderrecord.py
+Defines VDIFHeaderRecord class that represents a compact, read-only header
+"""
+__author__ = "Mars Buttfield-Addison"
+__authors__ = [__author__]
+__contact__ = "hello@themartianlife.com"
+__copyright__ = f"Copyright 2022, {__author__}"
+__credits__ = __authors__
+__date__ = "2022/04/07"
+__deprecated__ = False
+__email__ = __contact__
+__license__ = "GPLv3"
+__maintainer__ = __author__
+__status__ = "Pre-release"
+__version__ = "0.1"
+
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from vdifheader._utils import station_information
+from vdifheader.vdifheader import HEADER_BYTES, HEADER_STRUCT, VDIFHeader
+from vdifheader.vdifheaderfield import VDIFHeaderField as Field
+
+
+class VDIFHeaderRecord:
+    """A class that represents a header by only its raw bytes, read-only"""
+
+    __slots__ = ("_raw_data",)
+
+    def __init__(self, raw_data: bytes):
+        """Creates new record holding a copy of the first 32 bytes of raw data"""
+        if len(raw_data) < HEADER_BYTES:
+            raise ValueError(f"VDIFHeaderRecord requires {HEADER_BYTES} bytes " \
+                f"of raw data, but got {len(raw_data)}.")
+        object.__setattr__(self, "_raw_data", bytes(raw_data[:HEADER_BYTES]))
+        return
+
+    @staticmethod
+    def parse(raw_data: bytes) -> "VDIFHeaderRecord":
+        """Creates new VDIFHeaderRecord object from raw data"""
+        return VDIFHeaderRecord(raw_data)
+
+    ######## PROPERTIES
+
+    @property
+    def raw_data(self) -> bytes:
+        """Original 32 bytes of this header"""
+        return self._raw_data
+
+    @property
+    def invalid_flag(self) -> bool:
+        """Whether data source device believes this frame is corrupted"""
+        return self._get_value(Field.INVALID_FLAG)
+
+    @property
+    def legacy_mode(self) -> bool:
+        """Whether this header uses the legacy 16-byte format"""
+        return self._get_value(Field.LEGACY_MODE)
+
+    @property
+    def seconds_from_epoch(self) -> int:
+        """Seconds offset from this headers's reference epoch"""
+        return self._get_value(Field.SECONDS_FROM_EPOCH)
+
+    @property
+    def unassigned_field(self) -> int:
+        """Synch code field that should be all zeroes"""
+        return self._get_value(Field.UNASSIGNED_FIELD)
+
+    @property
+    def reference_epoch(self) -> datetime:
+        """Datetime indicating point from which seconds from epoch begins"""
+        return self._get_value(Field.REFERENCE_EPOCH)
+
+    @property
+    def data_frame_number(self) -> int:
+        """Index of this data frame in overall data stream"""
+        return self._get_value(Field.DATA_FRAME_NUMBER)
+
+    @property
+    def vdif_version(self) -> int:
+        """Version of VDIF format specification to apply in interpretation"""
+        return self._get_value(Field.VDIF_VERSION)
+
+    @property
+    def num_channels(self) -> int:
+        """Number of channels in data stream"""
+        return self._get_value(Field.NUM_CHANNELS)
+
+    @property
+    def data_frame_length(self) -> int:
+        """Length of this frame in bytes, including header"""
+        return self._get_value(Field.DATA_FRAME_LENGTH)
+
+    @property
+    def data_type(self) -> str:
+        """Indicates whether stream represents real or complex numbers"""
+        return self._get_value(Field.DATA_TYPE)
+
+    @property
+    def bits_per_sample(self) -> int:
+        """Number of bits used to represent a single sample in data stream"""
+        return self._get_value(Field.BITS_PER_SAMPLE)
+
+    @property
+    def thread_id(self) -> int:
+        """Index of this frame's data thread in overall data stream"""
+        return self._get_value(Field.THREAD_ID)
+
+    @property
+    def station_id(self) -> str:
+        """2-char ASCII or unsigned int code representing data source device"""
+        return self._get_value(Field.STATION_ID)
+
+    @property
+    def extended_data_version(self) -> int:
+        """Extended data format to apply in extended data interpretation"""
+        return self._get_value(Field.EXTENDED_DATA_VERSION)
+
+    @property
+    def extended_data(self) -> dict[Field,Any]:
+        """Extended data dict, interpreted as per extended data version"""
+        return self._get_value(Field.EXTENDED_DATA)
+
+    @property
+    def to_dict(self) -> dict[Field,Any]:
+        """Creates dict of header fields as format field: field_value"""
+        words = HEADER_STRUCT.unpack(self._raw_data)
+        fields = {field: field._from_words(words)
+            for field in Field.primary_values()}
+        fields[Field.EXTENDED_DATA] = Field.EXTENDED_DATA._from_words(words)
+        return fields
+
+    ######## PUBLIC METHODS
+
+    def get_timestamp(self, frames_per_second: Optional[int]=None) -> datetime:
+        """Gets epoch + seconds (+ frame number / frame rate) as datetime"""
+        epoch = self.reference_epoch
+        elapsed = timedelta(seconds=self.seconds_from_epoch)
+        if frames_per_second is not None:
+            elapsed += timedelta(seconds=self.data_frame_number / 
+                frames_per_second)
+        return epoch + elapsed
+
+    def get_station_information(self) -> str:
+        """Gets name of source station for given station id, if known"""
+        return station_information(self.station_id)
+
+    def to_header(self) -> VDIFHeader:
+        """Creates full (mutable, validated) VDIFHeader from this record"""
+        return VDIFHeader.parse(self._raw_data)
+
+    def to_bytes(self) -> bytes:
+        """Gets the 32 bytes of this header, exactly as they were read"""
+        return self._raw_data
+
+    ######## PRIVATE METHODS
+
+    def _get_value(self, field: Field) -> Any:
+        return field._from_words(HEADER_STRUCT.unpack(self._raw_data))
+
+    ######## OVERLOADED METHODS
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("VDIFHeaderRecord is read-only.")
+
+    def __delattr__(self, name: str):
+        raise AttributeError("VDIFHeaderRecord is read-only.")
+
+    def __eq__(self, other: "VDIFHeaderRecord") -> bool:
+        return (isinstance(other, VDIFHeaderRecord) and
+            self._raw_data == other._raw_data)
+
+    def __hash__(self) -> int:
+        return hash(self._raw_data)
+
+    def __getstate__(self) -> bytes:
+        return self._raw_data
+
+    def __setstate__(self, state: bytes):
+        object.__setattr__(self, "_raw_data", state)
+        return